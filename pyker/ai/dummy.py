@@ -3,24 +3,45 @@ import time
 
 from queue import Queue
 from pyker.game.game import Game, State
+from pyker.game.models import *
+
+
+def random_action(game: Game, state: State, rng: random.Random):
+    """Choose uniformly one of the available actions, and the amount of a bet
+
+    Returns:
+        tuple[Action, int, tuple[int, int]]: The action, the amount and the
+        range of the amount (0 and (0, 0) if the action is not a bet)
+    """
+    action = rng.choice(game.actions(state))
+    if isinstance(action, tuple):
+        action, range = action[0], action[1]
+        return action, rng.randint(*range), range
+    return action, 0, (0, 0)
+
+
+class RandomAgent:
+    """Agent playing random actions, without waiting (for simulations)"""
+
+    def __init__(self, player: Player, rng: random.Random | None = None):
+        self.player = player
+        self.rng = rng if rng is not None else random.Random()
+
+    def act(self, game: Game, state: State):
+        return random_action(game, state, self.rng)
+
 
 class Dummy:
-    def __init__(self, game: Game, initial_state: State, queue: Queue):
+    def __init__(self, game: Game, initial_state: State, queue: Queue, rng: random.Random | None = None):
         self.game = game
         self.initial_state = initial_state
         self.queue = queue
+        self.rng = rng if rng is not None else random.Random()
     
     def run(self):
         time.sleep(3)
-        actions = self.game.actions(self.initial_state)
-        action = random.choice(actions)
-        if isinstance(action, tuple):
-            action, range = action[0], action[1]
-            amount = random.randint(*range)
+        action, amount, range = random_action(self.game, self.initial_state, self.rng)
+        if action is Action.BetOrRaise:
             self.queue.put((action, amount, range))
         else:
             self.queue.put(action)
-
-    
-
-    
\ No newline at end of file
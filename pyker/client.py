@@ -0,0 +1,171 @@
+"""Client of pyker.server and load test
+
+Client speaks the line-delimited JSON protocol of pyker.server. load_test
+fills n_tables tables with random bots, one connection per table holding
+all its seats, and measures for some seconds the actions per second and
+the latency of each action: the time from sending it to receiving it back
+from the table. Start a server, then:
+
+    python -m pyker.client --port 7777 --tables 200 --seconds 10
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from pyker.server import MESSAGE_LIMIT, decode_message, encode_message
+
+
+class Client:
+    """A connection to a server"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host: str = "127.0.0.1", port: int = 7777, path: str | None = None):
+        """Connect on a TCP port, or on a Unix socket if a path is given"""
+        if path is not None:
+            return cls(*await asyncio.open_unix_connection(path, limit=MESSAGE_LIMIT))
+        return cls(*await asyncio.open_connection(host, port, limit=MESSAGE_LIMIT))
+
+    async def send(self, message: dict):
+        self.writer.write(encode_message(message))
+        await self.writer.drain()
+
+    async def receive(self):
+        """Return the next message, None when the server closed the connection"""
+        line = await self.reader.readline()
+        if not line:
+            return None
+        return decode_message(line)
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+class LoadTestResult:
+    """Actions played during a load test
+
+    Attributes:
+        actions (int): Number of actions played by the bots
+        elapsed (float): Seconds of the test
+        latencies (list[float]): Seconds from sending each action to
+            receiving it back, sorted
+    """
+
+    def __init__(self, actions: int, elapsed: float, latencies: list[float]):
+        self.actions = actions
+        self.elapsed = elapsed
+        self.latencies = sorted(latencies)
+
+    @property
+    def actions_per_second(self):
+        return self.actions / self.elapsed
+
+    def percentile(self, p: float):
+        """Latency under which p percent of the actions were received back"""
+        if not self.latencies:
+            return None
+        return self.latencies[min(len(self.latencies) - 1, int(len(self.latencies) * p / 100))]
+
+
+async def run_bot(client: Client, n_seats: int, rng: random.Random, deadline: float, latencies: list[float]):
+    """Take n_seats seats and play random actions until the deadline
+
+    Returns:
+        int: Number of actions played
+    """
+    for i in range(n_seats):
+        await client.send({"type": "join", "name": f"bot {i}"})
+
+    tables = set()
+    sent = {}  # (table, seat) -> time the action was sent
+    actions = 0
+    while time.perf_counter() < deadline:
+        message = await client.receive()
+        if message is None:
+            break
+        kind = message["type"]
+        if kind == "seated":
+            tables.add(message["table"])
+        elif kind == "closed":
+            tables.discard(message["table"])
+            if not tables:
+                break
+        elif kind == "action":
+            start = sent.pop((message["table"], message["seat"]), None)
+            if start is not None:
+                latencies.append(time.perf_counter() - start)
+        elif kind == "turn":
+            action = rng.choice(message["actions"])
+            amount = rng.randint(*message["range"]) if action == "bet" else 0
+            sent[(message["table"], message["seat"])] = time.perf_counter()
+            await client.send(
+                {"type": "act", "table": message["table"], "seat": message["seat"], "action": action, "amount": amount}
+            )
+            actions += 1
+        elif kind == "error":
+            raise RuntimeError(message["message"])
+
+    await client.close()
+    return actions
+
+
+async def load_test(
+    n_tables: int,
+    n_players: int = 6,
+    seconds: float = 10.0,
+    *,
+    host: str = "127.0.0.1",
+    port: int = 7777,
+    path: str | None = None,
+    seed: int | None = None,
+):
+    """Play random bots at n_tables tables of a server for some seconds
+
+    The tables of the server must have n_players seats.
+
+    Returns:
+        LoadTestResult: The actions played and their latencies
+    """
+    rng = random.Random(seed)
+    clients = [await Client.connect(host, port, path) for _ in range(n_tables)]
+    latencies = []
+    start = time.perf_counter()
+    deadline = start + seconds
+    actions = await asyncio.gather(
+        *(run_bot(client, n_players, random.Random(rng.getrandbits(64)), deadline, latencies) for client in clients)
+    )
+    return LoadTestResult(sum(actions), time.perf_counter() - start, latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test a pyker server with random bots.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument("--unix", default=None, help="path of a Unix socket, instead of TCP")
+    parser.add_argument("--tables", type=int, default=100)
+    parser.add_argument("--players", type=int, default=6, help="players per table, as on the server")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    result = asyncio.run(
+        load_test(
+            args.tables, args.players, args.seconds, host=args.host, port=args.port, path=args.unix, seed=args.seed
+        )
+    )
+    print(f"{result.actions} actions in {result.elapsed:.2f}s: {result.actions_per_second:.0f} actions/s")
+    if result.latencies:
+        p50, p99 = result.percentile(50) * 1000, result.percentile(99) * 1000
+        print(f"latency: p50 {p50:.2f}ms, p99 {p99:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,416 @@
+"""Estimation of the equity of the hands of a play
+
+Equity is either computed exactly, enumerating every runout of the board
+(exact_equity), or estimated by Monte Carlo sampling (estimate_equity).
+
+The exact enumeration collapses the runouts that are the same up to a
+permutation of the suits that leaves every hand, the board and the dead
+cards unchanged, evaluating a single representative weighted by the number
+of runouts it stands for.
+
+For the Monte Carlo estimation, given the hole cards of the players (or a
+range of possible hands for some of them), the community cards already dealt
+and the dead cards, runouts of the board are sampled from the remaining deck
+and evaluated in batches with the table-based evaluator.
+
+Work is split in batches, each one with its own independent random stream
+spawned from a single seed, so that the result only depends on the seed and
+on the batch size, not on the number of processes used. Sampling stops as
+soon as the confidence interval of every player is narrower than the
+requested precision.
+"""
+import concurrent.futures
+import itertools
+import math
+import statistics
+
+import numpy as np
+
+from pyker.game.combos import COMBOS
+from pyker.game.evaluator import evaluate_cards_batch
+from pyker.game.models import *
+from pyker.ranges import Range
+
+CARD_BITS = np.left_shift(np.uint64(1), np.arange(N_CARDS, dtype=np.uint64))
+
+
+class EquityResult:
+    """Result of an equity estimation
+
+    All the arrays have one element per player.
+
+    Attributes:
+        samples (int): Number of runouts evaluated
+        win (np.ndarray): Probability of winning the whole pot
+        tie (np.ndarray): Probability of splitting the pot
+        equity (np.ndarray): Expected share of the pot
+        error (np.ndarray): Half width of the confidence interval of the equity
+        confidence (float): Confidence level of the interval
+    """
+
+    def __init__(self, samples, wins, ties, shares, squares, confidence):
+        self.samples = samples
+        self.win = wins / samples
+        self.tie = ties / samples
+        self.equity = shares / samples
+        self.confidence = confidence
+
+        variance = np.maximum(squares / samples - self.equity**2, 0)
+        z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+        self.error = z * np.sqrt(variance / samples)
+
+    def interval(self):
+        """Return the lower and upper bounds of the confidence intervals"""
+        return self.equity - self.error, self.equity + self.error
+
+
+class ExactEquityResult(EquityResult):
+    """Result of an exhaustive enumeration of the runouts: there is no error
+
+    Attributes:
+        wins (np.ndarray): Number of runouts won by each player
+        ties (np.ndarray): Number of runouts where each player splits the pot
+        evaluated (int): Number of distinct runouts actually evaluated
+    """
+
+    def __init__(self, samples, wins, ties, shares, evaluated):
+        self.samples = samples
+        self.wins = wins
+        self.ties = ties
+        self.win = wins / samples
+        self.tie = ties / samples
+        self.equity = shares / samples
+        self.confidence = 1.0
+        self.error = np.zeros(len(wins))
+        self.evaluated = evaluated
+
+
+class _Spec:
+    """Everything needed to sample runouts, in a form cheap to send to workers"""
+
+    def __init__(self, players: list, community: Community | None, dead: list[Card] | None):
+        board = community.cards if community is not None else []
+        dead = dead or []
+        self.board = np.array(cards_to_ids(board), dtype=np.uint8)
+        self.fixed_mask = cards_to_mask(board + dead)
+
+        self.combos = []  # possible hole cards of each player
+        self.weights = []
+        for player in players:
+            combos, weights = _get_combos(player)
+            self.combos.append(combos)
+            self.weights.append(weights)
+
+        for combos in self.combos:
+            if len(combos) == 1:
+                self.fixed_mask |= cards_to_mask(ids_to_cards(combos[0].tolist()))
+
+        used = mask_to_cards(self.fixed_mask)
+        if len(used) != len(board) + len(dead) + 2 * sum(len(c) == 1 for c in self.combos):
+            raise ValueError("The same card is used more than once.")
+
+        self.remaining = np.array(
+            [card.id for card in CARDS if not card.mask & self.fixed_mask], dtype=np.uint8
+        )
+        self.n_cards_to_deal = 5 - len(board)
+
+        for combos in self.combos:
+            if len(combos) > 1 and not any(
+                int(CARD_BITS[combo].sum()) & self.fixed_mask == 0 for combo in combos
+            ):
+                raise ValueError("A range has no hand compatible with the known cards.")
+
+
+def _get_combos(player):
+    """Return the combos (as card ids) and the weights of a player
+
+    A player is either a Hand (known hole cards), a Range or a list of Hands
+    (a range where each hand has the same probability).
+    """
+    if isinstance(player, Range):
+        indexes = player.combos()
+        if not len(indexes):
+            raise ValueError("A range has no hand.")
+        weights = player.weights[indexes].astype(np.float64)
+        return COMBOS[indexes], weights / weights.sum()
+
+    if isinstance(player, Hand):
+        hands = [player]
+    else:
+        hands = list(player)
+
+    combos = np.array([cards_to_ids(hand.cards) for hand in hands], dtype=np.uint8)
+    weights = np.full(len(combos), 1 / len(combos))
+    return combos, weights
+
+
+def _deal_holes(spec: _Spec, rng: np.random.Generator, n: int):
+    """Sample the hole cards of every player, dropping inconsistent rows
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Hole cards with shape (rows, players, 2)
+        and the bitmasks of the sampled (not known) hole cards, rows <= n
+    """
+    holes = np.empty((n, len(spec.combos), 2), dtype=np.uint8)
+    sampled = []
+    for i, (combos, weights) in enumerate(zip(spec.combos, spec.weights)):
+        if len(combos) == 1:
+            holes[:, i] = combos[0]
+        else:
+            holes[:, i] = combos[rng.choice(len(combos), size=n, p=weights)]
+            sampled.append(i)
+
+    if not sampled:
+        return holes, np.zeros(n, dtype=np.uint64)
+
+    # known hands are part of the fixed cards: only sampled ones can collide
+    bits = CARD_BITS[holes[:, sampled].reshape(n, -1)]
+    masks = np.bitwise_or.reduce(bits, axis=1)
+    # a card used twice makes the sum of the bits differ from their or
+    valid = (masks == bits.sum(axis=1)) & (masks & np.uint64(spec.fixed_mask) == 0)
+    return holes[valid], masks[valid]
+
+
+def _deal_boards(spec: _Spec, rng: np.random.Generator, hole_masks: np.ndarray):
+    """Sample the cards missing to complete the board of each row"""
+    n, k = len(hole_masks), spec.n_cards_to_deal
+    boards = np.empty((n, k), dtype=np.uint8)
+    rows = np.arange(n)
+
+    # draw with replacement and redraw the rows with repeated or used cards:
+    # accepted rows are uniform over the valid boards
+    while rows.size and k:
+        cards = spec.remaining[rng.integers(0, len(spec.remaining), size=(rows.size, k))]
+        bits = CARD_BITS[cards]
+        masks = np.bitwise_or.reduce(bits, axis=1)
+        valid = (masks == bits.sum(axis=1)) & (masks & hole_masks[rows] == 0)
+        boards[rows[valid]] = cards[valid]
+        rows = rows[~valid]
+
+    return boards
+
+
+def _simulate(spec: _Spec, seed: np.random.SeedSequence, n: int):
+    """Sample and evaluate n runouts (less if some hole cards are inconsistent)
+
+    Returns:
+        tuple: Number of runouts, then the sums (one per player) of wins,
+        ties, shares of the pot and squared shares
+    """
+    rng = np.random.default_rng(seed)
+    holes, hole_masks = _deal_holes(spec, rng, n)
+    rows, n_players = holes.shape[:2]
+
+    boards = np.concatenate(
+        (np.broadcast_to(spec.board, (rows, len(spec.board))), _deal_boards(spec, rng, hole_masks)),
+        axis=1,
+    )
+    strengths = np.stack(
+        [evaluate_cards_batch(np.concatenate((holes[:, i], boards), axis=1)) for i in range(n_players)],
+        axis=1,
+    )
+
+    winners = strengths == strengths.max(axis=1, keepdims=True)
+    n_winners = winners.sum(axis=1, keepdims=True)
+    shares = winners / n_winners
+
+    return (
+        rows,
+        (winners & (n_winners == 1)).sum(axis=0),
+        (winners & (n_winners > 1)).sum(axis=0),
+        shares.sum(axis=0),
+        (shares**2).sum(axis=0),
+    )
+
+
+def estimate_equity(
+    players: list,
+    community: Community | None = None,
+    dead: list[Card] | None = None,
+    *,
+    precision: float = 0.001,
+    confidence: float = 0.95,
+    max_samples: int = 10_000_000,
+    batch_size: int = 100_000,
+    processes: int = 1,
+    seed: int | None = None,
+):
+    """Estimate the equity of each player by sampling runouts
+
+    Args:
+        players (list): For each player, the Hand with the hole cards or, when
+            they are not known, a Range or a list of possible Hands (a
+            uniform range)
+        community (Community, optional): Community cards dealt so far
+        dead (list[Card], optional): Cards that cannot be dealt anymore
+        precision (float, optional): Stop when the confidence interval of
+            every equity is within +- precision. Defaults to 0.001.
+        confidence (float, optional): Confidence level. Defaults to 0.95.
+        max_samples (int, optional): Stop anyway after this number of runouts
+        batch_size (int, optional): Runouts sampled by each task
+        processes (int, optional): Number of worker processes, 1 to sample in
+            the current process. Defaults to 1.
+        seed (int, optional): Seed of the random streams
+
+    Raises:
+        ValueError: If the cards are inconsistent, or if no runout could be
+            sampled (the ranges cannot be dealt together)
+
+    Returns:
+        EquityResult: Win, tie and equity of each player
+    """
+    if len(players) < 2:
+        raise ValueError("At least two players are needed.")
+
+    spec = _Spec(players, community, dead)
+    root = np.random.SeedSequence(seed)
+    n_batches = math.ceil(max_samples / batch_size)
+    seeds = iter(root.spawn(n_batches))
+
+    totals = [0, 0, 0, 0, 0]
+    result = None
+
+    def add(batch):
+        nonlocal result
+        for i, value in enumerate(batch):
+            totals[i] = totals[i] + value
+        if totals[0] == 0:
+            return False  # no valid runout yet
+        result = EquityResult(*totals, confidence)
+        return result.samples >= max_samples or result.error.max() <= precision
+
+    if processes == 1:
+        for seed_sequence in seeds:
+            if add(_simulate(spec, seed_sequence, batch_size)):
+                break
+    else:
+        # keep a few batches in flight and consume them in order, so that the
+        # result is the same as sampling in a single process
+        with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+            pending = []
+            for seed_sequence in seeds:
+                pending.append(executor.submit(_simulate, spec, seed_sequence, batch_size))
+                if len(pending) < 2 * processes:
+                    continue
+                if add(pending.pop(0).result()):
+                    break
+            else:
+                while pending and not add(pending.pop(0).result()):
+                    pass
+
+            for future in pending:
+                future.cancel()
+
+    if result is None:
+        raise ValueError("No runout could be sampled: the ranges cannot be dealt together.")
+    return result
+
+
+def _suit_symmetries(masks: list[int]):
+    """Return the suit permutations leaving every group of cards unchanged
+
+    Args:
+        masks (list[int]): Bitmasks of the groups of cards
+
+    Returns:
+        np.ndarray: For each permutation, the table mapping each card id to
+        the id of the permuted card, shape (permutations, 52)
+    """
+    tables = []
+
+    for permutation in itertools.permutations(range(4)):
+        table = [permutation[id // 13] * 13 + id % 13 for id in range(N_CARDS)]
+        permuted = [sum(1 << table[card.id] for card in mask_to_cards(mask)) for mask in masks]
+        if permuted == masks:
+            tables.append(table)
+
+    return np.array(tables, dtype=np.uint8)
+
+
+def _canonical_keys(runouts: np.ndarray, symmetries: np.ndarray):
+    """Key of the smallest runout (as a sorted set) among the symmetric ones"""
+    keys = None
+
+    for table in symmetries:
+        cards = np.sort(table[runouts], axis=1).astype(np.int64)
+        permuted = (cards << (6 * np.arange(runouts.shape[1]))).sum(axis=1)
+        keys = permuted if keys is None else np.minimum(keys, permuted)
+
+    return keys
+
+
+def exact_equity(
+    players: list[Hand],
+    community: Community | None = None,
+    dead: list[Card] | None = None,
+    *,
+    batch_size: int = 1_000_000,
+):
+    """Compute the exact equity of each player enumerating all the runouts
+
+    Runouts that are equal up to a permutation of the suits that doesn't
+    change the known cards are evaluated once. The evaluation is done in
+    batches of at most batch_size runouts.
+
+    Args:
+        players (list[Hand]): Hole cards of each player
+        community (Community, optional): Community cards dealt so far (0 to 5)
+        dead (list[Card], optional): Cards that cannot be dealt anymore
+        batch_size (int, optional): Number of runouts evaluated at once
+
+    Returns:
+        ExactEquityResult: Win and tie counts and equity of each player
+    """
+    if len(players) < 2:
+        raise ValueError("At least two players are needed.")
+
+    board = community.cards if community is not None else []
+    dead = dead or []
+    groups = [cards_to_mask(hand.cards) for hand in players]
+    groups += [cards_to_mask(board), cards_to_mask(dead)]
+
+    known = 0
+    for mask in groups:
+        known |= mask
+    if len(mask_to_cards(known)) != 2 * len(players) + len(board) + len(dead):
+        raise ValueError("The same card is used more than once.")
+
+    remaining = [card.id for card in CARDS if not card.mask & known]
+    k = 5 - len(board)
+    total = math.comb(len(remaining), k)
+    runouts = np.fromiter(
+        itertools.chain.from_iterable(itertools.combinations(remaining, k)),
+        dtype=np.uint8,
+        count=total * k,
+    ).reshape(total, k)
+
+    # one representative for each class of symmetric runouts
+    keys = _canonical_keys(runouts, _suit_symmetries(groups))
+    _, index, counts = np.unique(keys, return_index=True, return_counts=True)
+    runouts = runouts[index]
+
+    holes = np.array([cards_to_ids(hand.cards) for hand in players], dtype=np.uint8)
+    fixed_board = np.array(cards_to_ids(board), dtype=np.uint8)
+    wins = np.zeros(len(players), dtype=np.int64)
+    ties = np.zeros(len(players), dtype=np.int64)
+    shares = np.zeros(len(players))
+
+    for start in range(0, len(runouts), batch_size):
+        batch = runouts[start : start + batch_size]
+        weights = counts[start : start + batch_size, None]
+        boards = np.concatenate((np.broadcast_to(fixed_board, (len(batch), len(board))), batch), axis=1)
+        strengths = np.stack(
+            [
+                evaluate_cards_batch(np.concatenate((np.broadcast_to(hole, (len(batch), 2)), boards), axis=1))
+                for hole in holes
+            ],
+            axis=1,
+        )
+
+        winners = strengths == strengths.max(axis=1, keepdims=True)
+        n_winners = winners.sum(axis=1, keepdims=True)
+        wins += (weights * (winners & (n_winners == 1))).sum(axis=0)
+        ties += (weights * (winners & (n_winners > 1))).sum(axis=0)
+        shares += (weights * winners / n_winners).sum(axis=0)
+
+    return ExactEquityResult(total, wins, ties, shares, len(runouts))
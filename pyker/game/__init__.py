@@ -0,0 +1 @@
+from pyker.game.evaluator import evaluate_batch, winners_batch
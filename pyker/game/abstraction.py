@@ -0,0 +1,189 @@
+"""Integer actions and bet abstraction
+
+Game.actions lists the available actions, with a continuous range for the
+bets, which no search can enumerate. Here actions are small integers:
+FOLD, CHECK and CALL, then one id for each bet size of a BetAbstraction,
+from FIRST_BET on. A size is the minimum bet (MIN_RAISE), all the chips
+(ALL_IN) or a fraction of the pot after calling. The legal actions of a
+State are a bitmask of ids, computed without building any list; bet sizes
+giving the same amount as a smaller one are not legal, so every legal id
+leads to a different State.
+
+The abstraction also translates ids to the arguments of Game.result (and
+Game.apply), and concrete actions back to ids: a bet that is not one of the
+sizes (off the tree) is mapped to the legal size with the closest amount.
+"""
+from pyker.game.game import Game, MutableState, State
+from pyker.game.models import *
+
+FOLD, CHECK, CALL = range(3)
+FIRST_BET = 3
+
+MIN_RAISE = "min"
+ALL_IN = "all-in"
+
+_GAME_ACTIONS = {FOLD: Action.Fold, CHECK: Action.Check, CALL: Action.Call}
+_IDS = dict((action, id) for id, action in _GAME_ACTIONS.items())
+
+
+class BetAbstraction:
+    """Bet sizes a player can choose from
+
+    Sizes must be in increasing order: MIN_RAISE first, then fractions of
+    the pot, then ALL_IN.
+
+    Args:
+        sizes (tuple, optional): The bet sizes. Defaults to the minimum bet,
+            half pot, pot and all-in.
+    """
+
+    def __init__(self, sizes: tuple = (MIN_RAISE, 0.5, 1.0, ALL_IN)):
+        if not sizes:
+            raise ValueError("A bet abstraction needs at least one bet size.")
+        fractions = [size for size in sizes if size not in (MIN_RAISE, ALL_IN)]
+        if any(not isinstance(size, (int, float)) or size <= 0 for size in fractions):
+            raise ValueError("Bet sizes are MIN_RAISE, ALL_IN or positive fractions of the pot.")
+        ordered = [MIN_RAISE] * (MIN_RAISE in sizes) + sorted(set(fractions)) + [ALL_IN] * (ALL_IN in sizes)
+        if list(sizes) != ordered:
+            raise ValueError("Bet sizes must be distinct and in increasing order.")
+
+        self.sizes = tuple(sizes)
+        self.n_actions = FIRST_BET + len(self.sizes)
+        self._min_raise = MIN_RAISE in sizes
+        self._fractions = tuple(fractions)
+        self._all_in = ALL_IN in sizes
+
+    def __repr__(self):
+        return f"BetAbstraction({self.sizes})"
+
+    def bet_amount(self, size, pot: int, lowest: int, highest: int):
+        """Amount of a bet size, between the lowest and the highest bet
+
+        Args:
+            size: A size of the abstraction
+            pot (int): Pot after the player calls
+            lowest (int): Lowest possible bet
+            highest (int): Highest possible bet (all the chips after calling)
+        """
+        if size == MIN_RAISE:
+            return lowest
+        if size == ALL_IN:
+            return highest
+        return min(max(round(size * pot), lowest), highest)
+
+    def legal_mask(self, state: State):
+        """Bitmask of the ids of the actions available to the current player"""
+        seat = state.players.seats[state.current_player]
+        chips = state.chips_by_seat[seat]
+        to_call = state.highest_bet - state.round_bets[seat]
+
+        mask = 1 << CHECK if to_call == 0 else 1 << FOLD | 1 << CALL
+        if chips > to_call:
+            highest = chips - to_call
+            lowest = min(state.min_allowed_bet, highest)
+            pot = state.get_pot() + to_call
+            bit = 1 << FIRST_BET
+            last = 0
+            if self._min_raise:
+                mask |= bit
+                bit <<= 1
+                last = lowest
+            for fraction in self._fractions:
+                amount = round(fraction * pot)
+                if amount < lowest:
+                    amount = lowest
+                elif amount > highest:
+                    amount = highest
+                if amount > last:
+                    mask |= bit
+                    last = amount
+                bit <<= 1
+            if self._all_in and highest > last:
+                mask |= bit
+        return mask
+
+    def is_legal(self, state: State, action: int):
+        return self.legal_mask(state) >> action & 1 == 1
+
+    def to_game(self, state: State, action: int):
+        """Arguments of Game.result for an action id
+
+        Raises:
+            ValueError: If the action is not legal in the state
+
+        Returns:
+            tuple[Action, int, tuple[int, int]]: The action, the amount and
+            the range of the bets (0 and (0, 0) if the action is not a bet)
+        """
+        if not self.is_legal(state, action):
+            raise ValueError(f"The action {self.describe(action)} is not available.")
+        if action < FIRST_BET:
+            return _GAME_ACTIONS[action], 0, (0, 0)
+
+        seat = state.players.seats[state.current_player]
+        to_call = state.highest_bet - state.round_bets[seat]
+        highest = state.chips_by_seat[seat] - to_call
+        lowest = min(state.min_allowed_bet, highest)
+        amount = self.bet_amount(self.sizes[action - FIRST_BET], state.get_pot() + to_call, lowest, highest)
+        return Action.BetOrRaise, amount, (lowest, highest)
+
+    def result(self, game: Game, state: State, action: int):
+        """Play an action id with Game.result"""
+        game_action, amount, bet_range = self.to_game(state, action)
+        return game.result(state, game_action, amount=amount, range=bet_range)
+
+    def apply(self, game: Game, state: MutableState, action: int):
+        """Play an action id with Game.apply, returning the UndoRecord"""
+        game_action, amount, bet_range = self.to_game(state, action)
+        return game.apply(state, game_action, amount=amount, range=bet_range)
+
+    def from_game(self, state: State, action: Action, amount: int = 0):
+        """Id of a concrete action
+
+        A bet is mapped to the legal bet size with the closest amount (the
+        smaller one in case of a tie).
+
+        Raises:
+            ValueError: If the action is not available in the state
+        """
+        mask = self.legal_mask(state)
+        if action is not Action.BetOrRaise:
+            id = _IDS[action]
+            if not mask >> id & 1:
+                raise ValueError(f"The action {action} is not available.")
+            return id
+
+        seat = state.players.seats[state.current_player]
+        to_call = state.highest_bet - state.round_bets[seat]
+        highest = state.chips_by_seat[seat] - to_call
+        lowest = min(state.min_allowed_bet, highest)
+        if highest <= 0:
+            raise ValueError(f"The action {action} is not available.")
+        pot = state.get_pot() + to_call
+
+        closest = None
+        for i, size in enumerate(self.sizes):
+            if mask >> (FIRST_BET + i) & 1:
+                distance = abs(self.bet_amount(size, pot, lowest, highest) - amount)
+                if closest is None or distance < closest[0]:
+                    closest = (distance, FIRST_BET + i)
+        if closest is None:
+            raise ValueError(f"No bet size of {self} is available.")
+        return closest[1]
+
+    def describe(self, action: int):
+        """Name of an action id"""
+        if action < FIRST_BET:
+            return str(_GAME_ACTIONS[action])
+        size = self.sizes[action - FIRST_BET]
+        if size in (MIN_RAISE, ALL_IN):
+            return f"bet {size}"
+        return f"bet {size:g} pot"
+
+
+def iter_actions(mask: int):
+    """Ids of the actions in a bitmask, in increasing order"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
@@ -0,0 +1,417 @@
+"""Many tables played in lockstep with NumPy
+
+BatchGame keeps the state of n tables as arrays with a row per table (and a
+column per seat): chips, bets, folded and active seats, round, dealer,
+current player and the cards. step plays one action at every table at
+once, following the rules of Game.result and Game.end, and a table whose
+play ended starts the next one right away (or a new game, when less than
+two players have chips left). A play in which nobody can bet, as the
+blinds went all-in, is dealt out and ended at once, as Game.initial_state
+does.
+
+Actions are given as codes, the indexes of the actions in ACTIONS, so the
+legal actions of the tables are a boolean array with a column per code.
+
+Every table has its own RandomStream, used as a Game uses its own: a table
+and a Game with generators built from the same seed deal the same cards.
+"""
+import numpy as np
+
+from pyker.game.evaluator import evaluate_batch
+from pyker.game.models import *
+from pyker.game.rng import RandomStream
+
+ACTIONS = (Action.BetOrRaise, Action.Call, Action.Check, Action.Fold)
+BET_OR_RAISE, CALL, CHECK, FOLD = range(len(ACTIONS))
+NO_SEAT = -1
+
+
+def _next_seats(eligible: np.ndarray, start: np.ndarray):
+    """First eligible seat after start at each table, start if there is none (as Players.next_to)"""
+    n, n_seats = eligible.shape
+    candidates = (start[:, None] + np.arange(1, n_seats)) % n_seats
+    found = eligible[np.arange(n)[:, None], candidates]
+    first = candidates[np.arange(n), found.argmax(axis=1)]
+    return np.where(found.any(axis=1), first, start)
+
+
+def _previous_seats(eligible: np.ndarray, start: np.ndarray):
+    """First eligible seat before start at each table, start if there is none (as Players.previous_than)"""
+    n, n_seats = eligible.shape
+    candidates = (start[:, None] - np.arange(1, n_seats)) % n_seats
+    found = eligible[np.arange(n)[:, None], candidates]
+    first = candidates[np.arange(n), found.argmax(axis=1)]
+    return np.where(found.any(axis=1), first, start)
+
+
+class BatchGame:
+    """Tables with the same number of seats, played in lockstep
+
+    Seats are columns, and a missing seat (e.g. no last better) is NO_SEAT.
+
+    Attributes:
+        stacks (np.ndarray): Chips of each seat at the start of the play
+        chips (np.ndarray): Chips of each seat, minus its bets of the play
+        round_bets (np.ndarray): Bets of each seat in the current round
+        contributions (np.ndarray): Bets of each seat in the play
+        active (np.ndarray): Seats of the players still in the game
+        folded (np.ndarray): Seats of the players who folded
+        holes (np.ndarray): Ids of the hole cards, with shape (n, seats, 2)
+        board (np.ndarray): Ids of the 5 community cards of the play, of
+            which the first n_board are dealt
+        n_board (np.ndarray): Number of community cards dealt
+        strengths (np.ndarray): Strength of the hand of each active seat
+        street (np.ndarray): Round of each table
+        dealer, current, round_last_player, round_last_better (np.ndarray):
+            Seats of the dealer, of the current player and of the last
+            player and better of the round
+        min_allowed_bet (np.ndarray): Minimum bet of each table
+        winners (np.ndarray): Winners of the last layer of the pot of the
+            last play ended at each table
+        hands (np.ndarray): Plays ended at each table
+        games (np.ndarray): Games started at each table
+        rngs (list[RandomStream]): Generator of each table
+    """
+
+    def __init__(
+        self,
+        n_tables: int,
+        n_players: int = 6,
+        seed: int | list | None = None,
+        starting_chips: int = 2000,
+    ):
+        """Create the tables and deal their first play
+
+        Args:
+            n_tables (int): Number of tables
+            n_players (int, optional): Seats at each table
+            seed (int | list, optional): Master seed, from which the
+                generators of the tables are spawned, or the seed of each table
+            starting_chips (int, optional): Chips of each player at the
+                start of a game
+        """
+        if n_players < 2:
+            raise ValueError("A table needs at least two players.")
+        if starting_chips <= blinds_table[0]["small"]:
+            # the blinds would go all-in at every play
+            raise ValueError("The players must start with more chips than the small blind.")
+
+        if isinstance(seed, (list, tuple)):
+            if len(seed) != n_tables:
+                raise ValueError(f"{len(seed)} seeds were given for {n_tables} tables.")
+            self.rngs = [RandomStream(table_seed) for table_seed in seed]
+        else:
+            self.rngs = RandomStream(seed).spawn(n_tables)
+
+        self.n_tables = n_tables
+        self.n_players = n_players
+        self.starting_chips = starting_chips
+        self._tables = np.arange(n_tables)
+
+        shape = (n_tables, n_players)
+        self.stacks = np.zeros(shape, dtype=np.int64)
+        self.chips = np.zeros(shape, dtype=np.int64)
+        self.round_bets = np.zeros(shape, dtype=np.int64)
+        self.contributions = np.zeros(shape, dtype=np.int64)
+        self.active = np.zeros(shape, dtype=bool)
+        self.folded = np.zeros(shape, dtype=bool)
+        self.holes = np.zeros((n_tables, n_players, 2), dtype=np.uint8)
+        self.board = np.zeros((n_tables, 5), dtype=np.uint8)
+        self.n_board = np.zeros(n_tables, dtype=np.int64)
+        self.strengths = np.zeros(shape, dtype=np.int32)
+        self.street = np.zeros(n_tables, dtype=np.int64)
+        self.dealer = np.zeros(n_tables, dtype=np.int64)
+        self.current = np.zeros(n_tables, dtype=np.int64)
+        self.round_last_player = np.zeros(n_tables, dtype=np.int64)
+        self.round_last_better = np.full(n_tables, NO_SEAT, dtype=np.int64)
+        self.min_allowed_bet = np.zeros(n_tables, dtype=np.int64)
+        self.winners = np.zeros(shape, dtype=bool)
+        self.hands = np.zeros(n_tables, dtype=np.int64)
+        self.games = np.zeros(n_tables, dtype=np.int64)
+
+        self._end_plays(self._new_games(self._tables), np.zeros(shape, dtype=np.int64))
+
+    def _to_call(self):
+        """Amount to call and chips of the current player of each table"""
+        current_bets = self.round_bets[self._tables, self.current]
+        return self.round_bets.max(axis=1) - current_bets, self.chips[self._tables, self.current]
+
+    def legal_actions(self):
+        """Actions available to the current player of each table (as Game.actions)
+
+        Returns:
+            np.ndarray: Boolean array with shape (n, len(ACTIONS))
+        """
+        to_call, player_chips = self._to_call()
+        legal = np.empty((self.n_tables, len(ACTIONS)), dtype=bool)
+        legal[:, CHECK] = to_call == 0
+        legal[:, CALL] = legal[:, FOLD] = to_call != 0
+        legal[:, BET_OR_RAISE] = player_chips > to_call
+        return legal
+
+    def bet_ranges(self):
+        """Lowest and highest bet of the current player of each table
+
+        Only meaningful at the tables where BET_OR_RAISE is legal.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The lowest and the highest bets
+        """
+        to_call, player_chips = self._to_call()
+        highest = player_chips - to_call
+        return np.minimum(self.min_allowed_bet, highest), highest
+
+    def step(self, actions, amounts=None):
+        """Play an action at every table
+
+        Args:
+            actions (array_like): Code of the action of each table
+            amounts (array_like, optional): Amount bet at each table, used
+                only where the action is BET_OR_RAISE
+
+        Raises:
+            ValueError: If an action is not legal, or an amount cannot be bet
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The tables whose play ended, and
+            the chips won (or lost) by each seat in the plays that ended
+            (with the next ones, when they were dealt out at once)
+        """
+        tables = self._tables
+        actions = np.asarray(actions, dtype=np.int64)
+        if amounts is None:
+            amounts = np.zeros(self.n_tables, dtype=np.int64)
+        amounts = np.asarray(amounts, dtype=np.int64)
+
+        if not self.legal_actions()[tables, actions].all():
+            raise ValueError("An action is not available at its table.")
+        bets = actions == BET_OR_RAISE
+        lowest, highest = self.bet_ranges()
+        if (bets & ((amounts < lowest) | (amounts > highest))).any():
+            raise ValueError("This amount cannot be bet.")
+
+        seats = self.current
+        to_call, player_chips = self._to_call()
+        # players who can't act: they folded or they are all-in (before this action)
+        all_in = self.active & (self.chips == 0)
+        could_not_act = self.folded | all_in
+
+        # the action closes at the last better or, if the better can't act
+        # anymore (all-in), at the first player after the better who can
+        has_better = self.round_last_better != NO_SEAT
+        betters = np.where(has_better, self.round_last_better, 0)
+        closers = np.where(
+            has_better & could_not_act[tables, betters],
+            _next_seats(self.active & ~could_not_act, betters),
+            self.round_last_better,
+        )
+
+        paid = np.where(bets | (actions == CALL), np.minimum(to_call, player_chips), 0)
+        paid += np.where(bets, amounts, 0)
+        self.round_bets[tables, seats] += paid
+        self.contributions[tables, seats] += paid
+        self.chips[tables, seats] -= paid
+        self.folded[tables, seats] |= actions == FOLD
+
+        skip = self.folded | all_in
+        next_players = _next_seats(self.active & ~skip, seats)
+
+        # determine the passage to the next round
+        n_players = self.active.sum(axis=1)
+        one_player_remained = n_players - self.folded.sum(axis=1) == 1
+        advance = (
+            ((self.round_last_better == NO_SEAT) & (self.round_last_player == seats) & ~bets)
+            | ((next_players == closers) & ~bets)
+            | one_player_remained
+            | (next_players == seats)
+        )
+        self.round_last_better = np.where(bets, seats, self.round_last_better)
+        self.min_allowed_bet = np.where(bets, amounts, self.min_allowed_bet)
+        self.street += advance
+
+        # the player may have gone all-in with this action
+        skip |= self.active & (self.chips == 0)
+        # nobody can bet anymore: deal the remaining cards and end
+        players_with_chips = n_players - (skip & self.active).sum(axis=1)
+        ends = advance & ((self.street == Round.End) | one_player_remained | (players_with_chips <= 1))
+
+        new_rounds = np.flatnonzero(advance & ~ends)
+        if new_rounds.size:
+            eligible = self.active[new_rounds] & ~skip[new_rounds]
+            dealers = self.dealer[new_rounds]
+            next_players[new_rounds] = _next_seats(eligible, dealers)
+            self.round_last_player[new_rounds] = np.where(
+                eligible[np.arange(new_rounds.size), dealers], dealers, _previous_seats(eligible, dealers)
+            )
+            self.round_last_better[new_rounds] = NO_SEAT
+            self.round_bets[new_rounds] = 0
+            n_board = self.n_board[new_rounds]
+            self.n_board[new_rounds] = np.where(n_board == 0, 3, n_board + 1)
+        self.current = next_players
+
+        deltas = np.zeros((self.n_tables, self.n_players), dtype=np.int64)
+        self._end_plays(np.flatnonzero(ends), deltas)
+        return ends, deltas
+
+    def _end_plays(self, tables: np.ndarray, deltas: np.ndarray):
+        """End the plays of some tables and start their next plays
+
+        A next play dealt out at once (see _deal) is ended too, and the
+        chips won (or lost) in every play are added to deltas.
+        """
+        while tables.size:
+            self.n_board[tables] = 5
+            stacks = self.stacks[tables]
+            self._payout(tables)
+            deltas[tables] += self.chips[tables] - stacks
+            self.hands[tables] += 1
+            tables = self._next_plays(tables)
+
+    def _payout(self, tables: np.ndarray):
+        """Distribute the pots of some tables, one layer (side pot) at a time (as Game.end)"""
+        n = tables.size
+        total_bets = self.contributions[tables].copy()
+        chips = self.chips[tables]
+        strengths = self.strengths[tables]
+        playing = self.active[tables] & ~self.folded[tables]
+        winners = np.zeros_like(playing)
+
+        # the odd chips go to the first winners after the dealer
+        order = (np.arange(self.n_players) - self.dealer[tables, None] - 1) % self.n_players
+        before = order[:, None, :] < order[:, :, None]
+
+        for _ in range(self.n_players):
+            bettors = total_bets > 0
+            layers = bettors.any(axis=1)
+            if not layers.any():
+                break
+
+            # players that could win the layer, or everyone still playing
+            # when only players who folded are left in it
+            ending = playing & bettors
+            ending[~ending.any(axis=1)] = playing[~ending.any(axis=1)]
+            ending_strengths = np.where(ending, strengths, -1)
+            layer_winners = ending & (ending_strengths == ending_strengths.max(axis=1, keepdims=True))
+            layer_winners &= layers[:, None]
+
+            min_bets = np.where(bettors, total_bets, np.iinfo(np.int64).max).min(axis=1)
+            pots = np.where(layers, min_bets * bettors.sum(axis=1), 0)
+            shares, odd_chips = np.divmod(pots, np.maximum(layer_winners.sum(axis=1), 1))
+            rank = (before & layer_winners[:, None, :]).sum(axis=2)
+            chips += np.where(layer_winners, shares[:, None] + (rank < odd_chips[:, None]), 0)
+
+            total_bets -= np.where(bettors, min_bets[:, None], 0)
+            winners = np.where(layers[:, None], layer_winners, winners)
+
+        self.chips[tables] = chips
+        self.stacks[tables] = chips
+        self.round_bets[tables] = 0
+        self.contributions[tables] = 0
+        self.winners[tables] = winners
+        self.street[tables] = Round.End
+
+    def _next_plays(self, tables: np.ndarray):
+        """Start the next play of some tables whose play ended
+
+        Returns:
+            np.ndarray: The tables whose play was dealt out at once
+        """
+        chips = self.chips[tables]
+        endgame = (self.active[tables] & (chips > 0)).sum(axis=1) < 2
+
+        tables, new_games = tables[~endgame], tables[endgame]
+        # remove the losers and move the dealer button
+        self.active[tables] &= self.chips[tables] > 0
+        dealers = _next_seats(self.active[tables], self.dealer[tables])
+        return np.concatenate((self._deal(tables, dealers), self._new_games(new_games)))
+
+    def _new_games(self, tables: np.ndarray):
+        """Start a new game at some tables
+
+        Returns:
+            np.ndarray: The tables whose play was dealt out at once
+        """
+        self.active[tables] = True
+        self.stacks[tables] = self.starting_chips
+        self.chips[tables] = self.starting_chips
+        self.games[tables] += 1
+        dealers = np.array([self.rngs[table].randint(0, self.n_players - 1) for table in tables], dtype=np.int64)
+        return self._deal(tables, dealers)
+
+    def _deal(self, tables: np.ndarray, dealers: np.ndarray):
+        """Deal the cards of a new play at some tables and pay the blinds (as Game.initial_state)
+
+        Returns:
+            np.ndarray: The tables where nobody can bet, whose play has to
+            be dealt out at once
+        """
+        if not tables.size:
+            return tables
+        active = self.active[tables]
+        n_active = active.sum(axis=1)
+        width = 2 * self.n_players + 5
+
+        # draw the cards of the play from the generator of each table
+        cards = bytearray()
+        for table, n in zip(tables.tolist(), n_active.tolist()):
+            deck = Deck(self.rngs[table])
+            deck.shuffle(2 * n + 5)
+            cards += deck.ids[:width]
+        cards = np.frombuffer(cards, dtype=np.uint8).reshape(tables.size, width)
+
+        # the hole cards are dealt starting after the dealer: each active
+        # seat gets the two cards at its position in that order
+        order = (np.arange(self.n_players) - dealers[:, None] - 1) % self.n_players
+        order = np.where(active, order, self.n_players)
+        positions = order.argsort(axis=1).argsort(axis=1)
+        rows, columns = np.nonzero(active)
+        dealt = 2 * positions[rows, columns, None] + np.arange(2)
+        self.holes[tables[rows], columns] = cards[rows[:, None], dealt]
+        self.board[tables] = cards[np.arange(tables.size)[:, None], 2 * n_active[:, None] + np.arange(5)]
+
+        strengths = self.strengths[tables]
+        strengths[rows, columns] = evaluate_batch(self.holes[tables[rows], columns], self.board[tables[rows]])
+        self.strengths[tables] = strengths
+
+        # set and pay blinds
+        rows = np.arange(tables.size)
+        small_blinds = _next_seats(active, dealers)
+        big_blinds = _next_seats(active, small_blinds)
+        stacks = self.stacks[tables]
+        bets = np.zeros_like(stacks)
+        bets[rows, small_blinds] = np.minimum(blinds_table[0]["small"], stacks[rows, small_blinds])
+        bets[rows, big_blinds] = np.minimum(blinds_table[0]["big"], stacks[rows, big_blinds])
+
+        self.round_bets[tables] = bets
+        self.contributions[tables] = bets
+        self.chips[tables] = stacks - bets
+        self.folded[tables] = False
+        self.n_board[tables] = 0
+        self.street[tables] = Round.PreFlop
+        self.dealer[tables] = dealers
+        # blinds who are all-in can't act
+        can_act = active & (stacks > bets)
+        self.current[tables] = _next_seats(can_act, big_blinds)
+        self.round_last_player[tables] = np.where(
+            can_act[rows, big_blinds], big_blinds, _previous_seats(can_act, big_blinds)
+        )
+        self.round_last_better[tables] = NO_SEAT  # blinds are treated as exceptions
+        self.min_allowed_bet[tables] = blinds_table[0]["big"]
+
+        # nobody can act, or one player can but has nothing to call
+        n_can_act = can_act.sum(axis=1)
+        to_call = bets.max(axis=1) - bets[rows, self.current[tables]]
+        return tables[(n_can_act == 0) | ((n_can_act == 1) & (to_call == 0))]
+
+
+def random_actions(game: BatchGame, rng: np.random.Generator):
+    """Choose uniformly one of the legal actions at each table, and the amount of the bets
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The codes of the actions and the amounts
+    """
+    legal = game.legal_actions()
+    actions = np.where(legal, rng.random(legal.shape), -1).argmax(axis=1)
+    lowest, highest = game.bet_ranges()
+    amounts = rng.integers(lowest, np.maximum(lowest, highest), endpoint=True)
+    return actions, np.where(actions == BET_OR_RAISE, amounts, 0)
@@ -0,0 +1,223 @@
+"""Compact binary encoding of states and action sequences
+
+A State is encoded in a fixed layout of STATE_SIZE bytes (little endian):
+a header with the round, the seats of the dealer, of the current player and
+of the last player and better of the round, the flags, the masks of the
+active seats, of the players who folded and of the winners, and the minimum
+bet; then the deck (card ids and cursor), the community cards, the hole
+cards of each seat (255 when missing) and the stacks, round bets and bets of
+the play of each seat. Seats are padded to MAX_SEATS.
+
+The players are not encoded: a state is decoded given the starting players
+of its table. Decoding reads straight from any buffer (bytes, bytearray,
+memoryview, mmap) at an offset, so records packed one after another are
+decoded without slicing.
+
+Two things are not encoded. The generator of the deck is not: the decoded
+deck shuffles the positions not drawn yet with the generator given to
+decode_state (the global one of the random module by default), so it only
+deals the same cards as the original deck when that generator is in the same
+state. The side pots of final states are not either: State.side_pots of a
+decoded state is None.
+
+An action is encoded in ACTION_SIZE bytes: its code and the amount.
+"""
+import random
+import struct
+
+from pyker.game.game import State
+from pyker.game.models import *
+
+MAGIC = b"PKST"
+VERSION = 1
+MAX_SEATS = 10
+NO_SEAT = 255
+NO_CARD = 255
+
+_HEADER_FORMAT = "<4sBBBBBBBBBBBxHHHHI"
+STATE = struct.Struct(
+    _HEADER_FORMAT + f"{N_CARDS}s5s{2 * MAX_SEATS}s{MAX_SEATS}I{MAX_SEATS}I{MAX_SEATS}I"
+)
+STATE_SIZE = STATE.size
+
+ACTION = struct.Struct("<BI")
+ACTION_SIZE = ACTION.size
+
+_ACTION_CODES = dict((action, action.value) for action in Action)
+
+_INITIAL = 1
+_FINAL = 2
+
+_ROUNDS = dict((round.value, round) for round in Round)
+_NO_HOLES = bytes([NO_CARD]) * (2 * MAX_SEATS)
+
+
+def _seat(players: Players, player: Player | None):
+    return NO_SEAT if player is None else players.seats[player]
+
+
+def _player(players: Players, seat: int):
+    return None if seat == NO_SEAT else players.starting[seat]
+
+
+def _padded(values, n_seats: int):
+    return list(values) + [0] * (MAX_SEATS - n_seats)
+
+
+def _values(state: State):
+    """Values of the fields of the layout of a state"""
+    players = state.players
+    n_seats = players.get_n_starting()
+    if n_seats > MAX_SEATS:
+        raise ValueError(f"States with more than {MAX_SEATS} seats cannot be encoded.")
+
+    holes = bytearray(_NO_HOLES)
+    seats = players.seats
+    for player, hand in state.hands.items():
+        seat = 2 * seats[player]
+        holes[seat] = hand.cards[0].id
+        holes[seat + 1] = hand.cards[1].id
+
+    community = bytes([card.id for card in state.community.cards])
+    flags = (_INITIAL if state.is_initial else 0) | (_FINAL if state.is_final else 0)
+    winners = players.mask_of(state.winners) if state.winners is not None else 0
+
+    return (
+        MAGIC,
+        VERSION,
+        n_seats,
+        state.current_round,
+        _seat(players, state.dealer),
+        _seat(players, state.current_player),
+        _seat(players, state.round_last_player),
+        _seat(players, state.round_last_better),
+        flags,
+        state.deck.cursor,
+        state.deck.shuffled,
+        len(state.community.cards),
+        players.active_mask,
+        state.folded,
+        winners,
+        state.blinds_level,
+        state.min_allowed_bet,
+        bytes(state.deck.ids),
+        community,
+        holes,
+        *_padded(state.stacks, n_seats),
+        *_padded(state.round_bets, n_seats),
+        *_padded(state.contributions, n_seats),
+    )
+
+
+def encode_state(state: State):
+    """Return the STATE_SIZE bytes encoding a state"""
+    return STATE.pack(*_values(state))
+
+
+def encode_state_into(state: State, buffer, offset: int = 0):
+    """Write the encoding of a state in a writable buffer, at an offset"""
+    STATE.pack_into(buffer, offset, *_values(state))
+
+
+def decode_state(buffer, players: list[Player] | Players, offset: int = 0, rng: random.Random | None = None):
+    """Decode a state from a buffer
+
+    Args:
+        buffer: Bytes-like object holding the encoding (e.g. a memoryview)
+        players (list[Player] | Players): Starting players of the table of the
+            state. A Players with the same active seats is shared by the state.
+        offset (int, optional): Position of the encoding in the buffer
+        rng (random.Random, optional): Generator the decoded deck shuffles
+            with. Defaults to the global one of the random module.
+
+    Raises:
+        ValueError: If the buffer does not hold a state of the current version
+
+    Returns:
+        State: The decoded state
+    """
+    values = STATE.unpack_from(buffer, offset)
+    (
+        magic,
+        version,
+        n_seats,
+        current_round,
+        dealer,
+        current_player,
+        round_last_player,
+        round_last_better,
+        flags,
+        cursor,
+        shuffled,
+        n_community,
+        active_mask,
+        folded,
+        winners,
+        blinds_level,
+        min_allowed_bet,
+        deck_ids,
+        community_ids,
+        holes,
+    ) = values[:20]
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("The buffer does not hold an encoded state of the current version.")
+
+    if isinstance(players, Players):
+        if players.active_mask != active_mask:
+            players = Players.with_active(players.starting, active_mask)
+    else:
+        players = Players.with_active(players, active_mask)
+    if players.get_n_starting() != n_seats:
+        raise ValueError(f"The state has {n_seats} seats, not {players.get_n_starting()}.")
+
+    deck = Deck.__new__(Deck)
+    deck.rng = rng
+    deck.ids = bytearray(deck_ids)
+    deck.cursor = cursor
+    deck.shuffled = shuffled
+
+    community = Community()
+    community.cards = [CARDS[id] for id in community_ids[:n_community]]
+
+    hands = {}
+    for seat, player in enumerate(players.starting):
+        if holes[2 * seat] != NO_CARD:
+            hands[player] = Hand([CARDS[holes[2 * seat]], CARDS[holes[2 * seat + 1]]])
+
+    stacks = values[20 : 20 + n_seats]
+    round_bets = values[20 + MAX_SEATS : 20 + MAX_SEATS + n_seats]
+    contributions = values[20 + 2 * MAX_SEATS : 20 + 2 * MAX_SEATS + n_seats]
+
+    return State(
+        players,
+        deck,
+        _ROUNDS[current_round],
+        _player(players, current_player),
+        stacks,
+        round_bets,
+        contributions,
+        hands,
+        community,
+        folded,
+        _player(players, round_last_player),
+        _player(players, round_last_better),
+        min_allowed_bet,
+        _player(players, dealer),
+        blinds_level,
+        bool(flags & _INITIAL),
+        bool(flags & _FINAL),
+        [player for seat, player in enumerate(players.starting) if winners >> seat & 1] if flags & _FINAL else None,
+    )
+
+
+def encode_actions(actions: list[tuple[Action, int]]):
+    """Encode a sequence of (action, amount) pairs, ACTION_SIZE bytes each"""
+    buffer = bytearray(ACTION_SIZE * len(actions))
+    for i, (action, amount) in enumerate(actions):
+        ACTION.pack_into(buffer, i * ACTION_SIZE, _ACTION_CODES[action], amount)
+    return bytes(buffer)
+
+
+def decode_actions(buffer):
+    """Decode a sequence of (action, amount) pairs from a buffer"""
+    return [(Action(code), amount) for code, amount in ACTION.iter_unpack(buffer)]
@@ -0,0 +1,90 @@
+"""Indexing of the 1326 possible two-card hands (combos)
+
+Combos are indexed in lexicographic order of the ids of their two cards
+(smaller id first), so combo 0 is (0, 1) and combo 1325 is (50, 51).
+
+The 169 classes of starting hands (pairs, suited and offsuit hands) are
+laid out on a 13x13 grid indexed by rank (0 is 2, 12 is Ace): pairs on the
+diagonal, suited hands at (high, low) and offsuit hands at (low, high).
+"""
+import numpy as np
+
+from pyker.game.models import *
+
+N_COMBOS = 1326
+N_CLASSES = 169
+
+# card ids of each combo, shape (1326, 2)
+COMBOS = np.array(
+    [(i, j) for i in range(N_CARDS) for j in range(i + 1, N_CARDS)], dtype=np.uint8
+)
+
+# combo index of each pair of card ids (-1 for the same card twice)
+COMBO_INDEX = np.full((N_CARDS, N_CARDS), -1, dtype=np.int16)
+COMBO_INDEX[COMBOS[:, 0], COMBOS[:, 1]] = np.arange(N_COMBOS)
+COMBO_INDEX[COMBOS[:, 1], COMBOS[:, 0]] = np.arange(N_COMBOS)
+
+COMBO_MASKS = np.left_shift(np.uint64(1), COMBOS[:, 0].astype(np.uint64)) | np.left_shift(
+    np.uint64(1), COMBOS[:, 1].astype(np.uint64)
+)
+
+RANK_CHARS = "23456789TJQKA"
+
+
+def combo_index(card1: Card, card2: Card):
+    """Return the index of the combo made by two cards"""
+    index = COMBO_INDEX[card1.id, card2.id]
+    if index < 0:
+        raise ValueError("A combo is made by two different cards.")
+    return int(index)
+
+
+def combo_cards(index: int):
+    """Return the two cards of a combo"""
+    return [Card.from_id(int(id)) for id in COMBOS[index]]
+
+
+def _class_of(id1: int, id2: int):
+    rank1, rank2 = id1 % 13, id2 % 13
+    high, low = max(rank1, rank2), min(rank1, rank2)
+    if id1 // 13 == id2 // 13:
+        return high * 13 + low
+    return low * 13 + high
+
+
+# class of each combo
+CLASS_OF_COMBO = np.array([_class_of(i, j) for i, j in COMBOS.tolist()], dtype=np.uint8)
+
+
+def hand_class(card1: Card, card2: Card):
+    """Return the index in [0, 169) of the class of a starting hand"""
+    return _class_of(card1.id, card2.id)
+
+
+def class_name(index: int):
+    """Return the usual name of a class (e.g. "AKs", "T9o", "QQ")"""
+    row, col = divmod(index, 13)
+    if row == col:
+        return RANK_CHARS[row] * 2
+    if row > col:
+        return RANK_CHARS[row] + RANK_CHARS[col] + "s"
+    return RANK_CHARS[col] + RANK_CHARS[row] + "o"
+
+
+def class_index(name: str):
+    """Return the index of a class given its name (e.g. "AKs", "T9o", "QQ")"""
+    high, low = RANK_CHARS.index(name[0].upper()), RANK_CHARS.index(name[1].upper())
+    if high < low:
+        high, low = low, high
+    if high == low:
+        return high * 13 + low
+    if name[2:].lower() == "s":
+        return high * 13 + low
+    if name[2:].lower() == "o":
+        return low * 13 + high
+    raise ValueError("A class that is not a pair must end with 's' or 'o'.")
+
+
+def class_combos(index: int):
+    """Return the indexes of the combos of a class (6 pairs, 4 suited, 12 offsuit)"""
+    return np.flatnonzero(CLASS_OF_COMBO == index)
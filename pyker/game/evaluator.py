@@ -0,0 +1,414 @@
+"""Table-driven evaluation of poker hands
+
+A hand of 5 to 7 cards is turned into a single integer strength: the higher
+the strength, the better the hand. The strength packs the HandRank in the
+high bits and the ranks that break ties (high cards first, then kickers) in
+4-bit slots below it, so strengths of the same HandRank compare exactly as
+the rules of Poker say.
+
+Evaluation uses three precomputed tables:
+    - FLUSH: indexed by the 13-bit rank mask of a suit, gives the best
+      flush or straight flush made by those ranks.
+    - STRAIGHT_HIGH: indexed by a 13-bit rank mask, gives the rank index of
+      the highest straight made by those ranks (0 when there isn't one).
+    - NOFLUSH: indexed through a perfect hash of the multiset of ranks,
+      gives the best hand that can be made ignoring suits.
+
+Every card id is mapped to a key whose high bits hold 5 ** rank_index (a base-5
+digit per rank, so the sum of the keys identifies the multiset of ranks)
+and whose low 12 bits hold a 3-bit counter per suit. Summing the keys of the
+cards is enough to know whether there is a flush and, if not, to look up the
+strength of the hand.
+
+The same tables are also kept as NumPy arrays, used by evaluate_batch and
+winners_batch to evaluate many hands at once without Python loops.
+
+Building the tables takes close to a second, so importing the module does not
+build them: the first evaluation does (or build_tables, for instance before
+forking workers that share them).
+"""
+import numpy as np
+
+from pyker.game.models import *
+
+N_RANKS = 13
+RANKS_MASK = (1 << N_RANKS) - 1
+SUIT_BITS = 12
+SUIT_MASK = (1 << SUIT_BITS) - 1
+
+CATEGORY_SHIFT = 20
+
+# perfect hash parameters: the table has 2 ** TABLE_BITS slots and the keys
+# are split into 2 ** BUCKET_BITS buckets, each with its own displacement
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+HASH_MASK = (1 << 64) - 1
+TABLE_BITS = 17
+BUCKET_BITS = 15
+BUCKET_SHIFT = 64 - BUCKET_BITS
+TABLE_MASK = (1 << TABLE_BITS) - 1
+
+
+def encode(hand_rank: HandRank, ranks: list[int]):
+    """Pack a HandRank and the ranks used for tie-breaking in a strength
+
+    Args:
+        hand_rank (HandRank): Category of the hand
+        ranks (list[int]): Up to five rank values (2-14), most significant first
+
+    Returns:
+        int: The strength of the hand
+    """
+    strength = hand_rank << CATEGORY_SHIFT
+    shift = 16
+    for rank in ranks:
+        strength |= rank << shift
+        shift -= 4
+    return int(strength)
+
+
+def get_hand_rank(strength: int):
+    """Return the HandRank of a strength"""
+    return HandRank(strength >> CATEGORY_SHIFT)
+
+
+def get_ranks(strength: int):
+    """Return the ranks packed in a strength, most significant first"""
+    ranks = [(strength >> (16 - 4 * i)) & 0xF for i in range(5)]
+    return [Rank(rank) for rank in ranks if rank]
+
+
+def _popcount(mask: int):
+    return bin(mask).count("1")
+
+
+def _rank_indexes(mask: int):
+    """Rank indexes of the bits of mask, from the highest"""
+    return [i for i in range(N_RANKS - 1, -1, -1) if mask >> i & 1]
+
+
+def _build_straight_high():
+    table = [0] * (1 << N_RANKS)
+    wheel = (1 << 12) | 0b1111  # A-2-3-4-5
+
+    for mask in range(1 << N_RANKS):
+        for high in range(N_RANKS - 1, 3, -1):
+            window = 0b11111 << (high - 4)
+            if mask & window == window:
+                table[mask] = high
+                break
+        else:
+            if mask & wheel == wheel:
+                table[mask] = 3
+
+    return table
+
+
+def _build_flush():
+    table = [0] * (1 << N_RANKS)
+
+    for mask in range(1 << N_RANKS):
+        if _popcount(mask) < 5:
+            continue
+        high = STRAIGHT_HIGH[mask]
+        if high:
+            table[mask] = encode(HandRank.StraightFlush, [high + 2])
+        else:
+            ranks = [i + 2 for i in _rank_indexes(mask)[:5]]
+            table[mask] = encode(HandRank.Flush, ranks)
+
+    return table
+
+
+def _build_flush_suit():
+    """Map the suit counters of a key to the suit having at least 5 cards"""
+    table = [-1] * (1 << SUIT_BITS)
+
+    for counters in range(1 << SUIT_BITS):
+        for suit in Suit:
+            if (counters >> (3 * suit)) & 0b111 >= 5:
+                table[counters] = int(suit)
+
+    return table
+
+
+def _noflush_strength(desc: list[int], groups: list[list[int]], present: int):
+    """Best hand made by a multiset of ranks, ignoring suits
+
+    Args:
+        desc (list[int]): Distinct rank indexes, from the highest
+        groups (list[list[int]]): Rank indexes by number of cards, from the highest
+        present (int): Mask of the rank indexes
+    """
+    quads, trips, pairs = groups[4], groups[3], groups[2]
+
+    if quads:
+        kicker = [i for i in desc if i != quads[0]][:1]
+        return encode(HandRank.FourOfAKind, [quads[0] + 2] + [i + 2 for i in kicker])
+    if trips and len(trips) + len(pairs) >= 2:
+        pair = max(trips[1:] + pairs)
+        return encode(HandRank.FullHouse, [trips[0] + 2, pair + 2])
+
+    high = STRAIGHT_HIGH[present]
+    if high:
+        return encode(HandRank.Straight, [high + 2])
+
+    if trips:
+        hand = trips[:1] + [i for i in desc if i != trips[0]][:2]
+        return encode(HandRank.ThreeOfAKind, [i + 2 for i in hand])
+    if len(pairs) >= 2:
+        hand = pairs[:2] + [i for i in desc if i != pairs[0] and i != pairs[1]][:1]
+        return encode(HandRank.TwoPair, [i + 2 for i in hand])
+    if pairs:
+        hand = pairs[:1] + [i for i in desc if i != pairs[0]][:3]
+        return encode(HandRank.OnePair, [i + 2 for i in hand])
+    return encode(HandRank.HighCard, [i + 2 for i in desc[:5]])
+
+
+def _hash(quinary: int):
+    """Split the (mixed) quinary key in bucket and position in the table"""
+    h = (quinary * HASH_MULTIPLIER) & HASH_MASK
+    return h >> BUCKET_SHIFT, h & TABLE_MASK
+
+
+def _build_noflush():
+    """Build the perfect hash table of all the multisets of 5 to 7 ranks
+
+    Keys are grouped in buckets, then the buckets are placed from the
+    largest to the smallest, looking for a displacement (xor-ed with the
+    position of each key) that sends every key of the bucket to a free slot.
+    """
+    entries = []
+    desc = []
+    groups = [[], [], [], [], []]
+
+    # go through the ranks from the highest, so that lists stay sorted
+    def enumerate_counts(rank, remaining, quinary, present):
+        if remaining > 2 + 4 * (rank + 1):
+            return  # not enough ranks left to reach five cards
+        if rank < 0:
+            entries.append((quinary, _noflush_strength(desc, groups, present)))
+            return
+        enumerate_counts(rank - 1, remaining, quinary, present)
+        desc.append(rank)
+        for count in range(1, min(4, remaining) + 1):
+            groups[count].append(rank)
+            enumerate_counts(
+                rank - 1, remaining - count, quinary + count * 5**rank, present | 1 << rank
+            )
+            groups[count].pop()
+        desc.pop()
+
+    enumerate_counts(N_RANKS - 1, 7, 0, 0)
+
+    buckets = [[] for _ in range(1 << BUCKET_BITS)]
+    for quinary, strength in entries:
+        bucket, position = _hash(quinary)
+        buckets[bucket].append((position, strength))
+
+    table = [0] * (1 << TABLE_BITS)
+    used = bytearray(1 << TABLE_BITS)
+    displacements = [0] * (1 << BUCKET_BITS)
+    first_free = 0
+
+    for bucket in sorted(range(len(buckets)), key=lambda b: -len(buckets[b])):
+        keys = buckets[bucket]
+        if not keys:
+            break
+
+        if len(keys) == 1:
+            # a single key can be sent directly to the first free slot
+            while used[first_free]:
+                first_free += 1
+            displacement = keys[0][0] ^ first_free
+        else:
+            # xor is a bijection: keys of a bucket never collide among themselves
+            positions = [position for position, _ in keys]
+            displacement = 0
+            while any(used[position ^ displacement] for position in positions):
+                displacement += 1
+
+        for position, strength in keys:
+            slot = position ^ displacement
+            used[slot] = 1
+            table[slot] = strength
+        displacements[bucket] = displacement
+
+    if sum(used) != len(entries):
+        raise ValueError("Two multisets of ranks share the same slot of the table.")
+
+    return table, displacements
+
+
+CARD_KEYS = [
+    ((5**rank) << SUIT_BITS) | (1 << (3 * suit))
+    for suit in range(4)
+    for rank in range(N_RANKS)
+]
+
+# the tables, set by build_tables
+STRAIGHT_HIGH = FLUSH = FLUSH_SUIT = NOFLUSH = DISPLACEMENTS = QUINARY = None
+CARD_KEYS_ARRAY = FLUSH_ARRAY = FLUSH_SUIT_ARRAY = NOFLUSH_ARRAY = DISPLACEMENTS_ARRAY = None
+
+
+def build_tables():
+    """Build the evaluation tables, if they are not built yet"""
+    global STRAIGHT_HIGH, FLUSH, FLUSH_SUIT, NOFLUSH, DISPLACEMENTS, QUINARY
+    global CARD_KEYS_ARRAY, FLUSH_ARRAY, FLUSH_SUIT_ARRAY, NOFLUSH_ARRAY, DISPLACEMENTS_ARRAY
+    if NOFLUSH is not None:
+        return
+
+    # the other builders read STRAIGHT_HIGH
+    STRAIGHT_HIGH = _build_straight_high()
+    FLUSH = _build_flush()
+    FLUSH_SUIT = _build_flush_suit()
+    noflush, DISPLACEMENTS = _build_noflush()
+
+    # sum of the base-5 digits of the ranks of a 13-bit rank mask
+    QUINARY = [
+        sum(5**rank for rank in range(N_RANKS) if mask >> rank & 1)
+        for mask in range(1 << N_RANKS)
+    ]
+
+    # NumPy versions of the tables, for the batch evaluation
+    CARD_KEYS_ARRAY = np.array(CARD_KEYS, dtype=np.int64)
+    FLUSH_ARRAY = np.array(FLUSH, dtype=np.int32)
+    FLUSH_SUIT_ARRAY = np.array(FLUSH_SUIT, dtype=np.int8)
+    NOFLUSH_ARRAY = np.array(noflush, dtype=np.int32)
+    DISPLACEMENTS_ARRAY = np.array(DISPLACEMENTS, dtype=np.uint64)
+
+    # set last: the evaluations check it to know whether the tables are built
+    NOFLUSH = noflush
+
+
+def evaluate_ids(ids: list[int]):
+    """Evaluate 5 to 7 cards given by their ids
+
+    Args:
+        ids (list[int]): Ids of the cards
+
+    Returns:
+        int: The strength of the best hand of five cards
+    """
+    if NOFLUSH is None:
+        build_tables()
+
+    key = 0
+    for i in ids:
+        key += CARD_KEYS[i]
+
+    suit = FLUSH_SUIT[key & SUIT_MASK]
+    if suit < 0:
+        h = ((key >> SUIT_BITS) * HASH_MULTIPLIER) & HASH_MASK
+        return NOFLUSH[(h & TABLE_MASK) ^ DISPLACEMENTS[h >> BUCKET_SHIFT]]
+
+    # with at most 7 cards a flush is always the best hand: look at its suit only
+    low = suit * N_RANKS
+    mask = 0
+    for i in ids:
+        if low <= i < low + N_RANKS:
+            mask |= 1 << (i - low)
+    return FLUSH[mask]
+
+
+def evaluate_mask(mask: int):
+    """Evaluate 5 to 7 cards given by their bitmask (see cards_to_mask)
+
+    Returns:
+        int: The strength of the best hand of five cards
+    """
+    if NOFLUSH is None:
+        build_tables()
+
+    quinary = 0
+    for shift in (0, 13, 26, 39):
+        ranks = (mask >> shift) & RANKS_MASK
+        if FLUSH[ranks]:
+            return FLUSH[ranks]
+        quinary += QUINARY[ranks]
+
+    h = (quinary * HASH_MULTIPLIER) & HASH_MASK
+    return NOFLUSH[(h & TABLE_MASK) ^ DISPLACEMENTS[h >> BUCKET_SHIFT]]
+
+
+def evaluate(cards: list[Card]):
+    """Evaluate 5 to 7 cards
+
+    Returns:
+        int: The strength of the best hand of five cards
+    """
+    return evaluate_ids([card.id for card in cards])
+
+
+def evaluate_hand(hand: Hand, community: Community):
+    """Evaluate the hand of a player together with the community cards"""
+    return evaluate(hand.cards + community.cards)
+
+
+def evaluate_cards_batch(cards: np.ndarray):
+    """Evaluate many hands of 5 to 7 cards at once
+
+    Args:
+        cards (np.ndarray): Card ids, with shape (n, k) and 5 <= k <= 7
+
+    Returns:
+        np.ndarray: The n strengths (int32)
+    """
+    if NOFLUSH is None:
+        build_tables()
+
+    cards = np.asarray(cards, dtype=np.intp)
+    keys = CARD_KEYS_ARRAY[cards].sum(axis=1)
+
+    quinary = (keys >> SUIT_BITS).astype(np.uint64)
+    h = quinary * np.uint64(HASH_MULTIPLIER)  # wraps around, as the & HASH_MASK
+    slots = (h & np.uint64(TABLE_MASK)) ^ DISPLACEMENTS_ARRAY[h >> np.uint64(BUCKET_SHIFT)]
+    strengths = NOFLUSH_ARRAY[slots.astype(np.intp)]
+
+    suits = FLUSH_SUIT_ARRAY[keys & SUIT_MASK]
+    flush_rows = np.flatnonzero(suits >= 0)
+    if flush_rows.size:
+        flush_cards = cards[flush_rows]
+        same_suit = flush_cards // N_RANKS == suits[flush_rows, None]
+        # ranks of the same suit are distinct: summing the bits is or-ing them
+        ranks = np.where(same_suit, 1 << (flush_cards % N_RANKS), 0).sum(axis=1)
+        strengths[flush_rows] = FLUSH_ARRAY[ranks]
+
+    return strengths
+
+
+def evaluate_batch(hole: np.ndarray, board: np.ndarray):
+    """Evaluate many pairs of hole cards and board at once
+
+    Args:
+        hole (np.ndarray): Card ids of the hole cards, with shape (n, 2)
+        board (np.ndarray): Card ids of the boards, with shape (n, 3 to 5)
+
+    Returns:
+        np.ndarray: The n strengths (int32), as computed by evaluate
+    """
+    return evaluate_cards_batch(np.concatenate((hole, board), axis=1))
+
+
+def winners_batch(hole: np.ndarray, board: np.ndarray, active: np.ndarray | None = None):
+    """Find the winners of many showdowns at once
+
+    Args:
+        hole (np.ndarray): Card ids of the hole cards, with shape (n, players, 2)
+        board (np.ndarray): Card ids of the boards, with shape (n, 3 to 5)
+        active (np.ndarray, optional): Boolean mask with shape (n, players) of
+            the players taking part in each showdown. Defaults to everyone.
+
+    Returns:
+        np.ndarray: Boolean mask with shape (n, players), True for the
+        winners (more than one in case of a draw)
+    """
+    hole = np.asarray(hole)
+    n, n_players = hole.shape[:2]
+
+    strengths = evaluate_batch(
+        hole.reshape(n * n_players, 2), np.repeat(board, n_players, axis=0)
+    ).reshape(n, n_players)
+    if active is not None:
+        strengths = np.where(active, strengths, -1)
+
+    return strengths == strengths.max(axis=1, keepdims=True)
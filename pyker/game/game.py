@@ -1,32 +1,92 @@
-import math
+from collections.abc import Mapping
 
-from pyker.game.hands_checker import get_winners
+from pyker.game.hands_checker import get_strengths
 from pyker.game.models import *
+from pyker.game.rng import RandomStream
+from pyker.game.zobrist import *
 
-import random
 import copy
 
 
+class SeatMap(Mapping):
+    """Read-only view of seat-indexed values as a mapping from the active players"""
+
+    __slots__ = ("players", "seat_values")
+
+    def __init__(self, players: Players, seat_values: tuple):
+        self.players = players
+        self.seat_values = seat_values
+
+    def __getitem__(self, player: Player):
+        if not self.players.is_active(player):
+            raise KeyError(player)
+        return self.seat_values[self.players.seats[player]]
+
+    def __iter__(self):
+        return iter(self.players.active)
+
+    def __len__(self):
+        return len(self.players.active)
+
+    def copy(self):
+        return dict(self.items())
+
+
 class State:
     """A state in a poker game, in a factored representation
 
     It has to be built with a configuration of all the information it must contain.
     It is an atomic entity: it cannot be changed, it is the Game that must use it to create a new state 
     and perform a transition via execution of players' actions.
+
+    Amounts are tuples indexed by seat (the index of a player in the starting
+    players, 0 for the players who lost) and the players who folded are a
+    bitmask of seats, so a new state shares with its parent everything the
+    action did not change. The amounts are also exposed as read-only
+    mappings from the active players (bets, total_bets, starting_chips,
+    chips). Derived values (chips, highest bet, players all-in, endgame)
+    are computed on first access, unless the transition that built the
+    state gave them.
     """
 
+    __slots__ = (
+        "players",
+        "deck",
+        "current_round",
+        "current_player",
+        "stacks",
+        "round_bets",
+        "contributions",
+        "hands",
+        "community",
+        "folded",
+        "round_last_player",
+        "round_last_better",
+        "min_allowed_bet",
+        "dealer",
+        "blinds_level",
+        "is_initial",
+        "is_final",
+        "winners",
+        "side_pots",
+        "_chips",
+        "_all_in",
+        "_highest_bet",
+        "_hashes",
+    )
+
     def __init__(
         self,
         players: Players,
         deck: Deck,
         current_round: Round,
         current_player: Player,
-        starting_chips: dict[Player, int],
-        bets: dict[Player, int],
-        total_bets: dict[Player, int],
+        stacks: tuple[int, ...],
+        round_bets: tuple[int, ...],
+        contributions: tuple[int, ...],
         hands: dict[Player, Hand],
         community: Community,
-        folded_players: set[Player],
+        folded: int,
         round_last_player: Player,
         round_last_better: Player,
         min_allowed_bet: int,
@@ -34,51 +94,191 @@ class State:
         blinds_level: int,
         is_initial: bool=False,
         is_final: bool=False,
-        winners: list[Player] | None=None
+        winners: list[Player] | None=None,
+        side_pots: list["SidePot"] | None=None,
+        chips: tuple[int, ...] | None=None,
+        all_in: int | None=None,
+        hashes: tuple[int, int, int] | None=None
     ):
-        self.players = players
-        self.deck = deck
-        self.current_round = current_round
-        self.current_player = current_player
-        self.starting_chips = starting_chips
-        self.bets = bets  # bets at the current round
-        self.total_bets = total_bets  # sum of bets during entire play
-        self.hands = hands
-        self.community = community
-        self.folded_players = folded_players
-        self.round_last_player = round_last_player
-        self.round_last_better = round_last_better
-        self.min_allowed_bet = min_allowed_bet
-        self.dealer = dealer
-        self.blinds_level = blinds_level
-        self.is_initial = is_initial
-        self.is_final = is_final
-        self.winners = winners
+        set_slot = object.__setattr__
+        set_slot(self, "players", players)
+        set_slot(self, "deck", deck)
+        set_slot(self, "current_round", current_round)
+        set_slot(self, "current_player", current_player)
+        set_slot(self, "stacks", stacks)  # chips at the start of the play
+        set_slot(self, "round_bets", round_bets)  # bets at the current round
+        set_slot(self, "contributions", contributions)  # sum of bets during entire play
+        set_slot(self, "hands", hands)
+        set_slot(self, "community", community)
+        set_slot(self, "folded", folded)
+        set_slot(self, "round_last_player", round_last_player)
+        set_slot(self, "round_last_better", round_last_better)
+        set_slot(self, "min_allowed_bet", min_allowed_bet)
+        set_slot(self, "dealer", dealer)
+        set_slot(self, "blinds_level", blinds_level)
+        set_slot(self, "is_initial", is_initial)
+        set_slot(self, "is_final", is_final)
+        set_slot(self, "winners", winners)
+        set_slot(self, "side_pots", side_pots)  # how the pot was split, in final states
+        set_slot(self, "_chips", chips)  # stacks minus contributions, if already known
+        set_slot(self, "_all_in", all_in)  # bitmask of the seats without chips, if already known
+        set_slot(self, "_highest_bet", None)
+        set_slot(self, "_hashes", hashes)  # parts of the Zobrist hash, if already known
+
+    def __setattr__(self, name, value):
+        raise AttributeError("A State cannot be changed.")
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def replace(self, **changes):
+        """Return a State equal to this one except for the given fields"""
+        state = State.__new__(State)
+        set_slot = object.__setattr__
+        for name in State.__slots__[:-4]:
+            set_slot(state, name, changes.pop(name) if name in changes else getattr(self, name))
+        if changes:
+            raise AttributeError(f"A State has no field {next(iter(changes))}.")
+        set_slot(state, "_chips", None)
+        set_slot(state, "_all_in", None)
+        set_slot(state, "_highest_bet", None)
+        set_slot(state, "_hashes", None)
+        return state
+
+    @property
+    def chips_by_seat(self):
+        """Chips of each seat: stack minus the bets of the play"""
+        if self._chips is None:
+            chips = tuple(stack - bets for stack, bets in zip(self.stacks, self.contributions))
+            object.__setattr__(self, "_chips", chips)
+        return self._chips
+
+    @property
+    def all_in(self):
+        """Bitmask of the seats of the active players without chips left"""
+        if self._all_in is None:
+            chips = self.chips_by_seat
+            all_in = 0
+            for player in self.players.active:
+                seat = self.players.seats[player]
+                if chips[seat] == 0:
+                    all_in |= 1 << seat
+            object.__setattr__(self, "_all_in", all_in)
+        return self._all_in
+
+    @property
+    def highest_bet(self):
+        if self._highest_bet is None:
+            object.__setattr__(self, "_highest_bet", max(self.round_bets))
+        return self._highest_bet
+
+    @property
+    def current_player_bet(self):
+        return self.round_bets[self.players.seats[self.current_player]]
+
+    @property
+    def n_players(self):
+        return len(self.players.active)
+
+    @property
+    def endgame(self):
+        """True if less than two players have chips left"""
+        chips = self.chips_by_seat
+        return sum(1 for player in self.players.active if chips[self.players.seats[player]] > 0) < 2
+
+    @property
+    def starting_chips(self):
+        return SeatMap(self.players, self.stacks)
+
+    @property
+    def bets(self):
+        return SeatMap(self.players, self.round_bets)
+
+    @property
+    def total_bets(self):
+        return SeatMap(self.players, self.contributions)
+
+    @property
+    def chips(self):
+        return SeatMap(self.players, self.chips_by_seat)
+
+    @property
+    def folded_players(self):
+        return frozenset(player for player in self.players.active if self.folded >> self.players.seats[player] & 1)
+
+    def get_pot(self):
+        return sum(self.contributions)
+
+    def _get_hashes(self):
+        if self._hashes is None:
+            object.__setattr__(self, "_hashes", compute_hashes(self))
+        return self._hashes
+
+    @property
+    def zobrist_hash(self):
+        """64-bit hash of the state, equal for states describing the same situation"""
+        public, bets, holes = self._get_hashes()
+        return public ^ bets ^ holes
+
+    @property
+    def public_hash(self):
+        """64-bit hash of what every player sees: the state without the hole cards"""
+        public, bets, _ = self._get_hashes()
+        return public ^ bets
+
+    def information_hash(self, player: Player):
+        """64-bit hash of what a player sees: the public state and the hole cards of the player"""
+        return self.public_hash ^ hole_key(self.players.seats[player], self.hands[player])
+
+    def mutable(self):
+        """Return a MutableState equal to this State, for Game.apply"""
+        state = MutableState.__new__(MutableState)
+        for name in State.__slots__:
+            object.__setattr__(state, name, getattr(self, name))
+        state.deck = copy.copy(self.deck)
+        state.community = copy.copy(self.community)
+        state.stacks = list(self.stacks)
+        state.round_bets = list(self.round_bets)
+        state.contributions = list(self.contributions)
+        state._chips = list(self.chips_by_seat)
+        state._all_in = self.all_in
+        state._highest_bet = self.highest_bet
+        return state
+
 
-        self.endgame = False
+class MutableState(State):
+    """A State that Game.apply changes in place and Game.undo restores
 
-        self.n_players = len(players.active)
-        self.current_player_bet = bets[current_player]
-        self.highest_bet = max(self.bets.values())
-        self.compute_chips()
+    Amounts are lists instead of tuples and the deck and the community are
+    owned by the state. Derived values are kept up to date by Game.apply.
+    """
 
-        players_with_chips = [player for (player, chips) in self.chips.items() if chips > 0]
-        if len(players_with_chips) < 2:
-            self.endgame = True
+    __slots__ = ()
 
+    __setattr__ = object.__setattr__
 
     def __copy__(self):
-        state = State(
-            copy.copy(self.players),
+        return self.freeze().mutable()
+
+    def __deepcopy__(self, memo):
+        return self.__copy__()
+
+    def freeze(self):
+        """Return an immutable State equal to this one"""
+        return State(
+            self.players,
             copy.copy(self.deck),
             self.current_round,
             self.current_player,
-            self.starting_chips.copy(),
-            self.bets.copy(),
-            self.total_bets.copy(),
+            tuple(self.stacks),
+            tuple(self.round_bets),
+            tuple(self.contributions),
             self.hands,
             copy.copy(self.community),
-            self.folded_players.copy(),
+            self.folded,
             self.round_last_player,
             self.round_last_better,
             self.min_allowed_bet,
@@ -86,15 +286,144 @@ class State:
             self.blinds_level,
             self.is_initial,
             self.is_final,
-            self.winners
+            self.winners,
+            self.side_pots,
+            chips=tuple(self._chips),
+            all_in=self._all_in,
+            hashes=self._hashes,
         )
-        return state
 
-    def compute_chips(self):
-        self.chips = dict((player, self.starting_chips[player] - self.total_bets[player]) for player in self.players.active)
 
-    def get_pot(self):
-        return sum(self.total_bets.values())
+class SidePot:
+    """A layer of the pot of a play, paid equally by every player who bet up to it
+
+    Attributes
+    ----------
+    amount : int
+        Chips in the side pot.
+    players : list[Player]
+        Players who could win it.
+    winners : list[Player]
+        Players who won it, sharing it equally.
+    """
+
+    __slots__ = ("amount", "players", "winners")
+
+    def __init__(self, amount: int, players: list[Player], winners: list[Player]):
+        self.amount = amount
+        self.players = players
+        self.winners = winners
+
+    def __repr__(self):
+        return f"SidePot({self.amount}, {len(self.players)} players, {len(self.winners)} winners)"
+
+
+class _Transition:
+    """Changes made by an action (see Game._transition)"""
+
+    __slots__ = (
+        "seat",
+        "paid",
+        "folded",
+        "all_in",
+        "next_round",
+        "next_player",
+        "round_last_player",
+        "round_last_better",
+        "min_allowed_bet",
+        "new_round",
+        "ends",
+        "deal_to",
+    )
+
+    def __init__(self, seat: int, paid: int, folded: int, all_in: int):
+        self.seat = seat
+        self.paid = paid
+        self.folded = folded
+        self.all_in = all_in
+        self.new_round = False
+        self.ends = False
+        self.deal_to = 0  # number of community cards after dealing, 0 if not dealing
+
+
+class UndoRecord:
+    """What Game.undo needs to restore a MutableState after Game.apply
+
+    Only the fields an action may change are saved; the arrays are saved
+    only when they are replaced (new round or end of the play).
+    """
+
+    __slots__ = (
+        "seat",
+        "paid",
+        "folded",
+        "all_in",
+        "current_round",
+        "current_player",
+        "round_last_player",
+        "round_last_better",
+        "min_allowed_bet",
+        "highest_bet",
+        "hashes",
+        "is_initial",
+        "n_community",
+        "cursor",
+        "round_bets",
+        "stacks",
+        "contributions",
+        "chips",
+    )
+
+    def __init__(self, state: MutableState, transition: _Transition):
+        self.seat = transition.seat
+        self.paid = transition.paid
+        self.folded = state.folded
+        self.all_in = state._all_in
+        self.current_round = state.current_round
+        self.current_player = state.current_player
+        self.round_last_player = state.round_last_player
+        self.round_last_better = state.round_last_better
+        self.min_allowed_bet = state.min_allowed_bet
+        self.highest_bet = state._highest_bet
+        self.hashes = state._hashes
+        self.is_initial = state.is_initial
+        self.n_community = len(state.community.cards)
+        self.cursor = state.deck.cursor
+        self.round_bets = None
+        self.stacks = None
+        self.contributions = None
+        self.chips = None
+
+    def restore(self, state: MutableState):
+        if self.stacks is not None:
+            # the play had ended
+            state.stacks = self.stacks
+            state.contributions = self.contributions
+            state._chips = self.chips
+            state.is_final = False
+            state.winners = None
+            state.side_pots = None
+        if self.round_bets is not None:
+            state.round_bets = self.round_bets
+
+        if self.paid:
+            state.round_bets[self.seat] -= self.paid
+            state.contributions[self.seat] -= self.paid
+            state._chips[self.seat] += self.paid
+
+        del state.community.cards[self.n_community :]
+        state.deck.cursor = self.cursor
+
+        state.folded = self.folded
+        state._all_in = self.all_in
+        state.current_round = self.current_round
+        state.current_player = self.current_player
+        state.round_last_player = self.round_last_player
+        state.round_last_better = self.round_last_better
+        state.min_allowed_bet = self.min_allowed_bet
+        state._highest_bet = self.highest_bet
+        state._hashes = self.hashes
+        state.is_initial = self.is_initial
 
 
 class Game:
@@ -105,7 +434,7 @@ class Game:
     It starts new rounds, new plays and manages the update of the players' information.
     """
 
-    def __init__(self, players: list[Player]):
+    def __init__(self, players: list[Player], rng: RandomStream | None = None, blinds_level: int = 0):
         """Create a Game
 
         Set things that must be remembered among different plays, such as the dealer 
@@ -115,14 +444,36 @@ class Game:
         ----------
         players : list[Player]
             Players from which to start a new game.
+        rng : RandomStream, optional
+            Generator used to choose the dealer and to shuffle the decks. Games
+            with generators built from the same seed deal the same cards.
+        blinds_level : int, optional
+            Level of the blinds (a key of blinds_table) of the next plays. It
+            can be raised between plays (see pyker.tournament).
         """
         # things that won't change at each state
         self.players = Players(players)
-        a = 5 # here I want only to compute how many plays to update the blinds level (or the seconds)
+        self.rng = rng if rng is not None else RandomStream()
+        self.blinds_level = blinds_level
 
-    def initial_state(self, final_state: State | None=None):
+    def initial_state(
+        self,
+        final_state: State | None=None,
+        *,
+        stacks: list[int] | None=None,
+        dealer: Player | None=None,
+    ):
         """Create the initial state of a play
 
+        Parameters
+        ----------
+        final_state : State, optional
+            Final state of the previous play, if it's not the first play.
+        stacks : list[int], optional
+            Chips of each player at the first play (2000 each by default).
+        dealer : Player, optional
+            Dealer of the first play (a random player by default).
+
         Returns
         -------
         State
@@ -131,64 +482,80 @@ class Game:
             blind.
         """
         players = self.players
-        deck = Deck()  # new complete deck of cards
+        deck = Deck(self.rng)  # new complete deck of cards
         current_round = Round.PreFlop
-        starting_chips = dict((player, 2000) for player in players.active)
-        bets = dict((player, 0) for player in players.active)
-        total_bets = dict((player, 0) for player in players.active)
-        community = Community()
-        folded_players = set()  # players who folded during the play
+        n_seats = players.get_n_starting()
 
         # if it's not the first play we will have a final state
         if final_state is not None:
             players = copy.copy(final_state.players)
             players.remove_losers(final_state.chips)    
             dealer = players.next_to(final_state.dealer) # can give error (why?)
-            starting_chips = dict((k, v) for (k, v) in final_state.chips.items() if k in players.active)
-            total_bets = dict((player, 0) for player in players.active)
+            stacks = list(final_state.chips_by_seat)  # the losers have 0 chips
         else:
-            dealer = players.active[random.randint(0, len(players.active) - 1)]
+            if dealer is None:
+                dealer = players.take_random(self.rng)
+            if stacks is None:
+                stacks = [2000] * n_seats
+            if len(stacks) != n_seats or min(stacks) <= 0:
+                raise ValueError("Every player must start with some chips.")
+        bets = [0] * n_seats
 
         # set and pay blinds
         small_blind_player = players.next_to(dealer)
         big_blind_player = players.next_to(small_blind_player)
-        small_blind_bet = blinds_table[0]["small"]
-        big_blind_bet = blinds_table[0]["big"]
+        small_blind_seat = players.seats[small_blind_player]
+        big_blind_seat = players.seats[big_blind_player]
+        small_blind_bet = blinds_table[self.blinds_level]["small"]
+        big_blind_bet = blinds_table[self.blinds_level]["big"]
         # set blinds' bets
-        total_bets[small_blind_player] = bets[small_blind_player] = min(
-            small_blind_bet, starting_chips[small_blind_player]
-        )
-        total_bets[big_blind_player] = bets[big_blind_player] = min(
-            big_blind_bet, starting_chips[big_blind_player]
-        )
+        bets[small_blind_seat] = min(small_blind_bet, stacks[small_blind_seat])
+        bets[big_blind_seat] = min(big_blind_bet, stacks[big_blind_seat])
         min_allowed_bet = big_blind_bet
 
         hands = self.__deal(deck, dealer, players)
-        current_player = players.next_to(big_blind_player)
+        # blinds who are all-in can't act
+        all_in = 0
+        for seat in (small_blind_seat, big_blind_seat):
+            if bets[seat] == stacks[seat]:
+                all_in |= 1 << seat
+        current_player = players.next_to(big_blind_player, all_in)
 
         # set ending round criteria (last player and last better)
-        round_last_player = big_blind_player
+        round_last_player = players.first_active_from_backwards(big_blind_player, all_in)
         round_last_better = None  # blinds are treated as exceptions
 
-        return State(
+        bets = tuple(bets)
+        state = State(
             players,
             deck,
             current_round,
             current_player,
-            starting_chips,
+            tuple(stacks),
             bets,
-            total_bets,
+            bets,  # the blinds are the only bets of the play
             hands,
-            community,
-            folded_players,
+            Community(),
+            0,  # nobody folded
             round_last_player,
             round_last_better,
             min_allowed_bet,
             dealer,
-            0, # blinds level
-            True
+            self.blinds_level,
+            True,
+            all_in=all_in,
         )
 
+        # when nobody can act, or one player can but has nothing to call,
+        # nobody can bet anymore: deal the board and go to the showdown
+        can_act = players.get_n_active() - all_in.bit_count()
+        if can_act == 0 or (can_act == 1 and bets[players.seats[current_player]] == state.highest_bet):
+            community = state.community
+            while len(community.cards) < 5:
+                deck.deal_community_cards(community)
+            return self.end(state)
+        return state
+
     def is_initial(self, state: State):
         """Determine if the given State is the initial state of a play
 
@@ -232,8 +599,9 @@ class Game:
             actions.append(Action.Call)
 
         # this is the way to compute players' chips
-        player_chips = state.chips[current_player]
-        current_bet = state.bets[current_player]
+        seat = state.players.seats[current_player]
+        player_chips = state.chips_by_seat[seat]
+        current_bet = state.round_bets[seat]
         amount_to_call = state.highest_bet - current_bet
 
         if player_chips > amount_to_call:
@@ -276,84 +644,83 @@ class Game:
         _type_
             _description_
         """
-        pot = state.get_pot()
-        winners = None
-        total_bets = state.total_bets.copy()
-        chips = state.chips.copy()
-
-        players = state.players.active
-
-        # distribute the entire pot
-        while pot > 0:
-
-            # players that could win the pot
-            ending_players = [
-                player
-                for player in players
-                if state.total_bets[player] > 0
-                and not player in state.folded_players  # not sure about first check
-            ]
-            winners = get_winners(ending_players, state.hands, state.community)
-
-            # bets of the players, at the end of the game, not only ending players
-            bets = [
-                state.total_bets[player]
-                for player in players
-                if state.total_bets[player] > 0
-            ]
-            min_bet = min(bets)
-
-            # assign as a pot the min bet of all the players
-            pot_to_assign = min_bet * len(bets)
-            pot_to_assign_by_player = math.ceil(pot_to_assign / len(winners))
-
-            for winner in winners:
-                chips[winner] += pot_to_assign_by_player
-
-
-            # decrease the pot by the portion assigned
-            pot -= pot_to_assign
-
-            # decrease players' bets (at the end the total_bet must be 0)
-            for player in players:
-                if total_bets[player] >= min_bet:
-                    total_bets[player] -= min_bet
-
-        final_state = State(
-            copy.copy(state.players),
-            copy.copy(state.deck),
-            Round.End,
-            state.current_player,
-            chips,
-            dict((player, 0) for player in state.players.active),
-            dict((player, 0) for player in state.players.active),
-            state.hands,
-            copy.copy(state.community),
-            state.folded_players.copy(),
-            state.round_last_player,
-            state.round_last_better,
-            state.min_allowed_bet,
-            state.dealer,
-            state.blinds_level,
-            False,
-            True,
-            winners
+        chips, winners, side_pots = self._payout(state)
+
+        zeros = (0,) * state.players.get_n_starting()
+        return state.replace(
+            current_round=Round.End,
+            stacks=tuple(chips),
+            round_bets=zeros,
+            contributions=zeros,
+            is_initial=False,
+            is_final=True,
+            winners=winners,
+            side_pots=side_pots,
         )
 
-        return final_state
+    def _payout(self, state: State):
+        """Distribute the pot of a state
 
-    def __deal(self, deck: Deck, dealer: Player, players: Players):  # needed
-        hands = {}
+        The hands of the players still in the play are ranked once. Then the
+        side pots are built in a single sweep over the contributions, sorted:
+        each contribution level makes a pot of the difference from the
+        previous level, paid by everyone who reached it, that can be won by
+        the players still in the play who reached it (by all of them if
+        only players who folded did). The odd chips of a pot go to the
+        first winners after the dealer.
 
-        deck.shuffle()
+        Returns
+        -------
+        tuple[list[int], list[Player], list[SidePot]]
+            Chips of each seat after the payout, the winners of the last
+            side pot and the side pots.
+        """
+        players = state.players
+        seats = players.seats
+        contributions = state.contributions
+        chips = list(state.chips_by_seat)
+
+        playing = [player for player in players.active if not state.folded >> seats[player] & 1]
+        if len(playing) > 1:
+            strengths = get_strengths(playing, state.hands, state.community)
+        else:
+            strengths = dict.fromkeys(playing, 0)
+
+        levels = sorted(contributions[seats[player]] for player in players.active)
+        side_pots = []
+        winners = None
+        previous_level = 0
+        for i, level in enumerate(levels):
+            if level == previous_level:
+                continue
+
+            # everyone from the i-th smallest contribution on reached the level
+            amount = (level - previous_level) * (len(levels) - i)
+            previous_level = level
+            eligible = [player for player in playing if contributions[seats[player]] >= level] or playing
+            best = max(strengths[player] for player in eligible)
+            winners = [player for player in eligible if strengths[player] == best]
+            side_pots.append(SidePot(amount, eligible, winners))
+
+            share, odd_chips = divmod(amount, len(winners))
+            for j, winner in enumerate(players.order_from(state.dealer, winners)):
+                chips[seats[winner]] += share + (j < odd_chips)
+
+        return chips, winners, side_pots
+
+    def __deal(self, deck: Deck, dealer: Player, players: Players):  # needed
+        # draw now every card of the hand, so copies of the deck deal the same board
+        deck.shuffle(2 * len(players.active) + 5)
 
         starting_player = players.next_to(dealer)
-        hands[starting_player] = deck.deal_hand()
+        order = [starting_player]
         next_player = players.next_to(starting_player)
         while next_player != starting_player:
-            hands[next_player] = deck.deal_hand()
+            order.append(next_player)
             next_player = players.next_to(next_player)
 
+        hands = dict(zip(order, deck.deal_hands(len(order))))
+
         return hands
 
     def result(self, state: State, action: Action, *, amount: int = 0, range: tuple[int, int] = (0, 0)):
@@ -378,118 +745,286 @@ class Game:
         State
             A new State, after the transition, according to the rules of Poker.
         """
+        transition = self._transition(state, action, amount, range)
+        seat = transition.seat
+        paid = transition.paid
+        round_bets = state.round_bets
+        total_bets = state.contributions
+        chips = state.chips_by_seat
+
+        if paid:
+            round_bets = _add(round_bets, seat, paid)
+            total_bets = _add(total_bets, seat, paid)
+            chips = _add(chips, seat, -paid)
+
+        # the deck and the community change only when dealing
+        deck = state.deck
+        community = state.community
+        if transition.deal_to:
+            deck = copy.copy(deck)
+            community = copy.copy(community)
+            while len(community.cards) < transition.deal_to:
+                deck.deal_community_cards(community)
+
+        if transition.ends:
+            return self.end(
+                state.replace(
+                    deck=deck, contributions=total_bets, community=community, folded=transition.folded
+                )
+            )
+
+        if transition.new_round:
+            round_bets = (0,) * state.players.get_n_starting()
+
+        hashes = None
+        if state._hashes is not None:
+            hashes = _next_hashes(state, transition, community.cards[len(state.community.cards) :])
+
+        return State(
+            state.players,
+            deck,
+            transition.next_round,
+            transition.next_player,
+            state.stacks,
+            round_bets,
+            total_bets,
+            state.hands,
+            community,
+            transition.folded,
+            transition.round_last_player,
+            transition.round_last_better,
+            transition.min_allowed_bet,
+            state.dealer,
+            state.blinds_level,
+            chips=chips,
+            all_in=transition.all_in,
+            hashes=hashes,
+        )
+
+    def _transition(self, state: State, action: Action, amount: int, range: tuple[int, int]):
+        """Determine what an action changes, without changing the State
+
+        Parameters
+        ----------
+        state : State
+            The State in which the current player acts.
+        action : Action
+            The Action to perform.
+        amount : int
+            The amount to bet, for Action.BetOrRaise.
+        range : tuple[int, int]
+            The range of possible bets.
+
+        Returns
+        -------
+        _Transition
+            The changes made by the action.
+        """
         current_player = state.current_player
+        players = state.players  # the players don't change during a play
+        seat = players.seats[current_player]
 
-        players = copy.copy(state.players)
-        deck = copy.copy(state.deck)
-        
         next_round = state.current_round
-        starting_chips = state.starting_chips
-        bets = state.bets.copy()
-        total_bets = state.total_bets.copy()
-        hands = state.hands
-        community = copy.copy(state.community)  # maybe copy
-        folded_players = state.folded_players.copy()
+        folded = state.folded
         round_last_player = state.round_last_player
         round_last_better = state.round_last_better
         min_allowed_bet = state.min_allowed_bet
+        paid = 0
 
         # perform the call everytime the action is call or bet
         if action is Action.Call or action is Action.BetOrRaise:
             # or the max the player can, for the call
-            amount_to_call = min(
-                state.highest_bet - bets[current_player],
-                state.chips[current_player]
+            paid = min(
+                state.highest_bet - state.round_bets[seat],
+                state.chips_by_seat[seat]
             )
-            total_bets[current_player] += amount_to_call
-            bets[current_player] += amount_to_call
 
         # if the action is bet, then you have to be the amount
         if action is Action.BetOrRaise:
             if not range[0] <= amount <= range[1]: 
                 raise ValueError("This amount cannot be bet.")
 
-            total_bets[current_player] += amount
-            bets[current_player] += amount
+            paid += amount
             round_last_better = current_player
             min_allowed_bet = amount
 
         elif action is Action.Fold:
-            folded_players.add(current_player)
+            folded |= 1 << seat
 
-        next_player = players.next_to(
-            state.current_player
-        )
-        while next_player in folded_players or state.chips[next_player] == 0: # maybe
-            next_player = players.next_to(next_player)
-            if next_player == current_player:
-                break
+        # players who can't act: they folded or they are all-in (before this action)
+        chips = state.chips_by_seat
+        all_in = state.all_in
+        skip = folded | all_in
+        next_player = players.next_to(current_player, skip)
+
+        # the action closes at the last better or, if the better can't act
+        # anymore (all-in), at the first player after the better who can
+        round_closer = state.round_last_better
+        if round_closer is not None and (state.folded | all_in) >> players.seats[round_closer] & 1:
+            round_closer = players.next_to(round_closer, state.folded | all_in)
+
+        # the player may go all-in with this action
+        transition = _Transition(seat, paid, folded, all_in | (1 << seat if paid and paid == chips[seat] else 0))
 
         # determine the passage to the next round
-        one_player_remained = state.n_players - len(folded_players) == 1
+        one_player_remained = state.n_players - folded.bit_count() == 1
         if (
             (
                 state.round_last_better is None
                 and state.round_last_player == current_player
                 and not action is Action.BetOrRaise # and the player has not made a bet
             )
-            or (next_player == state.round_last_better and not action is Action.BetOrRaise)
+            or (next_player == round_closer and not action is Action.BetOrRaise)
             or one_player_remained
             or (next_player == current_player) # maybe
         ):
             next_round += 1
 
             if next_round == Round.End:
-                state_copy = copy.copy(state)
-                state_copy.total_bets = total_bets
-                state_copy.folded_players = folded_players
-                state_copy.compute_chips()
-                final_state = self.end(state_copy)
-                return final_state
-
-            players_with_chips = [player for player in players.active if state.chips[player] > 0 and not player in folded_players]
-
-            if one_player_remained or len(players_with_chips) <= 1:
-                while next_round < Round.End:
-                    next_round += 1
-                while len(community.cards) < 5:
-                    deck.deal_community_cards(community)
-                state_copy = copy.copy(state)
-                state_copy.total_bets = total_bets
-                state_copy.folded_players = folded_players
-                state_copy.community = community
-                state_copy.compute_chips()
-                final_state = self.end(state_copy)
-                return final_state 
-
-            bets = dict((player, 0) for player in players.active)
-            deck.deal_community_cards(community)
-            next_player = players.next_to(state.dealer)
-            while next_player in folded_players or state.chips[next_player] == 0:
-                next_player = players.next_to(next_player)
-                if next_player == state.dealer:
-                    break
-            round_last_player = players.first_active_from_backwards(state.dealer)
-            while round_last_player in folded_players or state.chips[round_last_player] == 0:
-                round_last_player = players.previous_than(round_last_player)
+                transition.ends = True
+                return transition
+
+            skip = folded | transition.all_in
+            players_with_chips = players.get_n_active() - (skip & players.active_mask).bit_count()
+
+            if one_player_remained or players_with_chips <= 1:
+                # nobody can bet anymore: deal the remaining cards and end
+                transition.ends = True
+                transition.deal_to = 5
+                return transition
+
+            transition.new_round = True
+            transition.deal_to = 3 if not state.community.cards else len(state.community.cards) + 1
+            next_player = players.next_to(state.dealer, skip)
+            round_last_player = players.first_active_from_backwards(state.dealer, skip)
             round_last_better = None
 
-        new_state = State(
-            players,
-            deck,
-            next_round,
-            next_player,
-            starting_chips,
-            bets,
-            total_bets,
-            hands,
-            community,
-            folded_players,
-            round_last_player,
-            round_last_better,
-            min_allowed_bet,
-            state.dealer,
-            0
-        )
+        transition.next_round = next_round
+        transition.next_player = next_player
+        transition.round_last_player = round_last_player
+        transition.round_last_better = round_last_better
+        transition.min_allowed_bet = min_allowed_bet
+        return transition
+
+    def apply(self, state: MutableState, action: Action, *, amount: int = 0, range: tuple[int, int] = (0, 0)):
+        """Perform an action changing the State in place
 
-        return new_state
+        It is the same transition as result, without building a new State:
+        it is meant for search algorithms, that undo the action when they
+        backtrack.
+
+        Parameters
+        ----------
+        state : MutableState
+            The State to change (see State.mutable).
+        action : Action
+            The Action to perform.
+        amount : int, optional
+            The amount to bet.
+        range : tuple[int, int], optional
+            The range of possible bet (second element of the BetOrRaise tuple in actions).
+
+        Returns
+        -------
+        UndoRecord
+            What undo needs to restore the State as it was.
+        """
+        transition = self._transition(state, action, amount, range)
+        seat = transition.seat
+        paid = transition.paid
+        record = UndoRecord(state, transition)
+
+        n_community = len(state.community.cards)
+        while len(state.community.cards) < transition.deal_to:
+            state.deck.deal_community_cards(state.community)
+        if state._hashes is not None and not transition.ends:
+            state._hashes = _next_hashes(state, transition, state.community.cards[n_community:])
+        else:
+            state._hashes = None
+
+        if paid:
+            state.round_bets[seat] += paid
+            state.contributions[seat] += paid
+            state._chips[seat] -= paid
+            if state.round_bets[seat] > state._highest_bet:
+                state._highest_bet = state.round_bets[seat]
+
+        state.folded = transition.folded
+        state._all_in = transition.all_in
+        state.is_initial = False
+
+        if transition.ends:
+            chips, winners, side_pots = self._payout(state)
+            record.stacks = state.stacks
+            record.round_bets = state.round_bets
+            record.contributions = state.contributions
+            record.chips = state._chips
+            n_seats = state.players.get_n_starting()
+            state.stacks = chips
+            state.round_bets = [0] * n_seats
+            state.contributions = [0] * n_seats
+            state._chips = chips.copy()
+            state._all_in = None
+            state._highest_bet = 0
+            state.current_round = Round.End
+            state.is_final = True
+            state.winners = winners
+            state.side_pots = side_pots
+            return record
+
+        if transition.new_round:
+            record.round_bets = state.round_bets
+            state.round_bets = [0] * state.players.get_n_starting()
+            state._highest_bet = 0
+
+        state.current_round = transition.next_round
+        state.current_player = transition.next_player
+        state.round_last_player = transition.round_last_player
+        state.round_last_better = transition.round_last_better
+        state.min_allowed_bet = transition.min_allowed_bet
+        return record
+
+    def undo(self, state: MutableState, record: UndoRecord):
+        """Restore a State changed by apply, given the record it returned
+
+        Records must be undone in reverse order of application.
+        """
+        record.restore(state)
+
+
+def _add(values: tuple[int, ...], seat: int, amount: int):
+    """Return the values with amount added to the one of the seat"""
+    return values[:seat] + (values[seat] + amount,) + values[seat + 1 :]
+
+
+def _next_hashes(state: State, transition: _Transition, dealt: list[Card]):
+    """Update the parts of the hash of a state for a transition not ending the play"""
+    public, bets, holes = state._hashes
+    players = state.players
+    seat = transition.seat
+
+    if transition.paid:
+        contribution = state.contributions[seat]
+        public ^= amount_key(CONTRIBUTION_KEYS[seat], contribution)
+        public ^= amount_key(CONTRIBUTION_KEYS[seat], contribution + transition.paid)
+        bet = state.round_bets[seat]
+        bets ^= amount_key(BET_KEYS[seat], bet) ^ amount_key(BET_KEYS[seat], bet + transition.paid)
+    if transition.folded != state.folded:
+        public ^= FOLDED_KEYS[seat]
+    if transition.new_round:
+        bets = 0
+
+    public ^= ROUND_KEYS[state.current_round] ^ ROUND_KEYS[transition.next_round]
+    for card in dealt:
+        public ^= BOARD_KEYS[card.id]
+
+    public ^= seat_key(CURRENT_KEYS, players, state.current_player)
+    public ^= seat_key(CURRENT_KEYS, players, transition.next_player)
+    public ^= seat_key(LAST_PLAYER_KEYS, players, state.round_last_player)
+    public ^= seat_key(LAST_PLAYER_KEYS, players, transition.round_last_player)
+    public ^= seat_key(LAST_BETTER_KEYS, players, state.round_last_better)
+    public ^= seat_key(LAST_BETTER_KEYS, players, transition.round_last_better)
+    public ^= amount_key(MIN_BET_KEY, state.min_allowed_bet)
+    public ^= amount_key(MIN_BET_KEY, transition.min_allowed_bet)
+
+    return public, bets, holes
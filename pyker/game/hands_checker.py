@@ -1,18 +1,9 @@
 from turtle import pos
 from pyker.game.models import *
+from pyker.game.evaluator import encode, evaluate_hand, evaluate_mask, get_hand_rank
+from collections import OrderedDict
 import enum
-
-
-class HandRank(enum.IntEnum):
-    StraightFlush = 9
-    FourOfAKind = 8
-    FullHouse = 7
-    Flush = 6
-    Straight = 5
-    ThreeOfAKind = 4
-    TwoPair = 3
-    OnePair = 2
-    HighCard = 1
+import threading
 
 
 class HandComparison(enum.IntEnum):
@@ -252,6 +243,7 @@ class HandInfo:
 
         self.high_cards = self._get_high_cards()
         self.kickers = self._get_kickers()
+        self.key = self._get_key()
 
     def _get_high_cards(self):
         high_cards = self.hand[:1]
@@ -277,67 +269,176 @@ class HandInfo:
 
         return kickers
 
-    def compare_to(self, other):
-        if self.hand_rank > other.hand_rank:
-            return HandComparison.Win
-        if self.hand_rank < other.hand_rank:
-            return HandComparison.Lose
-
-        for card1, card2 in zip(self.high_cards, other.high_cards):
-            comparison = card1.compare_to_by_rank(card2)
-            if comparison < 0:
-                return HandComparison.Win
-            elif comparison > 0:
-                return HandComparison.Lose
+    def _get_key(self):
+        """Single integer that orders hands as the rules of Poker do
 
+        It is the same strength computed by the evaluator: the HandRank
+        followed by the ranks of the high cards and the kickers (all the
+        five cards for a flush).
+        """
         if self.hand_rank == HandRank.Flush:
-            for card1, card2 in zip(self.high_cards, other.high_cards):
-                comparison = card1.compare_to_by_rank(card2)
-                if comparison < 0:
-                    return HandComparison.Win
-                elif comparison > 0:
-                    return HandComparison.Lose
-
-        for card1, card2 in zip(self.kickers, other.kickers):
-            comparison = card1.compare_to_by_rank(card2)
-            if comparison < 0:
-                return HandComparison.Win
-            elif comparison > 0:
-                return HandComparison.Lose
+            cards = self.hand
+        else:
+            cards = self.high_cards + self.kickers
 
-        return HandComparison.Draw
+        return encode(self.hand_rank, [card.rank for card in cards])
 
+    def compare_to(self, other):
+        if self.key > other.key:
+            return HandComparison.Win
+        if self.key < other.key:
+            return HandComparison.Lose
+        return HandComparison.Draw
 
-def get_winners(players: list[Player], hands: dict[Player, Hand], community: Community):
-    if len(players) == 1:
-        return players
 
-    hands_info = []
+def get_hand_info(player: Player, hand: Hand, community: Community):
+    """Build the HandInfo of a player, with the cards forming the hand"""
+    # the evaluator tells which checker builds the hand of the player
+    hand_rank = get_hand_rank(get_strength(hand, community))
+    poss_hand = hands_checkers_dict[hand_rank](hand, community)
+    return HandInfo(player, poss_hand, hand_rank)
+
+
+def canonical_mask(mask: int):
+    """Return the mask of the cards with the suits sorted by their ranks
+
+    Hands that differ by a permutation of the suits have the same strength,
+    so they share the same canonical mask.
+    """
+    lanes = sorted(((mask >> 13 * suit) & 0x1FFF for suit in range(4)), reverse=True)
+    return lanes[0] | lanes[1] << 13 | lanes[2] << 26 | lanes[3] << 39
+
+
+class StrengthCache:
+    """Bounded cache of the strengths of sets of cards, evicting the least recently used
+
+    A lookup costs more than evaluate_mask itself, so get_strengths,
+    rank_players and get_winners only use a cache when given one: it pays
+    off for evaluations slower than the tables, such as the rule-based
+    checkers. The cache can be shared by threads: lookups and updates hold a
+    lock.
+
+    Args:
+        maxsize (int, optional): Maximum number of strengths kept. Defaults to 65536.
+        evaluate (Callable[[int], int], optional): Strength of the cards of a
+            mask, the same for any permutation of the suits. Defaults to
+            evaluate_mask.
+
+    Attributes:
+        hits (int): Lookups answered by the cache
+        misses (int): Lookups that had to evaluate the cards
+        evictions (int): Strengths dropped to respect the size
+    """
+
+    def __init__(self, maxsize: int = 65536, evaluate=evaluate_mask):
+        if maxsize < 0:
+            raise ValueError("The size of the cache cannot be negative.")
+        self.maxsize = maxsize
+        self.evaluate = evaluate
+        self.strengths = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.strengths)
+
+    def get(self, mask: int):
+        """Return the strength of the cards of a mask, evaluating it if not cached"""
+        key = canonical_mask(mask)
+
+        with self.lock:
+            strength = self.strengths.get(key)
+            if strength is not None:
+                self.strengths.move_to_end(key)
+                self.hits += 1
+                return strength
+            self.misses += 1
+
+        # evaluate without holding the lock, at worst two threads do it twice
+        strength = self.evaluate(key)
+
+        with self.lock:
+            self.strengths[key] = strength
+            self._evict()
+
+        return strength
+
+    def resize(self, maxsize: int):
+        """Change the maximum size, evicting the strengths in excess"""
+        if maxsize < 0:
+            raise ValueError("The size of the cache cannot be negative.")
+        with self.lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        """Drop every strength and reset the counters"""
+        with self.lock:
+            self.strengths.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def _evict(self):
+        while len(self.strengths) > self.maxsize:
+            self.strengths.popitem(last=False)
+            self.evictions += 1
+
+
+def get_strength(hand: Hand, community: Community):
+    """Return the strength of the hand of a player"""
+    return evaluate_hand(hand, community)
+
+
+def get_strengths(
+    players: list[Player], hands: dict[Player, Hand], community: Community, cache: StrengthCache | None = None
+):
+    """Return the strength of the hand of each player
+
+    Strengths are the keys of the HandInfo of the players: the higher the
+    better, equal strengths are a draw.
+
+    Args:
+        cache (StrengthCache, optional): Cache to look the strengths up in.
+            Defaults to evaluating them directly.
+    """
+    if cache is None:
+        return dict((player, get_strength(hands[player], community)) for player in players)
+
+    board = cards_to_mask(community.cards)
+    return dict((player, cache.get(cards_to_mask(hands[player].cards) | board)) for player in players)
+
+
+def rank_players(
+    players: list[Player], hands: dict[Player, Hand], community: Community, cache: StrengthCache | None = None
+):
+    """Group players by the strength of their hand
+
+    Args:
+        cache (StrengthCache, optional): Cache of the strengths (see get_strengths)
+
+    Returns:
+        list[list[Player]]: Groups of players with the same strength, from
+        the best hand to the worst one
+    """
+    strengths = get_strengths(players, hands, community, cache)
+    groups = {}
 
     for player in players:
-        hand_info = {}
-
-        for hand_rank in HandRank:
-            poss_hand = hands_checkers_dict[hand_rank](hands[player], community)
-            if poss_hand is not None:
-                hand_info = HandInfo(player, poss_hand, hand_rank)
-                hands_info.append(hand_info)
-                break
+        groups.setdefault(strengths[player], []).append(player)
 
-    winners = [hand_info.player for hand_info in hands_info]
+    return [groups[strength] for strength in sorted(groups, reverse=True)]
 
-    for i in range(len(hands_info)):
-        for j in range(i + 1, len(hands_info)):
-            hand_info1 = hands_info[i]
-            hand_info2 = hands_info[j]
 
-            comparison = hand_info1.compare_to(hand_info2)
+def get_winners(
+    players: list[Player], hands: dict[Player, Hand], community: Community, cache: StrengthCache | None = None
+):
+    if len(players) == 1:
+        return players
 
-            if comparison == HandComparison.Win:
-                if hand_info2.player in winners:
-                    winners.remove(hand_info2.player)
-            elif comparison == HandComparison.Lose:
-                if hand_info1.player in winners:
-                    winners.remove(hand_info1.player)
+    strengths = get_strengths(players, hands, community, cache)
+    best = max(strengths.values())
 
-    return winners
+    return [player for player in players if strengths[player] == best]
@@ -0,0 +1,270 @@
+"""Suit isomorphic indexing of hands, round by round
+
+Two hands are isomorphic when one is obtained from the other by permuting
+the suits and the order of the cards dealt in the same round. A HandIndexer
+maps every class of isomorphic hands (hole cards, then hole cards and flop,
+and so on) to a dense index in [0, size(round)) and back, so that tables
+keyed by hand can be stored in flat arrays with no wasted entries.
+
+The index is computed combinatorially (as in Waugh, "A Fast and Optimal Hand
+Isomorphism Algorithm", 2013):
+    - the cards of each suit are described by their number in each round
+      (the suit configuration) and by an index combining, round by round,
+      the colex index of their ranks among the ranks not used yet;
+    - the suits are sorted by configuration, giving the configuration of
+      the hand; suits with the same configuration are interchangeable, so
+      their indexes are combined as a multiset;
+    - the hand index is the offset of its configuration plus the mixed radix
+      combination of the multiset indexes.
+
+The configurations of each round, their offsets and the rank tables are
+precomputed, so indexing and unindexing do a fixed amount of work.
+"""
+import bisect
+import math
+
+from pyker.game.models import *
+
+N_SUITS = 4
+N_RANKS = 13
+
+# colex index of each set of ranks among the sets with the same size
+COLEX = [0] * (1 << N_RANKS)
+# sets of ranks of each size, in colex order
+COLEX_SETS = [[] for _ in range(N_RANKS + 1)]
+
+for _mask in range(1 << N_RANKS):
+    _ranks = [rank for rank in range(N_RANKS) if _mask >> rank & 1]
+    COLEX[_mask] = sum(math.comb(rank, i + 1) for i, rank in enumerate(_ranks))
+
+for _mask in sorted(range(1 << N_RANKS), key=lambda mask: COLEX[mask]):
+    COLEX_SETS[_mask.bit_count()].append(_mask)
+
+# ranks not used yet, for each set of used ranks
+UNUSED_RANKS = [
+    [rank for rank in range(N_RANKS) if not used >> rank & 1] for used in range(1 << N_RANKS)
+]
+
+
+class _Configuration:
+    """Configuration of a hand: the sorted configurations of its suits
+
+    Attributes:
+        suits (tuple): For each suit, from the largest, the number of cards
+            dealt in each round
+        groups (list[tuple[int, int]]): For each group of equal suit
+            configurations, the number of suits and the number of ways to
+            deal the cards of one suit
+        offset (int): Index of the first hand with this configuration
+        size (int): Number of hands with this configuration
+    """
+
+    def __init__(self, suits: tuple, offset: int):
+        self.suits = suits
+        self.offset = offset
+        self.groups = []
+
+        start = 0
+        while start < N_SUITS:
+            end = start
+            while end < N_SUITS and suits[end] == suits[start]:
+                end += 1
+            self.groups.append((end - start, _suit_size(suits[start])))
+            start = end
+
+        self.size = 1
+        for n_suits, suit_size in self.groups:
+            self.size *= math.comb(suit_size + n_suits - 1, n_suits)
+
+
+def _suit_size(counts: tuple):
+    """Number of ways to deal the cards of a suit, counts cards in each round"""
+    size = 1
+    used = 0
+    for count in counts:
+        size *= math.comb(N_RANKS - used, count)
+        used += count
+    return size
+
+
+class HandIndexer:
+    """Index of suit isomorphic hands, for each round of a game
+
+    Args:
+        cards_per_round (list[int]): Cards dealt in each round (for Texas
+            Hold'em [2, 3, 1, 1]: hole cards, flop, turn and river)
+    """
+
+    def __init__(self, cards_per_round: list[int]):
+        self.cards_per_round = list(cards_per_round)
+        self.configurations = []  # for each round, sorted by offset
+        self.offsets = []
+        self.lookup = []
+
+        suit_configurations = {((),) * N_SUITS}
+        for n_cards in self.cards_per_round:
+            suit_configurations = self._next_round(suit_configurations, n_cards)
+
+            configurations = []
+            offset = 0
+            for suits in sorted(suit_configurations, reverse=True):
+                configuration = _Configuration(suits, offset)
+                configurations.append(configuration)
+                offset += configuration.size
+
+            self.configurations.append(configurations)
+            self.offsets.append([configuration.offset for configuration in configurations])
+            self.lookup.append(dict((c.suits, c) for c in configurations))
+
+    @staticmethod
+    def _next_round(suit_configurations: set, n_cards: int):
+        """Deal n_cards among the suits of each configuration of the previous round"""
+        result = set()
+
+        def deal(suits, suit, remaining, dealt):
+            if suit == N_SUITS:
+                if remaining == 0:
+                    result.add(tuple(sorted(dealt, reverse=True)))
+                return
+            available = N_RANKS - sum(suits[suit])
+            for count in range(min(available, remaining) + 1):
+                deal(suits, suit + 1, remaining - count, dealt + [suits[suit] + (count,)])
+
+        for suits in suit_configurations:
+            deal(suits, 0, n_cards, [])
+
+        return result
+
+    def rounds(self):
+        return len(self.cards_per_round)
+
+    def size(self, round: int):
+        """Number of classes of isomorphic hands after the given round (from 0)"""
+        last = self.configurations[round][-1]
+        return last.offset + last.size
+
+    def _round_of(self, n_cards: int):
+        dealt = 0
+        for round, cards in enumerate(self.cards_per_round):
+            dealt += cards
+            if dealt == n_cards:
+                return round
+        raise ValueError(f"{n_cards} cards are not the cards dealt at the end of a round.")
+
+    def index(self, cards: list[Card]):
+        """Return the index of a hand
+
+        Args:
+            cards (list[Card]): Cards dealt so far, in the order of the rounds
+                (e.g. two hole cards, then the three cards of the flop)
+
+        Returns:
+            int: Index of the hand among the hands of its round
+        """
+        round = self._round_of(len(cards))
+        suit_counts = [[] for _ in range(N_SUITS)]
+        suit_indexes = [0] * N_SUITS
+        multipliers = [1] * N_SUITS
+        used = [0] * N_SUITS
+
+        start = 0
+        for n_cards in self.cards_per_round[: round + 1]:
+            ranks = [0] * N_SUITS
+            for card in cards[start : start + n_cards]:
+                if (ranks[card.suit] | used[card.suit]) >> (card.rank - 2) & 1:
+                    raise ValueError("The same card is dealt twice.")
+                ranks[card.suit] |= 1 << (card.rank - 2)
+            start += n_cards
+
+            for suit in range(N_SUITS):
+                # position of the ranks among the ranks of the suit not used yet
+                compressed = 0
+                for rank in range(N_RANKS):
+                    if ranks[suit] >> rank & 1:
+                        compressed |= 1 << (rank - (used[suit] & ((1 << rank) - 1)).bit_count())
+                count = ranks[suit].bit_count()
+                suit_indexes[suit] += multipliers[suit] * COLEX[compressed]
+                multipliers[suit] *= math.comb(N_RANKS - used[suit].bit_count(), count)
+                suit_counts[suit].append(count)
+                used[suit] |= ranks[suit]
+
+        suits = sorted(zip(map(tuple, suit_counts), suit_indexes), reverse=True)
+        configuration = self.lookup[round][tuple(counts for counts, _ in suits)]
+
+        index = 0
+        multiplier = 1
+        start = 0
+        for n_suits, suit_size in configuration.groups:
+            # suits are sorted: the indexes of the group are decreasing
+            group = [suit_index for _, suit_index in suits[start : start + n_suits]]
+            group_index = sum(
+                math.comb(suit_index + n_suits - i - 1, n_suits - i)
+                for i, suit_index in enumerate(group)
+            )
+            index += multiplier * group_index
+            multiplier *= math.comb(suit_size + n_suits - 1, n_suits)
+            start += n_suits
+
+        return configuration.offset + index
+
+    def unindex(self, round: int, index: int):
+        """Return a hand (the canonical one) of the class with the given index
+
+        Args:
+            round (int): Round of the hand (from 0)
+            index (int): Index of the hand among the hands of the round
+
+        Returns:
+            list[Card]: Cards of the hand, in the order of the rounds (cards
+            of the same round are sorted)
+        """
+        if not 0 <= index < self.size(round):
+            raise ValueError(f"The index must be in [0, {self.size(round)}).")
+
+        configurations = self.configurations[round]
+        configuration = configurations[bisect.bisect_right(self.offsets[round], index) - 1]
+        index -= configuration.offset
+
+        suit_indexes = []
+        for n_suits, suit_size in configuration.groups:
+            group_size = math.comb(suit_size + n_suits - 1, n_suits)
+            index, group_index = divmod(index, group_size)
+            suit_indexes += _unrank_multiset(group_index, n_suits)
+
+        rounds = [[] for _ in range(round + 1)]
+        for suit, (counts, suit_index) in enumerate(zip(configuration.suits, suit_indexes)):
+            used = 0
+            for i, count in enumerate(counts):
+                size = math.comb(N_RANKS - used.bit_count(), count)
+                suit_index, colex = divmod(suit_index, size)
+                unused = UNUSED_RANKS[used]
+                compressed = COLEX_SETS[count][colex]
+                for position in range(N_RANKS):
+                    if compressed >> position & 1:
+                        rank = unused[position]
+                        used |= 1 << rank
+                        rounds[i].append(Card(Suit(suit), Rank(rank + 2)))
+
+        return [card for cards in rounds for card in sorted(cards, key=lambda card: card.id)]
+
+
+def _unrank_multiset(index: int, size: int):
+    """Return the decreasing values of the multiset of given size and index"""
+    values = []
+    for i in range(size):
+        k = size - i
+        # largest y with comb(y, k) <= index, by bisection
+        low, high = k - 1, k + index
+        while low < high:
+            middle = (low + high + 1) // 2
+            if math.comb(middle, k) <= index:
+                low = middle
+            else:
+                high = middle - 1
+        y = low
+        index -= math.comb(y, k)
+        values.append(y - (k - 1))
+    return values
+
+
+holdem_indexer = HandIndexer([2, 3, 1, 1])
@@ -43,6 +43,18 @@ class Action(enum.Enum):
         return action_str_dict[self]
 
 
+class HandRank(enum.IntEnum):
+    StraightFlush = 9
+    FourOfAKind = 8
+    FullHouse = 7
+    Flush = 6
+    Straight = 5
+    ThreeOfAKind = 4
+    TwoPair = 3
+    OnePair = 2
+    HighCard = 1
+
+
 class Round(enum.IntEnum):
     PreFlop = 1
     Flop = 2
@@ -69,15 +81,70 @@ blinds_table = {
 }
 
 
+N_CARDS = 52
+
+
+def card_id(suit: Suit, rank: Rank):
+    """Return the id in [0, 52) of the card of the given suit and rank
+
+    Ids are suit major: the cards of a suit have consecutive ids, ordered by
+    rank, so the bitmask of a set of cards (bit id set for each card) is made
+    of four 13-bit lanes, one per suit.
+    """
+    return suit * 13 + rank - Rank.R2
+
+
 class Card:
-    def __init__(self, suit: Suit, rank: Rank) -> None:
-        self.suit = suit
-        self.rank = rank
+    """A card of the deck
+
+    Cards are interned: there are exactly 52 instances, one per id, and
+    Card(suit, rank) always returns the same object for the same card.
+    Cards are immutable, hashed and compared by id.
+    """
+
+    __slots__ = ("suit", "rank", "id", "mask")
+
+    def __new__(cls, suit: Suit, rank: Rank):
+        return CARDS[card_id(suit, rank)]
+
+    @classmethod
+    def _create(cls, id: int):
+        card = object.__new__(cls)
+        object.__setattr__(card, "suit", Suit(id // 13))
+        object.__setattr__(card, "rank", Rank(id % 13 + Rank.R2))
+        object.__setattr__(card, "id", id)
+        object.__setattr__(card, "mask", 1 << id)
+        return card
+
+    @classmethod
+    def from_id(cls, id: int):
+        """Return the card with the given id"""
+        return CARDS[id]
+
+    @classmethod
+    def from_code(cls, code: str):
+        """Return the card with the given code (e.g. "10S", "AH", "TD")"""
+        rank, suit = code[:-1].upper(), code[-1].upper()
+        if rank == "T":
+            rank = "10"
+        return CARDS[card_id(Suit[SUIT_CODES[suit]], Rank["R" + rank])]
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Cards are immutable.")
+
+    def __reduce__(self):
+        return (Card.from_id, (self.id,))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def __eq__(self, other):
         if not isinstance(other, Card):
             return False
-        return self.suit == other.suit and self.rank == other.rank
+        return self.id == other.id
 
     def __lt__(self, other):
         """Compare two cards for deck ordering
@@ -98,8 +165,11 @@ class Card:
     def __str__(self):
         return str(self.rank) + " of " + suit_names[self.suit]
 
+    def __repr__(self):
+        return "Card(" + self.code() + ")"
+
     def __hash__(self):
-        return hash(repr(self))
+        return self.id
 
     def code(self):
         """Return a string code for the current card"""
@@ -120,6 +190,40 @@ class Card:
         return comparison
 
 
+SUIT_CODES = dict((suit.name[0], suit.name) for suit in Suit)
+
+CARDS = tuple(Card._create(id) for id in range(N_CARDS))  # indexed by id
+
+DECK_ORDER = tuple(Card(suit, rank) for rank in Rank for suit in Suit)
+_DECK_ORDER_IDS = bytes(card.id for card in DECK_ORDER)
+
+
+def cards_to_ids(cards: list[Card]):
+    return [card.id for card in cards]
+
+
+def ids_to_cards(ids: list[int]):
+    return [CARDS[id] for id in ids]
+
+
+def cards_to_mask(cards: list[Card]):
+    """Return the bitmask of a collection of cards (bit id set for each card)"""
+    mask = 0
+    for card in cards:
+        mask |= card.mask
+    return mask
+
+
+def mask_to_cards(mask: int):
+    """Return the cards of a bitmask, ordered by id"""
+    cards = []
+    while mask:
+        low = mask & -mask
+        cards.append(CARDS[low.bit_length() - 1])
+        mask ^= low
+    return cards
+
+
 class Hand:
     """A hand given to a player consisting of two cards"""
 
@@ -140,25 +244,107 @@ class Community:
 
 
 class Deck:
-    """Deck of cards"""
+    """Deck of cards
 
-    def __init__(self):
-        self.cards = [Card(suit, rank) for rank in Rank for suit in Suit]
+    The cards are stored as ids in a bytearray, dealt from a cursor. The
+    shuffle is a Fisher-Yates shuffle done lazily: each position is drawn
+    when it is dealt, so only the cards actually dealt are shuffled.
+
+    Args:
+        rng (random.Random, optional): Generator used to shuffle. Defaults to
+            the global one of the random module.
+    """
+
+    def __init__(self, rng: random.Random | None = None):
+        self.rng = rng
+        self.ids = bytearray(_DECK_ORDER_IDS)
+        self.cursor = 0  # position of the next card to deal
+        self.shuffled = N_CARDS  # positions before it are already drawn
 
     def __copy__(self):
-        deck = Deck()
-        deck.cards = self.cards.copy()
+        deck = Deck.__new__(Deck)
+        deck.rng = self.rng
+        deck.ids = self.ids[:]
+        deck.cursor = self.cursor
+        deck.shuffled = self.shuffled
         return deck
 
-    def shuffle(self):
-        random.shuffle(self.cards)
+    def __len__(self):
+        return N_CARDS - self.cursor
+
+    @property
+    def cards(self):
+        """Cards not dealt yet, in the order they will be dealt
+
+        Reading it draws nothing: the positions still to be drawn by a lazy
+        shuffle are drawn on a copy, with the generator put back in its
+        state afterwards. The order is the one dealt as long as nothing else
+        draws from the generator before (see draw_remaining to fix it).
+        """
+        ids = self.ids[:]
+        if self.shuffled < N_CARDS:
+            rng = self.rng or random
+            state = rng.getstate()
+            try:
+                for i in range(self.shuffled, N_CARDS):
+                    j = rng.randrange(i, N_CARDS)
+                    ids[i], ids[j] = ids[j], ids[i]
+            finally:
+                rng.setstate(state)
+        return [CARDS[id] for id in ids[self.cursor :]]
+
+    def draw_remaining(self):
+        """Draw the position of every card not dealt yet and return them, in the order they will be dealt
+
+        Drawing consumes the generator as dealing the cards would.
+        """
+        self._draw(len(self))
+        return self.cards
+
+    def shuffle(self, n: int = 0):
+        """Shuffle the cards not dealt yet
+
+        Args:
+            n (int, optional): Number of positions to draw right away, the
+                others are drawn when dealt. Drawing the positions that will
+                be dealt makes the copies of the deck deal the same cards.
+        """
+        self.shuffled = self.cursor
+        self._draw(min(n, len(self)))
+
+    def _draw(self, n: int):
+        """Draw the positions of the next n cards, if still to be shuffled"""
+        ids = self.ids
+        randrange = (self.rng or random).randrange
+        for i in range(self.shuffled, self.cursor + n):
+            j = randrange(i, N_CARDS)
+            ids[i], ids[j] = ids[j], ids[i]
+        self.shuffled = max(self.shuffled, self.cursor + n)
+
+    def deal_ids(self, n: int):
+        """Deal n cards, returning their ids"""
+        if n > len(self):
+            raise ValueError("Not enough cards in the deck.")
+        self._draw(n)
+        ids = self.ids[self.cursor : self.cursor + n]
+        self.cursor += n
+        return ids
 
     def pop(self):
-        return self.cards.pop(0)
+        return CARDS[self.deal_ids(1)[0]]
+
+    def deal_hands(self, n: int):
+        """Return n hands of two cards, each dealt with two consecutive cards"""
+        ids = self.deal_ids(2 * n)
+        return [Hand([CARDS[ids[i]], CARDS[ids[i + 1]]]) for i in range(0, 2 * n, 2)]
+
+    def deal_board(self, k: int):
+        """Return the next k cards"""
+        return [CARDS[id] for id in self.deal_ids(k)]
 
     def deal_hand(self):
         """Return a hand consisting of two cards"""
-        return Hand([self.pop(), self.pop()])
+        return self.deal_hands(1)[0]
 
     def deal_community_cards(self, community: Community):
         """Add community cards to the community object
@@ -171,10 +357,10 @@ class Deck:
         """
         if community.cards:
             # deal turn or river
-            community.cards.append(self.pop())
+            community.cards += self.deal_board(1)
         else:
             # deal flop
-            community.cards += [self.pop(), self.pop(), self.pop()]
+            community.cards += self.deal_board(3)
 
 
 class Player:
@@ -185,18 +371,46 @@ class Player:
 
 
 class Players:
-    """Class for managing the collection of players of the game"""
+    """Class for managing the collection of players of the game
+
+    Players sit on a ring of seats (their indexes in the starting players).
+    The active seats are kept in a bitmask, and each seat points to the
+    next and to the previous active seat, so moving around the table
+    takes constant time. Removing a player only updates the pointers of
+    its two neighbours.
+    """
     def __init__(self, players: list[Player]):
         self.starting = players  # starting players (immutable)
+        self.seats = dict((player, seat) for seat, player in enumerate(players))
         self.active = players.copy()  # active players (players who haven't lost)
+        self.active_mask = (1 << len(players)) - 1
+        # next and previous active seat of each seat, -1 if there is none
+        self.next_seats = [(seat + 1) % len(players) for seat in range(len(players))]
+        self.previous_seats = [(seat - 1) % len(players) for seat in range(len(players))]
+
+    @classmethod
+    def with_active(cls, players: list[Player], active_mask: int):
+        """Build the collection with only the players whose seat is in a bitmask active"""
+        collection = cls(players)
+        for seat in range(len(players)):
+            if not active_mask >> seat & 1:
+                collection._remove_seat(seat)
+        collection.active = [player for seat, player in enumerate(players) if active_mask >> seat & 1]
+        return collection
 
     def __copy__(self):
-        players = Players(self.starting)
+        players = Players.__new__(Players)
+        players.starting = self.starting
+        players.seats = self.seats
         players.active = self.active.copy()
+        players.active_mask = self.active_mask
+        players.next_seats = self.next_seats.copy()
+        players.previous_seats = self.previous_seats.copy()
         return players
 
     def is_active(self, player: Player):
-        return player in self.active
+        seat = self.seats.get(player)
+        return seat is not None and self.active_mask >> seat & 1 == 1
 
     def get_n_starting(self):
         """Get number of starting players
@@ -208,88 +422,144 @@ class Players:
         """
         return len(self.active)
 
+    def mask_of(self, players):
+        """Return the bitmask of the seats of some players"""
+        mask = 0
+        for player in players:
+            mask |= 1 << self.seats[player]
+        return mask
+
     def remove_losers(self, chips: dict[Player, int]):
         """Remove losers from the active players
         """
+        for player in self.active:
+            if chips[player] <= 0:
+                self._remove_seat(self.seats[player])
         self.active = [player for player in self.active if chips[player] > 0]
 
-    def next_to(self, player: Player):
+    def _remove_seat(self, seat: int):
+        """Unlink a seat from the ring of the active seats"""
+        self.active_mask &= ~(1 << seat)
+        next_seat, previous_seat = self.next_seats[seat], self.previous_seats[seat]
+        if next_seat == seat:
+            # it was the only active seat
+            self.next_seats[seat] = self.previous_seats[seat] = -1
+            return
+
+        # the removed seat keeps pointing to its neighbours (see _active_after)
+        self.next_seats[previous_seat] = next_seat
+        self.previous_seats[next_seat] = previous_seat
+
+    def _active_after(self, seat: int, pointers: list[int]):
+        """First active seat following the pointers from a seat, -1 if there is none
+
+        The pointers of an active seat lead to active seats. A removed seat
+        points to the seats that were around it when it was removed, which
+        may have been removed since: they are followed until an active one.
+        """
+        seat = pointers[seat]
+        while seat != -1 and not self.active_mask >> seat & 1:
+            seat = pointers[seat]
+        return seat
+
+    def _seat_of(self, player: Player):
+        seat = self.seats.get(player)
+        if seat is None:
+            raise ValueError("The player was not among the players of this game.")
+        return seat
+
+    def next_to(self, player: Player, skip: int = 0):
         """Return player after the player obtained as parameter
 
         Args:
             player (Player): A player of the game
+            skip (int, optional): Bitmask of seats to skip (e.g. the players who
+                folded). If every other player is skipped, player is returned.
 
         Raises:
-            ValueError: If the player parameter is not present in the players of the game
+            ValueError: If the player parameter is not present in the players
+                of the game, if there is no other active player, or if every
+                active player is skipped and player is not active
 
         Returns:
             Player: The player next to the player obtained as parameter
         """
-        idx = self.starting.index(player)
-        n_checked = 1
-
-        while n_checked < self.get_n_starting():
-            idx += 1
-            idx %= self.get_n_starting()
-            possible_next_player = self.starting[idx]
-            if self.is_active(possible_next_player):
-                return possible_next_player
-            n_checked += 1
-
-        raise ValueError("The player was not among the players of this game.")
-
-    def previous_than(self, player: Player):
+        start = self._seat_of(player)
+        seat = self._active_after(start, self.next_seats)
+        if seat == -1 or seat == start:
+            raise ValueError("There is no other active player.")
+
+        # the active seats are visited at most once each
+        for _ in range(len(self.active)):
+            if not skip >> seat & 1 or seat == start:
+                return self.starting[seat]
+            seat = self.next_seats[seat]
+        raise ValueError("Every active player is skipped.")
+
+    def previous_than(self, player: Player, skip: int = 0):
         """Return player before the player obtained as parameter
 
         Args:
             player (Player): A player of the game
+            skip (int, optional): Bitmask of seats to skip. If every other
+                player is skipped, player is returned.
 
         Raises:
-            ValueError: If the player parameter is not present in the players of the game
+            ValueError: If the player parameter is not present in the players
+                of the game, if there is no active player, or if every active
+                player is skipped and player is not active
 
         Returns:
             Player: The player before the player obtained as parameter
         """
-        idx = self.starting.index(player)
-        n_checked = 0
-
-        while n_checked < self.get_n_starting():
-            idx -= 1
-            if idx == -1:
-                idx = self.get_n_starting() - 1
-            idx %= self.get_n_starting()
-            possible_previous_player = self.starting[idx]
-            if self.is_active(possible_previous_player):
-                return possible_previous_player
-            n_checked += 1
-
-        raise ValueError("The player was not among the players of this game.")
-
-    def take_random(self):
+        start = self._seat_of(player)
+        seat = self._active_after(start, self.previous_seats)
+        if seat == -1:
+            raise ValueError("There is no active player.")
+
+        for _ in range(len(self.active)):
+            if not skip >> seat & 1 or seat == start:
+                return self.starting[seat]
+            seat = self.previous_seats[seat]
+        raise ValueError("Every active player is skipped.")
+
+    def order_from(self, player: Player, players: list[Player]):
+        """Sort some players by their seat, starting after the seat of player"""
+        start = self._seat_of(player)
+        n = len(self.starting)
+        return sorted(players, key=lambda other: (self.seats[other] - start - 1) % n)
+
+    def take_random(self, rng: random.Random | None = None):
         """Return a random player
 
+        Args:
+            rng (random.Random, optional): Generator to use. Defaults to the
+                global one of the random module.
+
         Returns:
             Player: A random player
         """
-        idx = random.randint(0, self.get_n_active() - 1)
+        idx = (rng or random).randint(0, self.get_n_active() - 1)
         return self.active[idx]
 
-    def first_active_from(self, player: Player):
+    def first_active_from(self, player: Player, skip: int = 0):
         """Return first active player after player (included)
 
         Args:
             player (Player): Starting player
+            skip (int, optional): Bitmask of seats to skip
         """
-        if self.is_active(player):
+        if self.is_active(player) and not skip >> self.seats[player] & 1:
             return player
-        return self.next_to(player)
+        return self.next_to(player, skip)
 
-    def first_active_from_backwards(self, player: Player):
+    def first_active_from_backwards(self, player: Player, skip: int = 0):
         """Return first active player before player (included)
 
         Args:
             player (Player): Starting player
+            skip (int, optional): Bitmask of seats to skip
         """
-        if self.is_active(player):
+        if self.is_active(player) and not skip >> self.seats[player] & 1:
             return player
-        return self.previous_than(player)
+        return self.previous_than(player, skip)
@@ -0,0 +1,42 @@
+"""Reproducible and splittable random streams
+
+A RandomStream is a random.Random (so it has shuffle, randrange, choice,
+...) seeded from a numpy.random.SeedSequence. Streams spawned from the same
+stream are independent of each other and of their parent, and depend only on
+the master seed and on their position in the spawn tree: giving the n-th
+table, worker or agent the n-th spawned stream makes a simulation
+reproducible however it is split among processes.
+"""
+import random
+
+import numpy as np
+
+
+class RandomStream(random.Random):
+    """Random generator that can be split into independent streams
+
+    Args:
+        seed (int | np.random.SeedSequence, optional): Master seed, or the seed
+            sequence of the stream. Defaults to fresh entropy.
+    """
+
+    def __init__(self, seed: int | np.random.SeedSequence | None = None):
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self.seed_sequence = seed
+        super().__init__(int.from_bytes(seed.generate_state(4, np.uint64).tobytes(), "little"))
+
+    def __reduce__(self):
+        return (self.__class__, (self.seed_sequence,), self.getstate())
+
+    def spawn(self, n: int):
+        """Return n new independent streams
+
+        Successive calls return different streams, as the children of a
+        SeedSequence do.
+        """
+        return [RandomStream(seed) for seed in self.seed_sequence.spawn(n)]
+
+    def numpy(self):
+        """Return a numpy Generator for a new independent stream"""
+        return np.random.default_rng(self.seed_sequence.spawn(1)[0])
@@ -0,0 +1,99 @@
+"""Zobrist hashing of game states
+
+Every element of a state (the round, each community card, the hole cards
+of each seat, the players who folded, the current player, ...) has a
+random 64-bit key, and the hash of a state is the XOR of the keys of its
+elements. Amounts (bets, stacks) are mixed with the key of their seat. An
+action changes a few elements, so the hash of the next state is obtained
+from the hash of the previous one with a few XORs.
+
+The hash is kept in three parts:
+    - public: everything the players see, except the bets of the round
+    - bets: the bets of the round, reset at each new round
+    - holes: the hole cards of every player, constant during a play
+"""
+import random
+
+from pyker.game.models import *
+
+MAX_SEATS = 10
+MASK = (1 << 64) - 1
+
+_rng = random.Random(0x5EED)
+
+
+def _keys(n: int):
+    return [_rng.getrandbits(64) for _ in range(n)]
+
+
+ROUND_KEYS = _keys(len(Round) + 1)
+BOARD_KEYS = _keys(N_CARDS)
+HOLE_KEYS = [_keys(N_CARDS) for _ in range(MAX_SEATS)]
+FOLDED_KEYS = _keys(MAX_SEATS)
+CURRENT_KEYS = _keys(MAX_SEATS)
+DEALER_KEYS = _keys(MAX_SEATS)
+LAST_PLAYER_KEYS = _keys(MAX_SEATS)
+LAST_BETTER_KEYS = _keys(MAX_SEATS)
+BET_KEYS = _keys(MAX_SEATS)
+CONTRIBUTION_KEYS = _keys(MAX_SEATS)
+STACK_KEYS = _keys(MAX_SEATS)
+MIN_BET_KEY, FINAL_KEY = _keys(2)
+
+
+def amount_key(key: int, amount: int):
+    """Key of an amount associated to a key (0 for no amount)"""
+    if amount == 0:
+        return 0
+    # splitmix64 finalizer
+    z = (key + amount * 0x9E3779B97F4A7C15) & MASK
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK
+    return z ^ (z >> 31)
+
+
+def seat_key(keys: list[int], players: Players, player: Player | None):
+    """Key of the seat of a player (0 for no player)"""
+    if player is None:
+        return 0
+    return keys[players.seats[player]]
+
+
+def hole_key(seat: int, hand: Hand):
+    card1, card2 = hand.cards
+    return HOLE_KEYS[seat][card1.id] ^ HOLE_KEYS[seat][card2.id]
+
+
+def compute_hashes(state):
+    """Compute from scratch the three parts of the hash of a state
+
+    Returns:
+        tuple[int, int, int]: Public, bets and holes parts
+    """
+    players = state.players
+    if players.get_n_starting() > MAX_SEATS:
+        raise ValueError(f"States with more than {MAX_SEATS} seats cannot be hashed.")
+
+    public = ROUND_KEYS[state.current_round]
+    public ^= seat_key(DEALER_KEYS, players, state.dealer)
+    public ^= seat_key(CURRENT_KEYS, players, state.current_player)
+    public ^= seat_key(LAST_PLAYER_KEYS, players, state.round_last_player)
+    public ^= seat_key(LAST_BETTER_KEYS, players, state.round_last_better)
+    public ^= amount_key(MIN_BET_KEY, state.min_allowed_bet)
+    if state.is_final:
+        public ^= FINAL_KEY
+    for card in state.community.cards:
+        public ^= BOARD_KEYS[card.id]
+
+    bets = 0
+    for seat in range(players.get_n_starting()):
+        public ^= amount_key(STACK_KEYS[seat], state.stacks[seat])
+        public ^= amount_key(CONTRIBUTION_KEYS[seat], state.contributions[seat])
+        if state.folded >> seat & 1:
+            public ^= FOLDED_KEYS[seat]
+        bets ^= amount_key(BET_KEYS[seat], state.round_bets[seat])
+
+    holes = 0
+    for player, hand in state.hands.items():
+        holes ^= hole_key(players.seats[player], hand)
+
+    return public, bets, holes
@@ -51,6 +51,7 @@ class Interface:
             players.append(Player(name, i))
 
         self.game = Game(players)
+        self.dummy_rng = self.game.rng.spawn(1)[0]  # the dummies have their own stream
         self.you = players[0]
         self.queue = Queue()
 
@@ -242,6 +243,12 @@ class Interface:
                                 self.status = GameStatus.EndGame
                             else:
                                 self.state = self.game.initial_state(self.previous_state)
+                                if self.game.is_final(self.state):
+                                    # nobody could bet: the play was dealt out at once
+                                    self.reset()
+                                    self.build_player_guis()
+                                    self.build_pot_gui()
+                                    self.status = GameStatus.ShowWinner
             elif self.status is GameStatus.EndGame:
                 if not GuiObjects.WinnerText in OBJECT_GUIS:
                     winner = [player.name for (player, chips) in self.state.chips.items() if chips > 0][0]
@@ -300,7 +307,7 @@ class Interface:
                     if self.available_actions is not None:
                         self.status = GameStatus.Choice
                 else:
-                    dummy = Dummy(self.game, self.state, self.queue)
+                    dummy = Dummy(self.game, self.state, self.queue, self.dummy_rng)
                     thread = threading.Thread(target=dummy.run)
                     thread.start()
                     self.status = GameStatus.ArtificialIntelligence
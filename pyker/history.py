@@ -0,0 +1,486 @@
+"""Hand histories: compressed, append-only files of played hands
+
+A HandRecord holds everything needed to rebuild a hand: the table, the
+number of the hand, the seed of the table (if known), the names of the
+seats, the initial State of the play (encoded by pyker.game.codec, so with
+the shuffled deck and the stacks), the actions played and the showdown
+(final stacks, winners and the seats that showed their cards).
+
+A history file starts with a header, then holds blocks of records. Each
+block has a fixed header (sizes, number of hands, number of its first hand
+in the file, range of the tables, checksum) followed by the records,
+compressed together with zlib. HistoryWriter collects the records of a
+block and compresses and writes it in a background thread, so the game
+loop only encodes them. HistoryReader reads the block headers only to build
+its index: it seeks to the block of any hand and decompresses that block
+alone, and it streams the hands one block at a time.
+
+RecordingGame is a Game that writes its plays to a HistoryWriter.
+"""
+import bisect
+import queue
+import struct
+import threading
+import zlib
+
+from pyker.game.codec import ACTION_SIZE, STATE_SIZE, decode_actions, decode_state, encode_actions, encode_state
+from pyker.game.game import Game, State
+from pyker.game.models import *
+from pyker.game.rng import RandomStream
+
+MAGIC = b"PKHH"
+BLOCK_MAGIC = b"PKHB"
+VERSION = 1
+
+FILE_HEADER = struct.Struct("<4sH")
+# magic, compressed size, raw size, hands, first hand, min table, max table, crc32
+BLOCK_HEADER = struct.Struct("<4sIIIQIII")
+# record size, table, hand, seed, has seed, seats, actions, size of the names
+RECORD_HEADER = struct.Struct("<IIIQBBHH")
+# winners and seats that showed their cards
+SHOWDOWN = struct.Struct("<HH")
+
+_RECORD_SIZE = struct.Struct("<I")
+
+_NAMES_SEPARATOR = "\x1f"
+
+
+class HandRecord:
+    """A hand as recorded in a history
+
+    Attributes:
+        table (int): Id of the table
+        hand (int): Number of the hand at the table
+        seed (int | None): Seed of the generator of the table
+        names (list[str]): Names of the players, by seat
+        state (bytes): Encoding of the initial State of the hand
+        actions (list[tuple[Action, int]]): Actions played, with their amount
+        stacks (list[int]): Chips of each seat at the end of the hand
+        winners (list[int]): Seats of the winners (of the last side pot)
+        shown (list[int]): Seats that showed their cards at the showdown
+    """
+
+    __slots__ = ("table", "hand", "seed", "names", "state", "actions", "stacks", "winners", "shown")
+
+    def __init__(
+        self,
+        table: int,
+        hand: int,
+        seed: int | None,
+        names: list[str],
+        state: bytes,
+        actions: list[tuple[Action, int]],
+        stacks: list[int],
+        winners: list[int],
+        shown: list[int],
+    ):
+        self.table = table
+        self.hand = hand
+        self.seed = seed
+        self.names = names
+        self.state = state
+        self.actions = actions
+        self.stacks = stacks
+        self.winners = winners
+        self.shown = shown
+
+    def players(self):
+        """Players of the hand, with their seat as place"""
+        return [Player(name, seat) for seat, name in enumerate(self.names)]
+
+    def initial_state(self, players: list[Player] | Players | None = None):
+        """Decode the initial State of the hand
+
+        Args:
+            players (list[Player] | Players, optional): Starting players of
+                the table. Defaults to new players with the recorded names.
+        """
+        return decode_state(self.state, players if players is not None else self.players())
+
+    def encode(self):
+        names = _NAMES_SEPARATOR.join(self.names).encode()
+        n_seats = len(self.names)
+        size = RECORD_HEADER.size + len(names) + STATE_SIZE + ACTION_SIZE * len(self.actions)
+        size += 4 * n_seats + SHOWDOWN.size
+        return b"".join(
+            (
+                RECORD_HEADER.pack(
+                    size,
+                    self.table,
+                    self.hand,
+                    self.seed if self.seed is not None else 0,
+                    self.seed is not None,
+                    n_seats,
+                    len(self.actions),
+                    len(names),
+                ),
+                names,
+                self.state,
+                encode_actions(self.actions),
+                struct.pack(f"<{n_seats}I", *self.stacks),
+                SHOWDOWN.pack(_mask(self.winners), _mask(self.shown)),
+            )
+        )
+
+    @classmethod
+    def decode(cls, buffer, offset: int = 0):
+        """Decode a record from a buffer, at an offset
+
+        Returns:
+            tuple[HandRecord, int]: The record and the offset after it
+        """
+        size, table, hand, seed, has_seed, n_seats, n_actions, names_size = RECORD_HEADER.unpack_from(
+            buffer, offset
+        )
+        position = offset + RECORD_HEADER.size
+        names = bytes(buffer[position : position + names_size]).decode()
+        position += names_size
+        state = bytes(buffer[position : position + STATE_SIZE])
+        position += STATE_SIZE
+        actions = decode_actions(buffer[position : position + ACTION_SIZE * n_actions])
+        position += ACTION_SIZE * n_actions
+        stacks = list(struct.unpack_from(f"<{n_seats}I", buffer, position))
+        winners, shown = SHOWDOWN.unpack_from(buffer, position + 4 * n_seats)
+
+        record = cls(
+            table,
+            hand,
+            seed if has_seed else None,
+            names.split(_NAMES_SEPARATOR) if n_seats else [],
+            state,
+            actions,
+            stacks,
+            _seats(winners),
+            _seats(shown),
+        )
+        return record, offset + size
+
+
+def _mask(seats: list[int]):
+    mask = 0
+    for seat in seats:
+        mask |= 1 << seat
+    return mask
+
+
+def _seats(mask: int):
+    return [seat for seat in range(mask.bit_length()) if mask >> seat & 1]
+
+
+class HistoryWriter:
+    """Append hands to a history file
+
+    Records are grouped in blocks of block_size hands. A full block is
+    handed to a background thread that compresses it and appends it to the
+    file; at most max_pending blocks wait for it, then write blocks the
+    caller (backpressure). An incomplete block at the end of an existing
+    file (e.g. after a crash) is dropped when it is opened.
+
+    Args:
+        path (str): Path of the file, created if it does not exist
+        block_size (int, optional): Hands in each block
+        level (int, optional): zlib compression level
+        max_pending (int, optional): Blocks waiting to be written at most
+    """
+
+    def __init__(self, path: str, block_size: int = 256, level: int = 6, max_pending: int = 4):
+        self.block_size = block_size
+        self.level = level
+
+        index = _read_index(path, missing_ok=True)
+        self.file = open(path, "r+b" if index is not None else "wb")
+        if index is None:
+            self.file.write(FILE_HEADER.pack(MAGIC, VERSION))
+            self.n_hands = 0
+        else:
+            blocks, end = index
+            self.file.truncate(end)
+            self.file.seek(end)
+            self.n_hands = blocks[-1].first + blocks[-1].n_hands if blocks else 0
+
+        self._records = []
+        self._tables = []
+        self._error = None
+        self._queue = queue.Queue(max_pending)
+        self._thread = threading.Thread(target=self._write_blocks, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, record: HandRecord):
+        """Add a hand to the history"""
+        if self._error is not None:
+            raise self._error
+        self._records.append(record.encode())
+        self._tables.append(record.table)
+        if len(self._records) >= self.block_size:
+            self.flush()
+
+    def flush(self):
+        """Send the hands collected so far to be written as a block"""
+        if not self._records:
+            return
+        first = self.n_hands
+        self.n_hands += len(self._records)
+        self._queue.put((b"".join(self._records), len(self._records), first, min(self._tables), max(self._tables)))
+        self._records = []
+        self._tables = []
+
+    def close(self):
+        """Write the remaining hands, wait for the writer thread and close the file"""
+        if self.file.closed:
+            return
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+        self.file.close()
+        if self._error is not None:
+            raise self._error
+
+    def _write_blocks(self):
+        while True:
+            block = self._queue.get()
+            if block is None:
+                return
+            if self._error is not None:
+                continue
+            try:
+                raw, n_hands, first, min_table, max_table = block
+                data = zlib.compress(raw, self.level)
+                header = BLOCK_HEADER.pack(
+                    BLOCK_MAGIC, len(data), len(raw), n_hands, first, min_table, max_table, zlib.crc32(data)
+                )
+                self.file.write(header + data)
+                self.file.flush()
+            except Exception as error:
+                self._error = error
+
+
+class _Block:
+    """Entry of the index of a history file"""
+
+    __slots__ = ("offset", "size", "raw_size", "n_hands", "first", "min_table", "max_table", "crc")
+
+    def __init__(self, offset, size, raw_size, n_hands, first, min_table, max_table, crc):
+        self.offset = offset  # of the compressed data
+        self.size = size
+        self.raw_size = raw_size
+        self.n_hands = n_hands
+        self.first = first
+        self.min_table = min_table
+        self.max_table = max_table
+        self.crc = crc
+
+
+def _read_index(path: str, missing_ok: bool = False):
+    """Read the headers of the blocks of a history file
+
+    Returns:
+        tuple[list[_Block], int] | None: The blocks and the end of the last
+        complete one, None if the file is missing and missing_ok
+    """
+    try:
+        file = open(path, "rb")
+    except FileNotFoundError:
+        if missing_ok:
+            return None
+        raise
+
+    with file:
+        header = file.read(FILE_HEADER.size)
+        if missing_ok and not header:
+            return None
+        if len(header) < FILE_HEADER.size or FILE_HEADER.unpack(header) != (MAGIC, VERSION):
+            raise ValueError(f"{path} is not a hand history of the current version.")
+
+        blocks = []
+        end = file.tell()
+        file_size = file.seek(0, 2)
+        while end + BLOCK_HEADER.size <= file_size:
+            file.seek(end)
+            magic, *fields = BLOCK_HEADER.unpack(file.read(BLOCK_HEADER.size))
+            offset = end + BLOCK_HEADER.size
+            if magic != BLOCK_MAGIC or offset + fields[0] > file_size:
+                break
+            blocks.append(_Block(offset, *fields))
+            end = offset + fields[0]
+
+    return blocks, end
+
+
+class HistoryReader:
+    """Read the hands of a history file
+
+    The index of the blocks is built when opening, from their headers. The
+    last decompressed block is kept, so reading hands in order decompresses
+    each block once.
+
+    Args:
+        path (str): Path of the file
+    """
+
+    def __init__(self, path: str):
+        self.blocks, _ = _read_index(path)
+        self._firsts = [block.first for block in self.blocks]
+        self.file = open(path, "rb")
+        self._cached = (None, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def __len__(self):
+        return self.blocks[-1].first + self.blocks[-1].n_hands if self.blocks else 0
+
+    def __getitem__(self, n: int):
+        """Return the n-th hand of the file"""
+        if n < 0:
+            n += len(self)
+        if not 0 <= n < len(self):
+            raise IndexError("There is no such hand in the history.")
+        block = self.blocks[bisect.bisect_right(self._firsts, n) - 1]
+        raw = self._decompress(block)
+        # skip the records before it by their size, without decoding them
+        offset = 0
+        for _ in range(n - block.first):
+            offset += _RECORD_SIZE.unpack_from(raw, offset)[0]
+        return HandRecord.decode(raw, offset)[0]
+
+    def __iter__(self):
+        return self.hands()
+
+    def hands(self, start: int = 0, stop: int | None = None, *, table: int | None = None, predicate=None):
+        """Stream the hands of the file, one block at a time
+
+        Args:
+            start (int, optional): Number of the first hand
+            stop (int, optional): Number of the hand where to stop
+            table (int, optional): Only the hands of a table; blocks
+                without it are not decompressed
+            predicate (optional): Only the records for which it is true
+
+        Yields:
+            HandRecord: The hands, in the order they were written
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        first_block = max(bisect.bisect_right(self._firsts, start) - 1, 0)
+        for block in self.blocks[first_block:]:
+            if block.first >= stop:
+                return
+            if table is not None and not block.min_table <= table <= block.max_table:
+                continue
+            for n, record in enumerate(self._records(block), block.first):
+                if n < start:
+                    continue
+                if n >= stop:
+                    return
+                if (table is None or record.table == table) and (predicate is None or predicate(record)):
+                    yield record
+
+    def _records(self, block: _Block):
+        raw = self._decompress(block)
+        offset = 0
+        for _ in range(block.n_hands):
+            record, offset = HandRecord.decode(raw, offset)
+            yield record
+
+    def _decompress(self, block: _Block):
+        cached_block, raw = self._cached
+        if cached_block is block:
+            return raw
+        self.file.seek(block.offset)
+        data = self.file.read(block.size)
+        if zlib.crc32(data) != block.crc:
+            raise ValueError(f"The block at {block.offset} of the history is corrupted.")
+        raw = memoryview(zlib.decompress(data))
+        self._cached = (block, raw)
+        return raw
+
+
+class RecordingGame(Game):
+    """A Game that writes its plays to a HistoryWriter
+
+    Plays are recorded as they are played with result, each action on the
+    state returned by the previous one; results computed again from earlier
+    states are ignored. Searches should use apply and undo, which are not
+    recorded. A play is written when it ends, which is at once when nobody
+    can bet from its initial state.
+    """
+
+    def __init__(
+        self,
+        players: list[Player],
+        writer: HistoryWriter,
+        rng: RandomStream | None = None,
+        blinds_level: int = 0,
+        *,
+        table: int = 0,
+        seed: int | None = None,
+        first_hand: int = 0,
+    ):
+        """Create a Game recording its plays
+
+        Args:
+            players (list[Player]): Players from which to start a new game
+            writer (HistoryWriter): Where to write the plays
+            rng (RandomStream, optional): Generator of the game
+            blinds_level (int, optional): Level of the blinds
+            table (int, optional): Id of the table, recorded with the hands
+            seed (int, optional): Seed of the generator, recorded with the hands
+            first_hand (int, optional): Number of the first play
+        """
+        super().__init__(players, rng, blinds_level)
+        self.writer = writer
+        self.table = table
+        self.seed = seed
+        self.hand = first_hand
+        self._state = None
+        self._initial = None
+        self._actions = []
+
+    def initial_state(self, final_state: State | None = None, **kwargs):
+        state = super().initial_state(final_state, **kwargs)
+        self._state = state
+        self._initial = encode_state(state)
+        self._actions = []
+        if state.is_final:
+            # nobody could bet: the play was dealt out at once
+            self._write(state)
+        return state
+
+    def result(self, state: State, action: Action, *, amount: int = 0, range: tuple[int, int] = (0, 0)):
+        next_state = super().result(state, action, amount=amount, range=range)
+        if state is self._state:
+            self._actions.append((action, amount if action is Action.BetOrRaise else 0))
+            self._state = next_state
+            if next_state.is_final:
+                self._write(next_state)
+        return next_state
+
+    def _write(self, state: State):
+        players = state.players
+        playing = [player for player in players.active if not state.folded >> players.seats[player] & 1]
+        self.writer.write(
+            HandRecord(
+                self.table,
+                self.hand,
+                self.seed,
+                [player.name for player in players.starting],
+                self._initial,
+                self._actions,
+                list(state.chips_by_seat),
+                [players.seats[player] for player in state.winners],
+                [players.seats[player] for player in playing] if len(playing) > 1 else [],
+            )
+        )
+        self.hand += 1
+        self._state = None
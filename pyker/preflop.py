@@ -0,0 +1,228 @@
+"""Precomputed heads-up preflop equities
+
+The tables hold the equity of every combo against every other combo (a
+1326x1326 matrix, NaN when the two combos share a card) and of every class
+of starting hands against every other class (a 169x169 matrix, averaging the
+combos of the two classes that don't share a card). Rows and columns are
+indexed as in pyker.game.combos, so by the same card ids as Card.
+
+The tables are generated once (python -m pyker.preflop) and stored in a
+versioned binary file: a fixed header followed by the two float32 matrices.
+They are loaded with numpy.memmap, so loading costs nothing and the pages
+are shared by all the processes reading the same file.
+
+The generator estimates the equity of each matchup by sampling boards. Only
+one matchup is simulated for each class of matchups that are the same up to
+a permutation of the suits, then the matrix is made consistent imposing
+equity(a, b) + equity(b, a) = 1.
+"""
+import argparse
+import concurrent.futures
+import itertools
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from pyker.game.combos import *
+from pyker.game.evaluator import evaluate_cards_batch
+from pyker.game.models import *
+
+MAGIC = b"PYKERPF\0"
+VERSION = 1
+HEADER = struct.Struct("<8sHHHxxQ")  # magic, version, combos, classes, samples
+HEADER_SIZE = 64  # the matrices start aligned
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / "assets" / "tables" / "preflop.bin"
+
+CARD_BITS = np.left_shift(np.uint64(1), np.arange(N_CARDS, dtype=np.uint64))
+
+
+class PreflopTables:
+    """Preflop equity tables loaded from a file
+
+    Attributes:
+        combos (np.ndarray): Equity of the row combo against the column combo
+        classes (np.ndarray): Equity of the row class against the column class
+        samples (int): Boards sampled for each matchup when generating the tables
+    """
+
+    def __init__(self, combos: np.ndarray, classes: np.ndarray, samples: int):
+        self.combos = combos
+        self.classes = classes
+        self.samples = samples
+
+    def equity(self, hand: Hand, other: Hand):
+        """Return the equity of hand against other"""
+        return float(self.combos[combo_index(*hand.cards), combo_index(*other.cards)])
+
+    def class_equity(self, name: str, other: str):
+        """Return the equity of a class against another one (e.g. "AKs", "QQ")"""
+        return float(self.classes[class_index(name), class_index(other)])
+
+
+def _combo_permutations():
+    """For each suit permutation, the table mapping each combo to the permuted one"""
+    tables = []
+
+    for permutation in itertools.permutations(range(4)):
+        cards = np.array([permutation[id // 13] * 13 + id % 13 for id in range(N_CARDS)])
+        tables.append(COMBO_INDEX[cards[COMBOS[:, 0]], cards[COMBOS[:, 1]]])
+
+    return np.array(tables, dtype=np.int64)
+
+
+def canonical_matchups():
+    """Group the matchups of combos not sharing cards by suit isomorphism
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: The row and
+        column combos of every valid matchup, the index of the representative
+        of each of them, and the representatives (pairs of combos)
+    """
+    rows, cols = np.nonzero((COMBO_MASKS[:, None] & COMBO_MASKS[None, :]) == 0)
+    keys = None
+
+    for table in _combo_permutations():
+        permuted = table[rows] * N_COMBOS + table[cols]
+        keys = permuted if keys is None else np.minimum(keys, permuted)
+
+    representatives, inverse = np.unique(keys, return_inverse=True)
+    return rows, cols, inverse, np.stack(divmod(representatives, N_COMBOS), axis=1)
+
+
+def _simulate_matchups(matchups: np.ndarray, samples: int, seed: np.random.SeedSequence):
+    """Estimate the equity of the first combo of each matchup
+
+    Args:
+        matchups (np.ndarray): Combo indexes, shape (m, 2)
+        samples (int): Boards sampled for each matchup
+        seed (np.random.SeedSequence): Seed of the random stream
+
+    Returns:
+        np.ndarray: Equities, shape (m,)
+    """
+    rng = np.random.default_rng(seed)
+    holes = np.repeat(COMBOS[matchups], samples, axis=0)  # (m * samples, 2, 2)
+    used = np.repeat(COMBO_MASKS[matchups[:, 0]] | COMBO_MASKS[matchups[:, 1]], samples)
+
+    boards = np.empty((len(holes), 5), dtype=np.uint8)
+    pending = np.arange(len(holes))
+    # redraw the boards with repeated cards or cards of the hands
+    while pending.size:
+        cards = rng.integers(0, N_CARDS, size=(pending.size, 5), dtype=np.uint8)
+        bits = CARD_BITS[cards]
+        masks = np.bitwise_or.reduce(bits, axis=1)
+        valid = (masks == bits.sum(axis=1)) & (masks & used[pending] == 0)
+        boards[pending[valid]] = cards[valid]
+        pending = pending[~valid]
+
+    first = evaluate_cards_batch(np.concatenate((holes[:, 0], boards), axis=1))
+    second = evaluate_cards_batch(np.concatenate((holes[:, 1], boards), axis=1))
+    shares = (first > second) + 0.5 * (first == second)
+
+    return shares.reshape(len(matchups), samples).mean(axis=1)
+
+
+def class_equities(combos: np.ndarray):
+    """Average a combo equity matrix over the combos of each pair of classes"""
+    valid = ~np.isnan(combos)
+    membership = np.zeros((N_CLASSES, N_COMBOS))
+    membership[CLASS_OF_COMBO, np.arange(N_COMBOS)] = 1
+
+    totals = membership @ np.where(valid, combos, 0) @ membership.T
+    counts = membership @ valid @ membership.T
+    return (totals / counts).astype(np.float32)
+
+
+def build_tables(
+    samples: int = 10_000,
+    *,
+    seed: int | None = None,
+    processes: int = 1,
+    chunk_size: int | None = None,
+):
+    """Generate the preflop equity tables
+
+    Args:
+        samples (int, optional): Boards sampled for each canonical matchup
+        seed (int, optional): Seed of the random streams
+        processes (int, optional): Number of worker processes
+        chunk_size (int, optional): Matchups simulated by each task. Defaults
+            to about a million boards per task.
+
+    Returns:
+        PreflopTables: The tables, held in memory
+    """
+    rows, cols, inverse, matchups = canonical_matchups()
+    chunk_size = chunk_size or max(1, 1_000_000 // samples)
+    chunks = [matchups[i : i + chunk_size] for i in range(0, len(matchups), chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+
+    if processes == 1:
+        results = list(map(_simulate_matchups, chunks, [samples] * len(chunks), seeds))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+            results = list(executor.map(_simulate_matchups, chunks, [samples] * len(chunks), seeds))
+
+    combos = np.full((N_COMBOS, N_COMBOS), np.nan)
+    combos[rows, cols] = np.concatenate(results)[inverse]
+    # the two orders of a matchup were simulated separately
+    combos = (combos + 1 - combos.T) / 2
+
+    return PreflopTables(combos.astype(np.float32), class_equities(combos), samples)
+
+
+def save_tables(tables: PreflopTables, path: Path = DEFAULT_PATH):
+    """Write the tables to a file"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, "wb") as file:
+        header = HEADER.pack(MAGIC, VERSION, N_COMBOS, N_CLASSES, tables.samples)
+        file.write(header.ljust(HEADER_SIZE, b"\0"))
+        file.write(np.ascontiguousarray(tables.combos, dtype="<f4").tobytes())
+        file.write(np.ascontiguousarray(tables.classes, dtype="<f4").tobytes())
+
+
+def load_tables(path: Path = DEFAULT_PATH):
+    """Map the tables of a file in memory
+
+    Raises:
+        ValueError: If the file is not a table file of the current version
+
+    Returns:
+        PreflopTables: The tables, backed by read-only memory maps
+    """
+    with open(path, "rb") as file:
+        header = file.read(HEADER.size)
+
+    if len(header) < HEADER.size:
+        raise ValueError("The file is not a preflop tables file.")
+    magic, version, n_combos, n_classes, samples = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError("The file is not a preflop tables file.")
+    if version != VERSION or n_combos != N_COMBOS or n_classes != N_CLASSES:
+        raise ValueError(f"Preflop tables version {version} is not supported (expected {VERSION}).")
+
+    combos = np.memmap(path, dtype="<f4", mode="r", offset=HEADER_SIZE, shape=(N_COMBOS, N_COMBOS))
+    classes = np.memmap(
+        path,
+        dtype="<f4",
+        mode="r",
+        offset=HEADER_SIZE + combos.nbytes,
+        shape=(N_CLASSES, N_CLASSES),
+    )
+    return PreflopTables(combos, classes, samples)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the preflop equity tables.")
+    parser.add_argument("path", nargs="?", default=DEFAULT_PATH, type=Path)
+    parser.add_argument("--samples", type=int, default=10_000)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    tables = build_tables(args.samples, seed=args.seed, processes=args.processes)
+    save_tables(tables, args.path)
@@ -0,0 +1,165 @@
+"""Ranges of hands
+
+A range is the set of hands a player could hold, each with a weight (its
+relative probability). It is stored as a dense float32 vector over the 1326
+combos (indexed as in pyker.game.combos), so that operations on whole ranges
+are vectorized.
+
+Ranges can be parsed from the usual notation, a comma separated list of:
+    - classes: "QQ", "AKs", "T9o", "AK" (suited and offsuit)
+    - ascending classes: "QQ+" (QQ, KK, AA), "ATs+" (ATs, AJs, AQs, AKs)
+    - spans of classes: "A5s-A2s", "KK-TT"
+    - single combos: "AsKh"
+each optionally followed by ":weight" (e.g. "KQo:0.5"). Weights default to 1.
+"""
+import re
+
+import numpy as np
+
+from pyker.game.combos import *
+from pyker.game.models import *
+
+_CLASS_PATTERN = re.compile(r"^([2-9TJQKA])([2-9TJQKA])([so]?)(\+?)$")
+_SPAN_PATTERN = re.compile(r"^([2-9TJQKA])([2-9TJQKA])([so]?)-([2-9TJQKA])([2-9TJQKA])([so]?)$")
+_COMBO_PATTERN = re.compile(r"^([2-9TJQKA])([cdhs])([2-9TJQKA])([cdhs])$")
+
+
+class Range:
+    """Weights of the 1326 combos a player could hold"""
+
+    def __init__(self, weights: np.ndarray | None = None):
+        if weights is None:
+            weights = np.zeros(N_COMBOS, dtype=np.float32)
+        self.weights = np.asarray(weights, dtype=np.float32)
+        if self.weights.shape != (N_COMBOS,):
+            raise ValueError(f"A range has {N_COMBOS} weights.")
+
+    @classmethod
+    def parse(cls, notation: str):
+        """Build a range from its notation (e.g. "QQ+, AKs, A5s-A2s, KQo:0.5")
+
+        Raises:
+            ValueError: If a part of the notation is not valid
+        """
+        weights = np.zeros(N_COMBOS, dtype=np.float32)
+
+        for token in notation.split(","):
+            token = token.strip()
+            if not token:
+                continue
+            token, _, weight = token.partition(":")
+            weights[_parse_combos(token.strip())] = float(weight) if weight else 1
+
+        return cls(weights)
+
+    @classmethod
+    def full(cls):
+        """Return the range with every combo"""
+        return cls(np.ones(N_COMBOS, dtype=np.float32))
+
+    def __len__(self):
+        return int(np.count_nonzero(self.weights))
+
+    def __iter__(self):
+        """Iterate over the combos in the range, as (Hand, weight) pairs"""
+        for index in self.combos():
+            yield Hand(combo_cards(index)), float(self.weights[index])
+
+    def __contains__(self, hand: Hand):
+        return self.weight(hand) > 0
+
+    def __eq__(self, other):
+        if not isinstance(other, Range):
+            return False
+        return np.array_equal(self.weights, other.weights)
+
+    def __or__(self, other):
+        """Union of two ranges: each combo keeps the highest weight"""
+        return Range(np.maximum(self.weights, other.weights))
+
+    def __and__(self, other):
+        """Intersection of two ranges: each combo keeps the lowest weight"""
+        return Range(np.minimum(self.weights, other.weights))
+
+    def __repr__(self):
+        return f"Range({len(self)} combos)"
+
+    def combos(self):
+        """Return the indexes of the combos with a positive weight"""
+        return np.flatnonzero(self.weights > 0)
+
+    def weight(self, hand: Hand):
+        return float(self.weights[combo_index(*hand.cards)])
+
+    def total(self):
+        """Return the sum of the weights"""
+        return float(self.weights.sum(dtype=np.float64))
+
+    def normalized(self):
+        """Return the range with the weights scaled to sum to 1"""
+        total = self.total()
+        if total == 0:
+            raise ValueError("An empty range cannot be normalized.")
+        return Range(self.weights / total)
+
+    def without(self, cards: list[Card] | Community):
+        """Return the range without the combos blocked by some cards
+
+        Args:
+            cards (list[Card] | Community): Cards that no combo can contain
+                (e.g. the community cards or the hole cards of another player)
+        """
+        if isinstance(cards, Community):
+            cards = cards.cards
+        blocked = (COMBO_MASKS & np.uint64(cards_to_mask(cards))) != 0
+        return Range(np.where(blocked, 0, self.weights))
+
+
+def _class_combos(high: str, low: str, suitedness: str):
+    """Combos of a class, or of both the suited and offsuit classes of two ranks"""
+    if high == low or suitedness:
+        return class_combos(class_index(high + low + suitedness))
+    return np.concatenate(
+        (class_combos(class_index(high + low + "s")), class_combos(class_index(high + low + "o")))
+    )
+
+
+def _parse_combos(token: str):
+    """Return the indexes of the combos described by a token of a range"""
+    match = _COMBO_PATTERN.match(token)
+    if match:
+        cards = [Card.from_code(match[1] + match[2]), Card.from_code(match[3] + match[4])]
+        return np.array([combo_index(*cards)])
+
+    match = _CLASS_PATTERN.match(token)
+    if match:
+        first, second, suitedness, plus = match.groups()
+        high, low = sorted((first, second), key=RANK_CHARS.index, reverse=True)
+        if not plus:
+            return _class_combos(high, low, suitedness)
+        if high == low:
+            # pairs from this one up to aces
+            ranks = RANK_CHARS[RANK_CHARS.index(low) :]
+            return np.concatenate([_class_combos(rank, rank, "") for rank in ranks])
+        # kickers from this one up to the rank below the high card
+        kickers = RANK_CHARS[RANK_CHARS.index(low) : RANK_CHARS.index(high)]
+        return np.concatenate([_class_combos(high, kicker, suitedness) for kicker in kickers])
+
+    match = _SPAN_PATTERN.match(token)
+    if match:
+        high1, low1, suitedness1, high2, low2, suitedness2 = match.groups()
+        if suitedness1 != suitedness2:
+            raise ValueError(f"The ends of the span {token} must have the same suitedness.")
+
+        if high1 == low1 and high2 == low2:
+            ends = sorted((RANK_CHARS.index(high1), RANK_CHARS.index(high2)))
+            ranks = RANK_CHARS[ends[0] : ends[1] + 1]
+            return np.concatenate([_class_combos(rank, rank, "") for rank in ranks])
+        if high1 == high2:
+            ends = sorted((RANK_CHARS.index(low1), RANK_CHARS.index(low2)))
+            if ends[1] >= RANK_CHARS.index(high1):
+                raise ValueError(f"The kickers of the span {token} must be lower than {high1}.")
+            kickers = RANK_CHARS[ends[0] : ends[1] + 1]
+            return np.concatenate([_class_combos(high1, kicker, suitedness1) for kicker in kickers])
+
+    raise ValueError(f"{token} is not a valid part of a range.")
@@ -0,0 +1,334 @@
+"""Deterministic replay of logged games
+
+A GameLog is the compact log of a game played at a table: the seed of its
+generator, the names of the seats and the actions played, hand after hand.
+The game is replayed with Game.result as the table played it: each play
+follows the previous one (Game.initial_state), and a new game starts with
+the same generator when less than two players have chips left (as in
+pyker.sim).
+
+Replay replays a log once, storing a checkpoint every interval actions: the
+State encoded by pyker.game.codec and the state of the generator. The State
+at any action of any hand is then rebuilt from the closest checkpoint
+before it, replaying at most interval actions.
+
+verify replays every hand of a hand history (pyker.history) from its
+initial State, in parallel, and reports where it diverges from what was
+recorded:
+
+    python -m pyker.replay hands.pkh --processes 8
+"""
+import argparse
+import array
+import bisect
+import concurrent.futures
+import struct
+
+from pyker.game.codec import ACTION_SIZE, STATE_SIZE, decode_actions, decode_state, encode_actions, encode_state_into
+from pyker.game.game import Game, State
+from pyker.game.models import *
+from pyker.game.rng import RandomStream
+from pyker.history import HandRecord, HistoryReader
+
+MAGIC = b"PKGL"
+VERSION = 1
+
+# magic, version, seed, size of the names, actions
+LOG_HEADER = struct.Struct("<4sHQHI")
+
+_NAMES_SEPARATOR = "\x1f"
+
+
+class GameLog:
+    """Seed and actions of a game played at a table
+
+    Attributes:
+        seed (int): Seed of the generator of the table (a RandomStream)
+        names (list[str]): Names of the players, by seat
+        actions (list[tuple[Action, int]]): Actions played, with their amount
+    """
+
+    def __init__(self, seed: int, names: list[str], actions: list[tuple[Action, int]] | None = None):
+        self.seed = seed
+        self.names = names
+        self.actions = actions if actions is not None else []
+
+    @classmethod
+    def from_history(cls, records: list[HandRecord]):
+        """Log of the consecutive hands of a table, recorded with their seed"""
+        actions = []
+        for record in records:
+            actions += record.actions
+        return cls(records[0].seed, records[0].names, actions)
+
+    def players(self):
+        """Players of the game, with their seat as place"""
+        return [Player(name, seat) for seat, name in enumerate(self.names)]
+
+    def encode(self):
+        names = _NAMES_SEPARATOR.join(self.names).encode()
+        header = LOG_HEADER.pack(MAGIC, VERSION, self.seed, len(names), len(self.actions))
+        return header + names + encode_actions(self.actions)
+
+    @classmethod
+    def decode(cls, buffer):
+        magic, version, seed, names_size, n_actions = LOG_HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("The buffer does not hold a game log of the current version.")
+        names = bytes(buffer[LOG_HEADER.size : LOG_HEADER.size + names_size]).decode()
+        start = LOG_HEADER.size + names_size
+        actions = decode_actions(buffer[start : start + ACTION_SIZE * n_actions])
+        return cls(seed, names.split(_NAMES_SEPARATOR), actions)
+
+
+def play(game: Game, state: State, action: Action, amount: int = 0):
+    """Play a logged action, checking that it is available
+
+    Raises:
+        ValueError: If the action is not available in the state
+    """
+    for available in game.actions(state):
+        if isinstance(available, tuple):
+            if available[0] is action:
+                return game.result(state, action, amount=amount, range=available[1])
+        elif available is action:
+            return game.result(state, action)
+    raise ValueError(f"The action {action} is not available.")
+
+
+def next_play(game: Game, final_state: State):
+    """Game and initial state of the play following a final state"""
+    if final_state.endgame:
+        game = Game(game.players.starting, game.rng)
+        return game, game.initial_state()
+    return game, game.initial_state(final_state)
+
+
+class Replay:
+    """Random access to the states of a logged game
+
+    Args:
+        log (GameLog): The log to replay
+        interval (int, optional): Actions between two checkpoints
+
+    Raises:
+        ValueError: If an action of the log is not available when it is played
+    """
+
+    def __init__(self, log: GameLog, interval: int = 64):
+        self.log = log
+        self.interval = interval
+        self.players = log.players()
+        self.hand_starts = [0]  # index in the log of the first action of each hand
+
+        # checkpoints, in order: (hand, action), State and generator
+        self._positions = []
+        self._states = bytearray()
+        self._rng_states = []
+
+        game = Game(self.players, RandomStream(log.seed))
+        state = game.initial_state()
+        hand = 0
+        action_index = 0
+        since_checkpoint = interval
+
+        for i, (action, amount) in enumerate(log.actions):
+            # plays dealt out at once have no action
+            while state.is_final:
+                game, state = next_play(game, state)
+                self.hand_starts.append(i)
+                hand += 1
+                action_index = 0
+            if since_checkpoint >= interval:
+                self._checkpoint(hand, action_index, state, game.rng)
+                since_checkpoint = 0
+            state = play(game, state, action, amount)
+            action_index += 1
+            since_checkpoint += 1
+
+        self.final_state = state
+
+    def _checkpoint(self, hand: int, action: int, state: State, rng: RandomStream):
+        version, internal, gauss_next = rng.getstate()
+        self._positions.append((hand, action))
+        self._states += bytes(STATE_SIZE)
+        encode_state_into(state, self._states, len(self._states) - STATE_SIZE)
+        self._rng_states.append((version, array.array("I", internal), gauss_next))
+
+    @property
+    def n_hands(self):
+        return len(self.hand_starts)
+
+    def hand_length(self, hand: int):
+        """Number of actions of a hand in the log"""
+        end = self.hand_starts[hand + 1] if hand + 1 < self.n_hands else len(self.log.actions)
+        return end - self.hand_starts[hand]
+
+    def state(self, hand: int, action: int = 0):
+        """Return the State of a hand after some of its actions
+
+        Args:
+            hand (int): Number of the hand
+            action (int, optional): Number of actions played in the hand;
+                the initial State by default
+
+        Raises:
+            IndexError: If the log has no such hand or action
+
+        Returns:
+            State: The State, rebuilt from the closest checkpoint
+        """
+        if not 0 <= hand < self.n_hands or not 0 <= action <= self.hand_length(hand):
+            raise IndexError("The log has no such action.")
+
+        i = bisect.bisect_right(self._positions, (hand, action)) - 1
+        if i < 0:
+            # the log is empty: only the first initial state
+            game = Game(self.players, RandomStream(self.log.seed))
+            return game.initial_state()
+
+        checkpoint_hand, checkpoint_action = self._positions[i]
+        version, internal, gauss_next = self._rng_states[i]
+        rng = RandomStream(self.log.seed)
+        rng.setstate((version, tuple(internal), gauss_next))
+        game = Game(self.players, rng)
+        state = decode_state(self._states, self.players, i * STATE_SIZE)
+
+        index = self.hand_starts[checkpoint_hand] + checkpoint_action
+        for _ in range(checkpoint_hand, hand):
+            # replay the rest of the hand, then deal the next one
+            while not state.is_final:
+                state = play(game, state, *self.log.actions[index])
+                index += 1
+            game, state = next_play(game, state)
+        for _ in range(self.hand_starts[hand] + action - index):
+            state = play(game, state, *self.log.actions[index])
+            index += 1
+        return state
+
+
+class Divergence:
+    """A hand whose replay differs from what was recorded
+
+    Attributes:
+        hand (int): Number of the hand in the history
+        action (int | None): Number of the action that could not be
+            played, None if the hand was replayed entirely
+        message (str): What differs
+    """
+
+    __slots__ = ("hand", "action", "message")
+
+    def __init__(self, hand: int, action: int | None, message: str):
+        self.hand = hand
+        self.action = action
+        self.message = message
+
+    def __getstate__(self):
+        return (self.hand, self.action, self.message)
+
+    def __setstate__(self, state):
+        self.hand, self.action, self.message = state
+
+    def __repr__(self):
+        where = f"hand {self.hand}" if self.action is None else f"hand {self.hand}, action {self.action}"
+        return f"Divergence({where}: {self.message})"
+
+
+def replay_hand(record: HandRecord, players: list[Player] | None = None):
+    """Replay a recorded hand from its initial State
+
+    Returns:
+        State: The State after the recorded actions
+    """
+    players = players if players is not None else record.players()
+    game = Game(players)
+    state = record.initial_state(players)
+    for action, amount in record.actions:
+        state = play(game, state, action, amount)
+    return state
+
+
+def check_hand(n: int, record: HandRecord):
+    """Replay a recorded hand and compare it with the record
+
+    Returns:
+        Divergence | None: What differs, None if the replay agrees
+    """
+    players = record.players()
+    game = Game(players)
+    state = record.initial_state(players)
+    for i, (action, amount) in enumerate(record.actions):
+        if state.is_final:
+            return Divergence(n, i, "the hand ended before this action")
+        try:
+            state = play(game, state, action, amount)
+        except ValueError as error:
+            return Divergence(n, i, str(error))
+
+    if not state.is_final:
+        return Divergence(n, None, "the hand did not end")
+    if list(state.chips_by_seat) != record.stacks:
+        return Divergence(n, None, f"stacks {list(state.chips_by_seat)} instead of {record.stacks}")
+    winners = [state.players.seats[player] for player in state.winners]
+    if winners != record.winners:
+        return Divergence(n, None, f"winners {winners} instead of {record.winners}")
+    return None
+
+
+def verify_range(path: str, start: int, stop: int):
+    """Check the hands of a history from start to stop
+
+    Returns:
+        list[Divergence]: The hands whose replay differs from the record
+    """
+    divergences = []
+    with HistoryReader(path) as reader:
+        for n, record in enumerate(reader.hands(start, stop), start):
+            divergence = check_hand(n, record)
+            if divergence is not None:
+                divergences.append(divergence)
+    return divergences
+
+
+def verify(path: str, processes: int = 1):
+    """Replay every hand of a history, splitting it by blocks among processes
+
+    Returns:
+        tuple[int, list[Divergence]]: The number of hands checked and the
+        hands whose replay differs from the record
+    """
+    with HistoryReader(path) as reader:
+        n_hands = len(reader)
+        # a few ranges per process, each one a run of whole blocks
+        firsts = [block.first for block in reader.blocks]
+    n_ranges = min(len(firsts), 4 * processes)
+    bounds = [firsts[len(firsts) * i // n_ranges] for i in range(n_ranges)] + [n_hands]
+    arguments = ([path] * n_ranges, bounds[:-1], bounds[1:])
+
+    divergences = []
+    if processes == 1:
+        for found in map(verify_range, *arguments):
+            divergences += found
+    else:
+        with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+            for found in executor.map(verify_range, *arguments):
+                divergences += found
+    return n_hands, divergences
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a hand history and report divergences.")
+    parser.add_argument("path")
+    parser.add_argument("--processes", type=int, default=1)
+    args = parser.parse_args()
+
+    n_hands, divergences = verify(args.path, args.processes)
+    for divergence in divergences:
+        print(divergence)
+    print(f"{n_hands} hands replayed, {len(divergences)} divergences")
+    return 1 if divergences else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
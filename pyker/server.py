@@ -0,0 +1,490 @@
+"""Game server for many tables
+
+The server hosts tables of n_players seats on one asyncio event loop, for
+human testers and bots connected over local TCP or Unix sockets:
+
+    python -m pyker.server --port 7777 --players 6 --timeout 10
+
+The protocol is line-delimited JSON, one object per line with a "type".
+A client sends:
+
+    {"type": "join", "name": "bot"}
+        Take a seat at the first table with a free seat. A connection can
+        hold several seats, at the same table or at different ones.
+    {"type": "act", "table": 3, "seat": 1, "action": "bet", "amount": 100}
+        Play the action of a seat (fold, check, call or bet), when asked.
+
+and receives:
+
+    {"type": "seated", "table": 3, "seat": 1}
+    {"type": "start", "table": 3, "names": [...]}
+        The table is full and the first hand begins.
+    {"type": "turn", "table": 3, "seat": 1, "hand": 0, "hole": ["AS", "10H"],
+     "board": [...], "chips": [...], "bets": [...], "pot": 75, "dealer": 0,
+     "actions": ["fold", "call", "bet"], "range": [50, 1950], "timeout": 10.0}
+        The seat must act within timeout seconds, or it checks (or folds).
+    {"type": "action", "table": 3, "seat": 1, "action": "bet", "amount": 100}
+        An action played at the table (sent once to each connection seated).
+    {"type": "end", "table": 3, "hand": 0, "chips": [...], "winners": [...]}
+    {"type": "closed", "table": 3}
+        The table stopped: no seat still playing has a connection.
+    {"type": "error", "message": "..."}
+
+Seats, chips and bets are indexed by seat. Each table plays its hands with
+Game.initial_state and Game.result as pyker.sim does, starting a new game
+when less than two players have chips left, while a seat still playing is
+connected. Seats of a closed connection check or fold at once.
+
+The event loop only moves messages: Game.initial_state and Game.result run
+in an executor.
+Messages to a client go through a bounded queue: a table waits while the
+queue of a connection is full, and a connection whose queue stays full for
+a whole action timeout is closed. pyker.client measures the actions per
+second and the latency of a server.
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import json
+
+from pyker.game.game import Game, State
+from pyker.game.models import *
+from pyker.game.rng import RandomStream
+from pyker.replay import play
+
+MESSAGE_LIMIT = 64 * 1024  # longest line a client can send
+
+ACTION_NAMES = dict((str(action), action) for action in Action)
+
+
+def encode_message(message: dict):
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+def decode_message(line: bytes):
+    """Decode a line of the protocol
+
+    Raises:
+        ValueError: If the line is not a JSON object with a type
+    """
+    message = json.loads(line)
+    if not isinstance(message, dict) or "type" not in message:
+        raise ValueError("A message is a JSON object with a type.")
+    return message
+
+
+class Connection:
+    """A client connection, with a bounded queue of lines to send
+
+    Args:
+        writer (asyncio.StreamWriter): The writer of the connection
+        max_pending (int): Lines that can wait to be sent
+        send_timeout (float): Seconds a full queue can block a sender before
+            the connection is closed
+    """
+
+    def __init__(self, writer: asyncio.StreamWriter, max_pending: int, send_timeout: float):
+        self.writer = writer
+        self.send_timeout = send_timeout
+        self.queue = asyncio.Queue(max_pending)
+        self.seats = []  # (table, seat)
+        self.closed = False
+        self.closing = False
+        self.write_task = asyncio.create_task(self._write_loop())
+
+    async def _write_loop(self):
+        try:
+            while True:
+                # write every queued line at once
+                lines = [await self.queue.get()]
+                while not self.queue.empty():
+                    lines.append(self.queue.get_nowait())
+                if None in lines:
+                    # close() queues None last: nothing after it is sent
+                    self.writer.write(b"".join(lines[: lines.index(None)]))
+                    break
+                self.writer.write(b"".join(lines))
+                await self.writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.closed = True
+            self.writer.close()
+
+    async def send(self, message: dict):
+        """Queue a message, waiting while the queue is full
+
+        Returns:
+            bool: False if the connection is (or gets) closed
+        """
+        return await self.send_line(encode_message(message))
+
+    async def send_line(self, line: bytes):
+        """Queue an encoded message (see send)"""
+        if self.closed or self.closing:
+            return False
+        if not self.queue.full():
+            self.queue.put_nowait(line)
+            return True
+        try:
+            await asyncio.wait_for(self.queue.put(line), self.send_timeout)
+        except asyncio.TimeoutError:
+            # the client does not read what it is sent
+            self.abort()
+            return False
+        return True
+
+    def abort(self):
+        self.closed = True
+        self.writer.transport.abort()
+
+    async def close(self):
+        """Send the queued messages, then close"""
+        if not self.closed and not self.closing:
+            self.closing = True
+            try:
+                self.queue.put_nowait(None)
+            except asyncio.QueueFull:
+                self.abort()
+        await self.write_task
+
+
+class ServerTable:
+    """A table of the server
+
+    Attributes:
+        id (int): Number of the table
+        connections (list[Connection | None]): Connection of each seat, None
+            for free seats (or seats whose connection is closed)
+        names (list[str]): Names of the players, by seat
+        hand (int): Number of the hand being played
+        pending (tuple[int, asyncio.Future] | None): The seat expected to
+            act and the future its action is set into
+    """
+
+    def __init__(self, id: int, n_players: int, rng: RandomStream):
+        self.id = id
+        self.rng = rng
+        self.connections = [None] * n_players
+        self.names = [None] * n_players
+        self.hand = 0
+        self.pending = None
+        self.task = None
+
+    @property
+    def is_full(self):
+        return all(name is not None for name in self.names)
+
+    def free_seat(self):
+        return self.names.index(None)
+
+    @property
+    def is_abandoned(self):
+        return all(connection is None for connection in self.connections)
+
+    def is_connected(self, seat: int):
+        connection = self.connections[seat]
+        return connection is not None and not connection.closed
+
+    def _distinct_connections(self):
+        connections = []
+        for connection in self.connections:
+            if connection is not None and connection not in connections:
+                connections.append(connection)
+        return connections
+
+    async def broadcast(self, message: dict):
+        line = encode_message(message)
+        for connection in self._distinct_connections():
+            await connection.send_line(line)
+
+
+class GameServer:
+    """Host of many tables on one event loop
+
+    Args:
+        n_players (int, optional): Seats at each table
+        action_timeout (float, optional): Seconds a seat has to act
+        max_pending (int, optional): Messages that can wait to be sent to a
+            connection
+        max_seats (int, optional): Seats a connection can hold
+        workers (int, optional): Threads running the games
+        seed (int, optional): Master seed of the tables
+    """
+
+    def __init__(
+        self,
+        n_players: int = 6,
+        *,
+        action_timeout: float = 10.0,
+        max_pending: int = 256,
+        max_seats: int = 16,
+        workers: int = 1,
+        seed: int | None = None,
+    ):
+        self.n_players = n_players
+        self.action_timeout = action_timeout
+        self.max_pending = max_pending
+        self.max_seats = max_seats
+        self.executor = concurrent.futures.ThreadPoolExecutor(workers)
+        self.seed_sequence = RandomStream(seed).seed_sequence
+        self.tables = {}
+        self.open_table = None
+        self.n_tables = 0
+        self.n_actions = 0
+
+    async def start(self, host: str = "127.0.0.1", port: int = 7777, path: str | None = None):
+        """Start listening on a TCP port, or on a Unix socket if a path is given
+
+        Returns:
+            asyncio.Server: The listening server
+        """
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path, limit=MESSAGE_LIMIT)
+        return await asyncio.start_server(self.handle, host, port, limit=MESSAGE_LIMIT)
+
+    async def close(self):
+        """Stop the tables, then the executor"""
+        tasks = [table.task for table in self.tables.values() if table.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.executor.shutdown()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve a connection until the client closes it"""
+        connection = Connection(writer, self.max_pending, self.action_timeout)
+        try:
+            while not connection.closed:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break  # line too long, or connection reset
+                if not line:
+                    break
+                try:
+                    message = decode_message(line)
+                except ValueError:
+                    await connection.send({"type": "error", "message": "Invalid message."})
+                    continue
+                try:
+                    await self.dispatch(connection, message)
+                except (TypeError, KeyError):
+                    # a field of the wrong type
+                    await connection.send({"type": "error", "message": "Invalid message."})
+        finally:
+            self.leave(connection)
+            await connection.close()
+
+    async def dispatch(self, connection: Connection, message: dict):
+        if message["type"] == "join":
+            await self.join(connection, str(message.get("name", "Player")))
+        elif message["type"] == "act":
+            error = self.act(connection, message)
+            if error is not None:
+                await connection.send({"type": "error", "message": error})
+        else:
+            await connection.send({"type": "error", "message": f"Unknown message type {message['type']}."})
+
+    async def join(self, connection: Connection, name: str):
+        if len(connection.seats) >= self.max_seats:
+            await connection.send({"type": "error", "message": "Too many seats for one connection."})
+            return
+
+        if self.open_table is None:
+            self.open_table = ServerTable(
+                self.n_tables, self.n_players, RandomStream(self.seed_sequence.spawn(1)[0])
+            )
+            self.tables[self.n_tables] = self.open_table
+            self.n_tables += 1
+
+        table = self.open_table
+        seat = table.free_seat()
+        table.connections[seat] = connection
+        table.names[seat] = name
+        connection.seats.append((table.id, seat))
+        if table.is_full:
+            self.open_table = None
+        await connection.send({"type": "seated", "table": table.id, "seat": seat})
+
+        if table.is_full and table.task is None and table.id in self.tables:
+            table.task = asyncio.create_task(self.run_table(table))
+
+    def act(self, connection: Connection, message: dict):
+        """Hand the action of a message to its table
+
+        Returns:
+            str | None: Why the action cannot be played, None if it can
+        """
+        table_id, seat = message.get("table"), message.get("seat")
+        if not isinstance(table_id, int) or not isinstance(seat, int) or (table_id, seat) not in connection.seats:
+            return "You have no such seat."
+        table = self.tables.get(table_id)
+        if table is None:
+            return "You have no such seat."
+        if table.pending is None or table.pending[0] != seat or table.pending[1].done():
+            return "It is not your turn."
+        name, amount = message.get("action"), message.get("amount", 0)
+        if not isinstance(name, str) or name not in ACTION_NAMES or not isinstance(amount, int):
+            return "Invalid action."
+        action = ACTION_NAMES[name]
+        table.pending[1].set_result((action, amount))
+        return None
+
+    def leave(self, connection: Connection):
+        """Free the seats of a closed connection"""
+        for table_id, seat in connection.seats:
+            table = self.tables.get(table_id)
+            if table is None:
+                continue
+            table.connections[seat] = None
+            if table is self.open_table:
+                # the table has not started: the seat can be taken again
+                table.names[seat] = None
+                if table.is_abandoned:
+                    del self.tables[table.id]
+                    self.open_table = None
+            elif table.pending is not None and table.pending[0] == seat and not table.pending[1].done():
+                table.pending[1].set_result(None)
+        connection.seats.clear()
+
+    async def run_table(self, table: ServerTable):
+        """Play the hands of a full table while a connected seat is still playing"""
+        loop = asyncio.get_running_loop()
+        players = [Player(name, seat) for seat, name in enumerate(table.names)]
+        game = Game(players, table.rng)
+        state = await loop.run_in_executor(self.executor, game.initial_state)
+        await table.broadcast({"type": "start", "table": table.id, "names": table.names})
+
+        try:
+            while any(table.is_connected(state.players.seats[player]) for player in state.players.active):
+                while not state.is_final:
+                    seat = state.players.seats[state.current_player]
+                    state, action, amount = await self.decide(table, game, state, seat)
+                    self.n_actions += 1
+                    await table.broadcast(
+                        {"type": "action", "table": table.id, "seat": seat, "action": str(action), "amount": amount}
+                    )
+
+                await table.broadcast(
+                    {
+                        "type": "end",
+                        "table": table.id,
+                        "hand": table.hand,
+                        "chips": list(state.chips_by_seat),
+                        "winners": [state.players.seats[player] for player in state.winners],
+                    }
+                )
+                table.hand += 1
+                if state.endgame:
+                    game = Game(players, table.rng)
+                    state = await loop.run_in_executor(self.executor, game.initial_state)
+                else:
+                    state = await loop.run_in_executor(self.executor, game.initial_state, state)
+
+            await table.broadcast({"type": "closed", "table": table.id})
+        finally:
+            del self.tables[table.id]
+            for seat, connection in enumerate(table.connections):
+                if connection is not None:
+                    connection.seats.remove((table.id, seat))
+
+    async def decide(self, table: ServerTable, game: Game, state: State, seat: int):
+        """Ask a seat for its action until it plays a valid one or its time is over
+
+        Returns:
+            tuple[State, Action, int]: The next State, the action and its amount
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.action_timeout
+        connection = table.connections[seat]
+        if connection is not None:
+            await connection.send(self.turn_message(table, game, state, seat))
+
+        while table.connections[seat] is connection and table.is_connected(seat):
+            future = loop.create_future()
+            table.pending = (seat, future)
+            try:
+                chosen = await asyncio.wait_for(future, deadline - loop.time())
+            except asyncio.TimeoutError:
+                break
+            finally:
+                table.pending = None
+            if chosen is None:
+                break  # the connection was closed
+            action, amount = chosen
+            try:
+                next_state = await loop.run_in_executor(self.executor, play, game, state, action, amount)
+            except ValueError as error:
+                await connection.send({"type": "error", "message": str(error)})
+                continue
+            return next_state, action, amount
+
+        # check if possible, fold otherwise
+        action = Action.Check if state.current_player_bet == state.highest_bet else Action.Fold
+        return await loop.run_in_executor(self.executor, play, game, state, action, 0), action, 0
+
+    def turn_message(self, table: ServerTable, game: Game, state: State, seat: int):
+        actions = []
+        bet_range = None
+        for action in game.actions(state):
+            if isinstance(action, tuple):
+                action, bet_range = action
+            actions.append(str(action))
+        return {
+            "type": "turn",
+            "table": table.id,
+            "seat": seat,
+            "hand": table.hand,
+            "hole": [card.code() for card in state.hands[state.current_player].cards],
+            "board": [card.code() for card in state.community.cards],
+            "chips": list(state.chips_by_seat),
+            "bets": list(state.round_bets),
+            "pot": state.get_pot(),
+            "dealer": state.players.seats[state.dealer],
+            "actions": actions,
+            "range": list(bet_range) if bet_range is not None else None,
+            "timeout": self.action_timeout,
+        }
+
+
+async def serve(args):
+    server = GameServer(
+        args.players,
+        action_timeout=args.timeout,
+        max_pending=args.max_pending,
+        max_seats=args.max_seats,
+        workers=args.workers,
+        seed=args.seed,
+    )
+    listening = await server.start(args.host, args.port, args.unix)
+    where = args.unix if args.unix is not None else f"{args.host}:{args.port}"
+    print(f"serving tables of {args.players} on {where}")
+    try:
+        async with listening:
+            await listening.serve_forever()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve poker tables over local sockets.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument("--unix", default=None, help="path of a Unix socket, instead of TCP")
+    parser.add_argument("--players", type=int, default=6, help="players per table")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds to act")
+    parser.add_argument("--max-pending", type=int, default=256, help="messages queued per connection")
+    parser.add_argument("--max-seats", type=int, default=16, help="seats per connection")
+    parser.add_argument("--workers", type=int, default=1, help="threads running the games")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
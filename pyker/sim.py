@@ -0,0 +1,233 @@
+"""Headless simulation of many tables
+
+Tables are played with Game.initial_state and Game.result by agents: any
+object built as agent_class(player, rng) with a method act(game, state)
+returning (action, amount, range), like pyker.ai.dummy.RandomAgent. When a
+game ends (one player left with chips) the table starts a new one.
+
+Each table gets its own random stream spawned from one master seed, and
+the results are yielded in table order, so a simulation gives the same
+results however many processes run it. Worker processes send the results of
+the hands through a queue while they play (every FLUSH_INTERVAL seconds): the
+hands of the first table are yielded while it is played, the ones of the
+next tables are kept until the tables before them are done.
+
+    python -m pyker.sim --tables 32 --hands 10000 --processes 8 --seed 0
+"""
+import argparse
+import collections
+import concurrent.futures
+import multiprocessing
+import queue
+import time
+
+import numpy as np
+
+from pyker.ai.dummy import RandomAgent
+from pyker.game.game import Game
+from pyker.game.models import *
+from pyker.game.rng import RandomStream
+
+# seconds a worker keeps results before sending them, to send fewer messages
+FLUSH_INTERVAL = 0.05
+
+
+class HandResult:
+    """Result of a hand played at a table
+
+    Attributes:
+        table (int): Index of the table
+        hand (int): Index of the hand at the table
+        winners (list[int]): Seats of the winners (of the last side pot)
+        deltas (tuple[int, ...]): Chips won (or lost, if negative) by each seat
+        actions (int): Number of actions played
+    """
+
+    __slots__ = ("table", "hand", "winners", "deltas", "actions")
+
+    def __init__(self, table: int, hand: int, winners: list[int], deltas: tuple[int, ...], actions: int):
+        self.table = table
+        self.hand = hand
+        self.winners = winners
+        self.deltas = deltas
+        self.actions = actions
+
+    def __getstate__(self):
+        return (self.table, self.hand, self.winners, self.deltas, self.actions)
+
+    def __setstate__(self, state):
+        self.table, self.hand, self.winners, self.deltas, self.actions = state
+
+
+def play_table(
+    table: int,
+    seed: np.random.SeedSequence,
+    n_hands: int,
+    n_players: int = 6,
+    agent_class=RandomAgent,
+):
+    """Play the hands of a table
+
+    Args:
+        table (int): Index of the table
+        seed (np.random.SeedSequence): Seed of the random stream of the table
+        n_hands (int): Number of hands to play
+        n_players (int, optional): Number of players at the table
+        agent_class (optional): Class (or factory) of the agents
+
+    Yields:
+        HandResult: The result of each hand, as soon as it is played
+    """
+    rng = RandomStream(seed)
+    players = [Player(f"Player {i}", i) for i in range(n_players)]
+    # the game and the agents draw from independent streams
+    game_rng, *agent_rngs = rng.spawn(n_players + 1)
+    agents = dict((player, agent_class(player, agent_rng)) for player, agent_rng in zip(players, agent_rngs))
+
+    game = Game(players, game_rng)
+    state = game.initial_state()
+
+    for hand in range(n_hands):
+        initial_state = state
+        actions = 0
+        while not game.is_final(state):
+            action, amount, bet_range = agents[state.current_player].act(game, state)
+            state = game.result(state, action, amount=amount, range=bet_range)
+            actions += 1
+
+        deltas = tuple(
+            final - initial for final, initial in zip(state.chips_by_seat, initial_state.stacks)
+        )
+        winners = [game.players.seats[player] for player in state.winners]
+        yield HandResult(table, hand, winners, deltas, actions)
+
+        if state.endgame:
+            game = Game(players, game_rng)
+            state = game.initial_state()
+        else:
+            state = game.initial_state(state)
+
+
+# queue of the results and event stopping the tables, in the worker processes
+_results = None
+_stop = None
+
+
+def _init_worker(results: multiprocessing.Queue, stop: multiprocessing.Event):
+    global _results, _stop
+    _results = results
+    _stop = stop
+    # simulate only leaves the pool once every result is read, or when they
+    # are not wanted anymore: exiting must not wait for the queue to be read
+    results.cancel_join_thread()
+
+
+def _stream_table(*arguments):
+    batch = []
+    last_flush = time.perf_counter()
+    for result in play_table(*arguments):
+        batch.append(result)
+        if time.perf_counter() - last_flush >= FLUSH_INTERVAL:
+            if _stop.is_set():
+                return
+            _results.put(batch)
+            batch = []
+            last_flush = time.perf_counter()
+    _results.put(batch)
+
+
+def simulate(
+    n_tables: int,
+    n_hands: int,
+    *,
+    n_players: int = 6,
+    agent_class=RandomAgent,
+    seed: int | None = None,
+    processes: int = 1,
+):
+    """Play n_hands hands at each of n_tables tables
+
+    Args:
+        n_tables (int): Number of tables
+        n_hands (int): Hands played at each table
+        n_players (int, optional): Players at each table
+        agent_class (optional): Class of the agents, picklable to use processes
+        seed (int, optional): Master seed
+        processes (int, optional): Number of worker processes
+
+    Yields:
+        HandResult: The results of the hands, table by table
+    """
+    seeds = RandomStream(seed).seed_sequence.spawn(n_tables)
+
+    if processes == 1:
+        for table in range(n_tables):
+            yield from play_table(table, seeds[table], n_hands, n_players, agent_class)
+        return
+
+    results = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    executor = concurrent.futures.ProcessPoolExecutor(
+        processes, initializer=_init_worker, initargs=(results, stop)
+    )
+    try:
+        futures = [
+            executor.submit(_stream_table, table, seeds[table], n_hands, n_players, agent_class)
+            for table in range(n_tables)
+        ]
+        # results received before the ones of the tables before them
+        waiting = [collections.deque() for _ in range(n_tables)]
+
+        for table in range(n_tables):
+            for _ in range(n_hands):
+                while not waiting[table]:
+                    try:
+                        batch = results.get(timeout=0.1)
+                    except queue.Empty:
+                        for future in futures:
+                            if future.done() and future.exception() is not None:
+                                raise future.exception()
+                        continue
+                    if batch:
+                        waiting[batch[0].table].extend(batch)
+                yield waiting[table].popleft()
+    finally:
+        # the tables still playing stop if the caller stops reading
+        stop.set()
+        executor.shutdown(cancel_futures=True)
+        results.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate poker tables without the interface.")
+    parser.add_argument("--tables", type=int, default=8)
+    parser.add_argument("--hands", type=int, default=1000, help="hands per table")
+    parser.add_argument("--players", type=int, default=6, help="players per table")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true", help="print every hand")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    hands = 0
+    actions = 0
+    won = [0] * args.players
+
+    for result in simulate(
+        args.tables, args.hands, n_players=args.players, seed=args.seed, processes=args.processes
+    ):
+        hands += 1
+        actions += result.actions
+        for seat, delta in enumerate(result.deltas):
+            won[seat] += delta
+        if args.verbose:
+            print(f"table {result.table} hand {result.hand}: winners {result.winners}, chips {result.deltas}")
+
+    elapsed = time.perf_counter() - start
+    print(f"{hands} hands, {actions} actions in {elapsed:.2f}s: {hands / elapsed:.0f} hands/s")
+    for seat, chips in enumerate(won):
+        print(f"seat {seat}: {chips / hands:+.2f} chips per hand")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+"""Simulated multi-table tournaments
+
+Entrants are seated at tables of at most table_size players, each table
+playing its hands with its own Game and agents (built as in pyker.sim).
+The blinds go up one level of blinds_table at a time, either every
+hands_per_level hands or on a simulated clock at the times of
+blinds_table, a hand lasting seconds_per_hand plus seconds_per_action for
+each action played.
+
+Tables play independently, in a process pool, for a segment: until the
+end of the level or for balance_every hands (or seconds) at most. The
+tournament only synchronizes between segments: the players who busted get
+their finishing positions, tables are broken as players bust and the
+others are balanced, and the blinds go up when the level is over. Every
+table draws from a stream spawned from the master seed, so a tournament
+has the same results however many processes run it:
+
+    python -m pyker.tournament --entrants 1000 --hands-per-level 20 --processes 8 --seed 0
+"""
+import argparse
+import concurrent.futures
+import math
+import time
+
+import numpy as np
+
+from pyker.ai.dummy import RandomAgent
+from pyker.game.game import Game
+from pyker.game.models import *
+from pyker.game.rng import RandomStream
+
+LAST_LEVEL = max(blinds_table)
+
+
+class SegmentResult:
+    """Result of the hands played by a table in a segment
+
+    Attributes:
+        table (int): Id of the table
+        stacks (list[int]): Chips of the players of the table, in seat order
+        busts (list[tuple[float, int, int, int]]): Players who busted, as
+            (clock, chips at the start of the hand, table, entrant)
+        button (int): Index of the dealer of the next hand among the
+            players left at the table
+        hands (int): Number of hands played
+        actions (int): Number of actions played
+    """
+
+    __slots__ = ("table", "stacks", "busts", "button", "hands", "actions")
+
+    def __init__(self, table: int, stacks: list[int], busts: list, button: int, hands: int, actions: int):
+        self.table = table
+        self.stacks = stacks
+        self.busts = busts
+        self.button = button
+        self.hands = hands
+        self.actions = actions
+
+    def __getstate__(self):
+        return (self.table, self.stacks, self.busts, self.button, self.hands, self.actions)
+
+    def __setstate__(self, state):
+        self.table, self.stacks, self.busts, self.button, self.hands, self.actions = state
+
+
+def play_segment(
+    table: int,
+    entrants: list[int],
+    stacks: list[int],
+    button: int,
+    blinds_level: int,
+    clock: tuple[float, float],
+    durations: tuple[float, float],
+    seed: np.random.SeedSequence,
+    agent_class=RandomAgent,
+):
+    """Play the hands of a table in a segment
+
+    Hands are started while the clock of the table is before the end of the
+    segment, or until a single player is left with chips.
+
+    Args:
+        table (int): Id of the table
+        entrants (list[int]): Ids of the players of the table, in seat order
+        stacks (list[int]): Chips of the players
+        button (int): Index of the dealer of the first hand
+        blinds_level (int): Level of the blinds
+        clock (tuple[float, float]): Clock at the start and at the end of the segment
+        durations (tuple[float, float]): Duration of a hand and of an action
+        seed (np.random.SeedSequence): Seed of the random stream of the table
+        agent_class (optional): Class (or factory) of the agents
+
+    Returns:
+        SegmentResult: The result of the segment
+    """
+    now, end = clock
+    hand_duration, action_duration = durations
+    players = [Player(f"Player {entrant}", entrant) for entrant in entrants]
+    # the game and the agents draw from independent streams
+    game_rng, *agent_rngs = RandomStream(seed).spawn(len(players) + 1)
+    agents = dict((player, agent_class(player, agent_rng)) for player, agent_rng in zip(players, agent_rngs))
+
+    game = Game(players, game_rng, blinds_level)
+    state = game.initial_state(stacks=stacks, dealer=players[button])
+    busts = []
+    hands = 0
+    actions = 0
+
+    while True:
+        initial_state = state
+        while not game.is_final(state):
+            action, amount, bet_range = agents[state.current_player].act(game, state)
+            state = game.result(state, action, amount=amount, range=bet_range)
+            actions += 1
+            now += action_duration
+        now += hand_duration
+        hands += 1
+
+        chips = state.chips_by_seat
+        for player in initial_state.players.active:
+            seat = initial_state.players.seats[player]
+            if chips[seat] == 0:
+                busts.append((now, initial_state.stacks[seat], table, player.place))
+
+        if state.endgame or now >= end:
+            break
+        state = game.initial_state(state)
+
+    # the button moves to the next player left at the table
+    survivors = [seat for seat, seat_chips in enumerate(chips) if seat_chips > 0]
+    dealer = state.players.seats[state.dealer]
+    next_dealers = [index for index, seat in enumerate(survivors) if seat > dealer]
+    button = next_dealers[0] if next_dealers else 0
+
+    return SegmentResult(table, list(chips), busts, button, hands, actions)
+
+
+class Table:
+    """Table of a tournament
+
+    Attributes:
+        id (int): Id of the table
+        entrants (list[int]): Ids of the players seated, in seat order
+        button (int): Index of the dealer of the next hand
+    """
+
+    __slots__ = ("id", "entrants", "button")
+
+    def __init__(self, id: int, entrants: list[int], button: int = 0):
+        self.id = id
+        self.entrants = entrants
+        self.button = button
+
+    def __len__(self):
+        return len(self.entrants)
+
+    def seat(self, entrant: int):
+        """Seat a player right before the button, the last to pay the blinds"""
+        self.entrants.insert(self.button, entrant)
+        self.button += 1
+
+    def unseat(self, index: int):
+        """Remove the player at an index of the table, keeping the button on the same dealer"""
+        entrant = self.entrants.pop(index)
+        if index < self.button:
+            self.button -= 1
+        if self.button >= len(self.entrants):
+            self.button = 0
+        return entrant
+
+
+class Tournament:
+    """Multi-table tournament of simulated players
+
+    Attributes:
+        stacks (list[int]): Chips of each entrant
+        tables (list[Table]): Tables still playing, by id
+        positions (dict[int, int]): Finishing position of the entrants out
+            of the tournament (and of the winner, at the end)
+        blinds_level (int): Level of the blinds
+        clock (float): Clock of the tournament, in hands or seconds
+        hands (int): Hands played at all the tables
+        actions (int): Actions played at all the tables
+        segments (int): Segments played
+    """
+
+    def __init__(
+        self,
+        n_entrants: int,
+        table_size: int = 9,
+        starting_chips: int = 2000,
+        *,
+        hands_per_level: int | None = None,
+        seconds_per_hand: float = 30.0,
+        seconds_per_action: float = 10.0,
+        balance_every: float | None = None,
+        agent_class=RandomAgent,
+        seed: int | None = None,
+    ):
+        """Seat the entrants at random
+
+        Args:
+            n_entrants (int): Number of players
+            table_size (int, optional): Maximum number of players at a table
+            starting_chips (int, optional): Chips of each player at the start
+            hands_per_level (int, optional): Hands played at each table in a
+                level of the blinds. By default levels last the times of
+                blinds_table on the simulated clock.
+            seconds_per_hand (float, optional): Simulated duration of a hand
+            seconds_per_action (float, optional): Simulated duration of an action
+            balance_every (float, optional): Maximum duration of a segment, in
+                hands if hands_per_level is given, in seconds otherwise. By
+                default 10 hands or 10 minutes.
+            agent_class (optional): Class of the agents, picklable to use
+                processes. Agents are built again at each segment.
+            seed (int, optional): Master seed
+        """
+        if n_entrants < 2:
+            raise ValueError("A tournament needs at least two players.")
+        if table_size < 3:
+            raise ValueError("Tables must have room for at least three players.")
+
+        self.table_size = table_size
+        self.hands_per_level = hands_per_level
+        if hands_per_level is not None:
+            self.durations = (1.0, 0.0)
+            self.balance_every = balance_every if balance_every is not None else 10
+        else:
+            self.durations = (seconds_per_hand, seconds_per_action)
+            self.balance_every = balance_every if balance_every is not None else 10 * 60
+        self.agent_class = agent_class
+
+        rng = RandomStream(seed)
+        self.seed_sequence = rng.seed_sequence
+        entrants = list(range(n_entrants))
+        rng.shuffle(entrants)
+        n_tables = math.ceil(n_entrants / table_size)
+        self.tables = [Table(id, entrants[id::n_tables]) for id in range(n_tables)]
+        for table in self.tables:
+            table.button = rng.randrange(len(table))
+
+        self.stacks = [starting_chips] * n_entrants
+        self.positions = {}
+        self.blinds_level = 0
+        self.clock = 0.0
+        self.hands = 0
+        self.actions = 0
+        self.segments = 0
+
+    @property
+    def n_remaining(self):
+        return sum(len(table) for table in self.tables)
+
+    def level_end(self):
+        """Clock at which the current level of the blinds ends"""
+        if self.blinds_level >= LAST_LEVEL:
+            return math.inf
+        if self.hands_per_level is not None:
+            return (self.blinds_level + 1) * self.hands_per_level
+        return blinds_table[self.blinds_level]["time"]
+
+    def run(self, processes: int = 1):
+        """Play the tournament until a single player is left
+
+        Args:
+            processes (int, optional): Number of worker processes
+
+        Returns:
+            list[int]: The entrants by finishing position, from the winner
+        """
+        if processes == 1:
+            while self.n_remaining > 1:
+                self.run_segment(map)
+        else:
+            with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+                while self.n_remaining > 1:
+                    self.run_segment(executor.map)
+
+        winner = self.tables[0].entrants[0]
+        self.positions[winner] = 1
+        return sorted(self.positions, key=self.positions.get)
+
+    def run_segment(self, map=map):
+        """Play a segment at every table, then give the positions and balance the tables
+
+        Args:
+            map (optional): Function used to map play_segment over the
+                tables (e.g. the map of an executor)
+        """
+        end = min(self.level_end(), self.clock + self.balance_every)
+        seeds = self.seed_sequence.spawn(len(self.tables))
+        tables = self.tables
+        arguments = (
+            [table.id for table in tables],
+            [table.entrants for table in tables],
+            [[self.stacks[entrant] for entrant in table.entrants] for table in tables],
+            [table.button for table in tables],
+            [self.blinds_level] * len(tables),
+            [(self.clock, end)] * len(tables),
+            [self.durations] * len(tables),
+            seeds,
+            [self.agent_class] * len(tables),
+        )
+
+        busts = []
+        for table, result in zip(tables, map(play_segment, *arguments)):
+            self.hands += result.hands
+            self.actions += result.actions
+            for entrant, chips in zip(table.entrants, result.stacks):
+                self.stacks[entrant] = chips
+            table.entrants = [entrant for entrant in table.entrants if self.stacks[entrant] > 0]
+            table.button = result.button
+            busts += result.busts
+
+        # who busted first (or with less chips in the same hand) finishes last
+        n_remaining = self.n_remaining + len(busts)
+        for _, _, _, entrant in sorted(busts):
+            self.positions[entrant] = n_remaining
+            n_remaining -= 1
+
+        self.segments += 1
+        self.clock = end
+        if self.clock >= self.level_end():
+            self.blinds_level += 1
+        self.tables = [table for table in tables if len(table) > 0]
+        self.balance()
+
+    def balance(self):
+        """Break tables while the others can seat their players, then balance them
+
+        Players of a broken table go one at a time to the table with the
+        fewest players. Then the next big blind of the largest table moves
+        to the smallest one until they differ by one player at most.
+        """
+        needed = math.ceil(self.n_remaining / self.table_size)
+        while len(self.tables) > needed:
+            broken = min(self.tables, key=lambda table: (len(table), -table.id))
+            self.tables.remove(broken)
+            for entrant in broken.entrants:
+                min(self.tables, key=lambda table: (len(table), table.id)).seat(entrant)
+
+        while len(self.tables) > 1:
+            largest = max(self.tables, key=lambda table: (len(table), table.id))
+            smallest = min(self.tables, key=lambda table: (len(table), table.id))
+            if len(largest) - len(smallest) <= 1:
+                break
+            smallest.seat(largest.unseat((largest.button + 2) % len(largest)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a multi-table tournament.")
+    parser.add_argument("--entrants", type=int, default=1000)
+    parser.add_argument("--table-size", type=int, default=9)
+    parser.add_argument("--chips", type=int, default=2000, help="starting chips")
+    parser.add_argument("--hands-per-level", type=int, default=None, help="by default levels follow the clock")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--top", type=int, default=10, help="finishing positions to print")
+    args = parser.parse_args()
+
+    tournament = Tournament(
+        args.entrants, args.table_size, args.chips, hands_per_level=args.hands_per_level, seed=args.seed
+    )
+    start = time.perf_counter()
+    standings = tournament.run(args.processes)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{args.entrants} entrants, {tournament.hands} hands, {tournament.actions} actions, "
+        f"{tournament.segments} segments in {elapsed:.2f}s: {tournament.hands / elapsed:.0f} hands/s"
+    )
+    print(f"last blinds level: {tournament.blinds_level}")
+    for position, entrant in enumerate(standings[: args.top], 1):
+        print(f"{position}. Player {entrant}")
+
+
+if __name__ == "__main__":
+    main()
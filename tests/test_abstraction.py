@@ -0,0 +1,111 @@
+import random
+
+import pytest
+
+from pyker.game.abstraction import *
+from pyker.game.game import Game
+from pyker.game.models import *
+from pyker.game.rng import RandomStream
+
+
+def _bet_range(game, state):
+    for action in game.actions(state):
+        if isinstance(action, tuple):
+            return action[1]
+    return None
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_legal_mask_agrees_with_game(seed):
+    rng = random.Random(seed)
+    abstraction = BetAbstraction((MIN_RAISE, 0.33, 0.5, 1.0, 2.0, ALL_IN))
+    game = Game([Player(str(i), i) for i in range(rng.randint(2, 8))], RandomStream(seed))
+    state = game.initial_state()
+
+    for _ in range(300):
+        mask = abstraction.legal_mask(state)
+        available = game.actions(state)
+        assert (Action.Fold in available) == abstraction.is_legal(state, FOLD)
+        assert (Action.Check in available) == abstraction.is_legal(state, CHECK)
+        assert (Action.Call in available) == abstraction.is_legal(state, CALL)
+
+        bet_range = _bet_range(game, state)
+        bets = [action for action in iter_actions(mask) if action >= FIRST_BET]
+        assert bool(bets) == (bet_range is not None)
+        amounts = [abstraction.to_game(state, action)[1] for action in bets]
+        assert amounts == sorted(set(amounts))  # no two ids for the same bet
+        if bet_range is not None:
+            assert amounts[0] == bet_range[0]
+            assert amounts[-1] == bet_range[1]
+
+        action = rng.choice(list(iter_actions(mask)))
+        state = abstraction.result(game, state, action)
+        if state.is_final:
+            if state.endgame:
+                break
+            state = game.initial_state(state)
+
+
+def test_pot_fractions():
+    abstraction = BetAbstraction((0.5, 1.0, ALL_IN))
+    game = Game([Player(str(i), i) for i in range(3)], RandomStream(0))
+    state = game.initial_state()
+
+    # 75 in the pot, 50 to call: a pot bet raises by 125
+    assert abstraction.to_game(state, FIRST_BET + 1) == (Action.BetOrRaise, 125, (50, 1950))
+    assert abstraction.to_game(state, FIRST_BET) == (Action.BetOrRaise, 62, (50, 1950))
+    assert abstraction.to_game(state, FIRST_BET + 2) == (Action.BetOrRaise, 1950, (50, 1950))
+    assert abstraction.describe(FIRST_BET) == "bet 0.5 pot"
+    assert abstraction.describe(FIRST_BET + 2) == "bet all-in"
+
+    with pytest.raises(ValueError):
+        abstraction.to_game(state, CHECK)
+
+
+def test_from_game_maps_to_closest_size():
+    abstraction = BetAbstraction((MIN_RAISE, 1.0, ALL_IN))
+    game = Game([Player(str(i), i) for i in range(3)], RandomStream(0))
+    state = game.initial_state()
+
+    assert abstraction.from_game(state, Action.Call) == CALL
+    # the sizes are 50, 125 and 1950
+    assert abstraction.from_game(state, Action.BetOrRaise, 50) == FIRST_BET
+    assert abstraction.from_game(state, Action.BetOrRaise, 87) == FIRST_BET
+    assert abstraction.from_game(state, Action.BetOrRaise, 88) == FIRST_BET + 1
+    assert abstraction.from_game(state, Action.BetOrRaise, 1200) == FIRST_BET + 2
+    with pytest.raises(ValueError):
+        abstraction.from_game(state, Action.Check)
+
+
+def test_from_game_without_legal_size():
+    abstraction = BetAbstraction((MIN_RAISE, ALL_IN))
+    game = Game([Player(str(i), i) for i in range(3)], RandomStream(0))
+    state = game.initial_state()
+
+    # drop the bet sizes, as if none was legal
+    abstraction.sizes = ()
+    with pytest.raises(ValueError):
+        abstraction.from_game(state, Action.BetOrRaise, 100)
+
+
+def test_apply_and_undo():
+    abstraction = BetAbstraction()
+    game = Game([Player(str(i), i) for i in range(4)], RandomStream(1))
+    state = game.initial_state()
+    mutable = state.mutable()
+
+    record = abstraction.apply(game, mutable, FIRST_BET + 2)
+    assert mutable.zobrist_hash == abstraction.result(game, state, FIRST_BET + 2).zobrist_hash
+    game.undo(mutable, record)
+    assert mutable.zobrist_hash == state.zobrist_hash
+
+
+@pytest.mark.parametrize("sizes", [(), (1.0, 0.5), (ALL_IN, 1.0), (1.0, MIN_RAISE), (0.5, 0.5), (0,), ("pot",)])
+def test_invalid_sizes(sizes):
+    with pytest.raises(ValueError):
+        BetAbstraction(sizes)
+
+
+def test_iter_actions():
+    assert list(iter_actions(0)) == []
+    assert list(iter_actions(0b101101)) == [0, 2, 3, 5]
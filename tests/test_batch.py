@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from tests.util import *
+from pyker.game.batch import *
+from pyker.game.game import Game
+from pyker.game.rng import RandomStream
+
+
+def _assert_same_table(batch: BatchGame, table: int, state):
+    players = state.players
+    assert batch.stacks[table].tolist() == list(state.stacks)
+    assert batch.round_bets[table].tolist() == list(state.round_bets)
+    assert batch.contributions[table].tolist() == list(state.contributions)
+    assert batch.active[table].tolist() == [players.is_active(player) for player in players.starting]
+    assert batch.dealer[table] == players.seats[state.dealer]
+    assert batch.current[table] == players.seats[state.current_player]
+    assert batch.street[table] == state.current_round
+    assert batch.min_allowed_bet[table] == state.min_allowed_bet
+    assert [CARDS[id] for id in batch.board[table, : batch.n_board[table]]] == state.community.cards
+    for player, hand in state.hands.items():
+        assert batch.holes[table, players.seats[player]].tolist() == [card.id for card in hand.cards]
+
+
+@pytest.mark.parametrize("n_players", [2, 3, 6])
+def test_same_plays_as_game(n_players):
+    n_tables = 4
+    batch = BatchGame(n_tables, n_players, seed=n_players)
+    players = [[Player(f"Player {i}", i) for i in range(n_players)] for _ in range(n_tables)]
+    games = [Game(players[table], rng) for table, rng in enumerate(RandomStream(n_players).spawn(n_tables))]
+    states = [game.initial_state() for game in games]
+    rng = np.random.default_rng(0)
+
+    for _ in range(500):
+        actions, amounts = random_actions(batch, rng)
+        lowest, highest = batch.bet_ranges()
+        legal = batch.legal_actions()
+        ends, deltas = batch.step(actions, amounts)
+
+        for table, game in enumerate(games):
+            state = states[table]
+            available = [action[0] if isinstance(action, tuple) else action for action in game.actions(state)]
+            assert sorted(available, key=ACTIONS.index) == [ACTIONS[code] for code in np.flatnonzero(legal[table])]
+
+            state = game.result(
+                state,
+                ACTIONS[actions[table]],
+                amount=int(amounts[table]),
+                range=(int(lowest[table]), int(highest[table])),
+            )
+            assert state.is_final == ends[table]
+            chips = [0] * n_players
+            stacks = states[table].stacks
+            while state.is_final:
+                # the next play may be dealt out at once
+                for seat, (final, initial) in enumerate(zip(state.chips_by_seat, stacks)):
+                    chips[seat] += final - initial
+                winners = [state.players.seats[player] for player in state.winners]
+                if state.endgame:
+                    games[table] = Game(players[table], game.rng)
+                    stacks = [2000] * n_players
+                    state = games[table].initial_state()
+                else:
+                    stacks = state.chips_by_seat
+                    state = games[table].initial_state(state)
+            if ends[table]:
+                assert deltas[table].tolist() == chips
+                assert np.flatnonzero(batch.winners[table]).tolist() == winners
+
+            states[table] = state
+            _assert_same_table(batch, table, state)
+
+
+def test_chips_are_conserved():
+    batch = BatchGame(64, 6, seed=1, starting_chips=500)
+    rng = np.random.default_rng(1)
+
+    for _ in range(300):
+        games = batch.games.copy()
+        ends, deltas = batch.step(*random_actions(batch, rng))
+        assert (deltas.sum(axis=1) == 0).all()
+        assert not deltas[~ends].any()
+        # a table keeps its chips until a new game starts
+        same_game = batch.games == games
+        assert (batch.stacks.sum(axis=1)[same_game] == 6 * 500).all()
+        assert ((batch.chips + batch.contributions).sum(axis=1)[same_game] == 6 * 500).all()
+
+    assert batch.games.sum() > 64
+
+
+def test_per_table_seeds():
+    first = BatchGame(3, 4, seed=[5, 6, 7])
+    second = BatchGame(2, 4, seed=[7, 5])
+    assert first.holes[2].tolist() == second.holes[0].tolist()
+    assert first.board[0].tolist() == second.board[1].tolist()
+
+    with pytest.raises(ValueError):
+        BatchGame(3, 4, seed=[5, 6])
+    with pytest.raises(ValueError):
+        BatchGame(3, 2, seed=0, starting_chips=blinds_table[0]["small"])
+
+
+def test_illegal_actions():
+    batch = BatchGame(2, 3, seed=0)
+    # the blinds have been bet: checking is not possible
+    with pytest.raises(ValueError):
+        batch.step([CHECK, CHECK])
+
+    lowest, highest = batch.bet_ranges()
+    with pytest.raises(ValueError):
+        batch.step([BET_OR_RAISE, CALL], [highest[0] + 1, 0])
+    with pytest.raises(ValueError):
+        batch.step([BET_OR_RAISE, CALL], [lowest[0] - 1, 0])
+
+    batch.step([BET_OR_RAISE, CALL], [lowest[0], 0])
@@ -0,0 +1,116 @@
+import copy
+import random
+import timeit
+
+import pytest
+
+from tests.util import *
+from pyker.game.codec import *
+from pyker.game.game import Game
+from pyker.game.rng import RandomStream
+
+
+def fields(state):
+    return (
+        [player.place for player in state.players.active],
+        state.current_round,
+        state.current_player,
+        state.dealer,
+        state.round_last_player,
+        state.round_last_better,
+        state.stacks,
+        state.round_bets,
+        state.contributions,
+        state.folded,
+        state.min_allowed_bet,
+        state.blinds_level,
+        state.is_initial,
+        state.is_final,
+        state.winners,
+        state.community.cards,
+        sorted((player.place, hand.cards) for player, hand in state.hands.items()),
+        bytes(state.deck.ids),
+        state.deck.cursor,
+    )
+
+
+def play(seed):
+    """Yield the states of a few random plays"""
+    rng = random.Random(seed)
+    game = Game([Player(str(i), i) for i in range(rng.randint(2, 8))], RandomStream(seed))
+    state = game.initial_state()
+
+    for _ in range(5):
+        yield state
+        while not game.is_final(state):
+            action = rng.choice(game.actions(state))
+            if isinstance(action, tuple):
+                action, bet_range = action
+                state = game.result(state, action, amount=rng.randint(*bet_range), range=bet_range)
+            else:
+                state = game.result(state, action)
+            yield state
+        if state.endgame:
+            break
+        state = game.initial_state(state)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_round_trip(seed):
+    states = list(play(seed))
+    players = states[0].players.starting
+
+    # packed one after another in a buffer
+    buffer = bytearray(STATE_SIZE * len(states))
+    for i, state in enumerate(states):
+        encode_state_into(state, buffer, i * STATE_SIZE)
+    view = memoryview(buffer)
+
+    for i, state in enumerate(states):
+        assert encode_state(state) == view[i * STATE_SIZE : (i + 1) * STATE_SIZE]
+        decoded = decode_state(view, players, i * STATE_SIZE)
+        assert fields(decoded) == fields(state)
+        assert decoded.zobrist_hash == state.zobrist_hash
+        assert encode_state(decoded) == encode_state(state)
+
+
+def test_round_trip_limits():
+    states = list(play(1))
+    final = next(state for state in states if state.is_final)
+    decoded = decode_state(encode_state(final), final.players)
+    assert final.side_pots and decoded.side_pots is None
+    assert decoded.deck.rng is None
+
+    # with a generator in the same state, the decoded deck deals the same cards
+    game = Game([Player(str(i), i) for i in range(3)], RandomStream(5))
+    state = game.initial_state()
+    state.deck.shuffle()
+    rng = copy.deepcopy(state.deck.rng)
+    decoded = decode_state(encode_state(state), state.players, rng=rng)
+    assert decoded.deck.rng is rng
+    assert decoded.deck.deal_board(5) == state.deck.deal_board(5)
+
+
+def test_state_size_and_speed():
+    state = next(play(0))
+    assert STATE_SIZE < 300
+    assert timeit.timeit(lambda: encode_state(state), number=1000) < 0.1
+
+
+def test_decode_errors():
+    state = next(play(0))
+    data = bytearray(encode_state(state))
+
+    with pytest.raises(ValueError):
+        decode_state(data, [Player(str(i), i) for i in range(state.players.get_n_starting() + 1)])
+    data[0:4] = b"XXXX"
+    with pytest.raises(ValueError):
+        decode_state(data, state.players)
+
+
+def test_actions():
+    actions = [(Action.Call, 0), (Action.BetOrRaise, 150), (Action.Fold, 0), (Action.Check, 0)]
+    data = encode_actions(actions)
+
+    assert len(data) == ACTION_SIZE * len(actions)
+    assert decode_actions(memoryview(data)) == actions
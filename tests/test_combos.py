@@ -0,0 +1,39 @@
+import pytest
+
+from tests.util import *
+from pyker.game.combos import *
+
+
+def test_combo_index():
+    seen = set()
+
+    for card1 in CARDS:
+        for card2 in CARDS:
+            if card1 is card2:
+                continue
+            index = combo_index(card1, card2)
+            assert index == combo_index(card2, card1)
+            assert set(combo_cards(index)) == {card1, card2}
+            seen.add(index)
+
+    assert seen == set(range(N_COMBOS))
+
+
+@pytest.mark.parametrize(
+    "name,cards,size",
+    [
+        ("AA", [(S, RA), (H, RA)], 6),
+        ("AKs", [(D, RK), (D, RA)], 4),
+        ("T9o", [(C, R10), (H, R9)], 12),
+        ("32o", [(S, R2), (C, R3)], 12),
+    ],
+)
+def test_hand_class(name, cards, size):
+    index = class_index(name)
+    assert class_name(index) == name
+    assert hand_class(*build_cards(cards)) == index
+    assert len(class_combos(index)) == size
+
+
+def test_classes():
+    assert sorted(set(CLASS_OF_COMBO.tolist())) == list(range(N_CLASSES))
@@ -0,0 +1,127 @@
+import itertools
+
+import pytest
+
+from tests.util import *
+from tests.util import build_hand as bh, build_community as bcm
+from pyker.equity import estimate_equity, exact_equity
+from pyker.game.evaluator import evaluate
+
+
+def test_estimate_equity():
+    result = estimate_equity(
+        [bh((S, RA), (H, RA)), bh((S, RK), (H, RK))],
+        precision=0.005,
+        seed=0,
+    )
+    low, high = result.interval()
+
+    # AA wins against KK (same suits) about 82.6% of the times
+    assert low[0] - 0.005 < 0.826 < high[0] + 0.005
+    assert result.equity.sum() == pytest.approx(1)
+    assert result.error.max() <= 0.005
+
+
+def test_estimate_equity_complete_board():
+    result = estimate_equity(
+        [bh((S, RA), (H, RA)), bh((S, RK), (H, RK)), bh((C, RK), (D, RK))],
+        bcm([(C, R2), (D, R7), (S, R9), (H, R10), (H, RJ)]),
+        seed=0,
+        max_samples=1000,
+        batch_size=1000,
+    )
+
+    assert result.win.tolist() == [1, 0, 0]
+    assert result.equity.tolist() == [1, 0, 0]
+
+
+def test_estimate_equity_range_and_dead_cards():
+    # the only hand of the range compatible with the dead cards is QQ
+    players = [bh((S, RA), (H, RA)), [bh((S, RK), (H, RK)), bh((S, RQ), (H, RQ))]]
+    result = estimate_equity(
+        players, dead=build_cards([(S, RK)]), seed=0, max_samples=100_000, batch_size=10_000
+    )
+    expected = estimate_equity(
+        [players[0], players[1][1]], dead=build_cards([(S, RK)]), seed=1, max_samples=100_000
+    )
+
+    assert result.equity[0] == pytest.approx(expected.equity[0], abs=0.01)
+
+
+def test_estimate_equity_processes():
+    players = [bh((S, RA), (H, RA)), bh((S, RK), (H, RK))]
+    kwargs = dict(seed=3, max_samples=40_000, batch_size=10_000, precision=0)
+
+    single = estimate_equity(players, **kwargs)
+    parallel = estimate_equity(players, processes=2, **kwargs)
+    assert single.samples == parallel.samples == 40_000
+    assert single.equity.tolist() == parallel.equity.tolist()
+
+
+@pytest.mark.parametrize(
+    "players,community",
+    [
+        ([bh((S, RA), (H, RA)), bh((S, RA), (H, RK))], None),
+        ([bh((S, RA), (H, RA)), bh((S, RK), (H, RK))], bcm([(H, RK), (C, R2), (C, R3)])),
+        ([bh((S, RA), (H, RA)), [bh((S, RA), (S, RK))]], None),
+    ],
+)
+def test_estimate_equity_invalid(players, community):
+    with pytest.raises(ValueError):
+        estimate_equity(players, community)
+
+
+def test_estimate_equity_ranges_impossible_together():
+    # every hand of both ranges holds the ace of spades
+    spades = [bh((S, RA), (S, RK)), bh((S, RA), (S, RQ))]
+    with pytest.raises(ValueError):
+        estimate_equity([spades, spades], seed=0, max_samples=20_000, batch_size=10_000)
+
+
+@pytest.mark.parametrize(
+    "players,community",
+    [
+        (
+            [bh((S, RA), (H, RA)), bh((S, RK), (H, RK))],
+            bcm([(C, R2), (D, R7), (D, RK), (H, R5)]),
+        ),
+        (
+            [bh((S, RA), (H, RA)), bh((S, RK), (H, RK)), bh((D, R9), (D, R8))],
+            bcm([(C, R2), (D, R7), (D, RK)]),
+        ),
+        (
+            [bh((S, RA), (S, R5)), bh((H, R4), (H, R3))],
+            bcm([(C, R2), (D, R7), (D, RK), (C, R6), (C, RA)]),
+        ),
+    ],
+)
+def test_exact_equity(players, community):
+    known = cards_to_mask(community.cards + [card for hand in players for card in hand.cards])
+    remaining = [card for card in CARDS if not card.mask & known]
+    wins = [0] * len(players)
+    ties = [0] * len(players)
+    runouts = list(itertools.combinations(remaining, 5 - len(community.cards)))
+
+    for runout in runouts:
+        board = community.cards + list(runout)
+        strengths = [evaluate(hand.cards + board) for hand in players]
+        winners = [i for i, strength in enumerate(strengths) if strength == max(strengths)]
+        for i in winners:
+            if len(winners) == 1:
+                wins[i] += 1
+            else:
+                ties[i] += 1
+
+    result = exact_equity(players, community)
+    assert result.samples == len(runouts)
+    assert result.wins.tolist() == wins
+    assert result.ties.tolist() == ties
+    assert result.error.tolist() == [0] * len(players)
+
+
+def test_exact_equity_symmetries():
+    result = exact_equity([bh((S, RA), (H, RA)), bh((S, RK), (H, RK))], bcm([(C, R2), (D, R7), (D, RK)]))
+
+    # spades and hearts can be swapped: AsAh and KsKh don't change
+    assert result.evaluated < result.samples == 990
+    assert result.equity.sum() == pytest.approx(1)
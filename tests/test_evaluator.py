@@ -0,0 +1,154 @@
+import random
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from tests.util import *
+from tests.util import build_cards as bcs
+from pyker.game.evaluator import *
+from pyker.game.hands_checker import hands_checkers_dict
+
+
+@pytest.mark.parametrize(
+    "cards,hand_rank,ranks",
+    [
+        (
+            bcs([(C, RA), (C, R2), (C, R3), (D, RA), (C, R4), (C, R5), (C, R6)]),
+            HandRank.StraightFlush,
+            [R6],
+        ),
+        (
+            bcs([(H, RA), (H, R5), (H, R2), (H, R3), (H, R4), (H, R7), (H, R9)]),
+            HandRank.StraightFlush,
+            [R5],
+        ),
+        (
+            bcs([(H, RA), (S, RA), (C, RA), (H, RK), (H, RQ), (D, R2), (D, RA)]),
+            HandRank.FourOfAKind,
+            [RA, RK],
+        ),
+        (
+            bcs([(H, RA), (S, RA), (C, RA), (H, RK), (S, RK), (D, RK), (D, R2)]),
+            HandRank.FullHouse,
+            [RA, RK],
+        ),
+        (
+            bcs([(D, RQ), (D, RJ), (S, RQ), (S, RJ), (S, RK), (S, R2), (S, R3)]),
+            HandRank.Flush,
+            [RK, RQ, RJ, R3, R2],
+        ),
+        (
+            bcs([(H, RA), (D, R2), (S, R3), (C, R4), (D, R5), (D, RK), (D, RQ)]),
+            HandRank.Straight,
+            [R5],
+        ),
+        (
+            bcs([(H, RQ), (H, RJ), (S, RQ), (S, R10), (C, RA), (H, R2), (C, RQ)]),
+            HandRank.ThreeOfAKind,
+            [RQ, RA, RJ],
+        ),
+        (
+            bcs([(H, RA), (S, RA), (S, RK), (C, RK), (C, RQ), (C, RJ), (S, RQ)]),
+            HandRank.TwoPair,
+            [RA, RK, RQ],
+        ),
+        (
+            bcs([(H, RA), (S, RA), (S, R5), (C, RK), (C, RQ), (C, R2), (S, R10)]),
+            HandRank.OnePair,
+            [RA, RK, RQ, R10],
+        ),
+        (
+            bcs([(H, R9), (S, RA), (S, R5), (C, RK), (C, RQ), (C, R2), (S, R10)]),
+            HandRank.HighCard,
+            [RA, RK, RQ, R10, R9],
+        ),
+        (
+            bcs([(H, R9), (S, RA), (S, R9), (C, RK), (C, R9)]),
+            HandRank.ThreeOfAKind,
+            [R9, RA, RK],
+        ),
+    ],
+)
+def test_evaluate(cards, hand_rank, ranks):
+    strength = evaluate(cards)
+    assert get_hand_rank(strength) == hand_rank
+    assert get_ranks(strength) == ranks
+
+
+@pytest.mark.parametrize(
+    "better,worse",
+    [
+        (
+            bcs([(H, RA), (S, RA), (S, R5), (C, RK), (C, RQ), (C, R2), (S, R10)]),
+            bcs([(H, RA), (S, RA), (S, R5), (C, RK), (C, RJ), (C, R2), (S, R10)]),
+        ),
+        (
+            bcs([(S, RK), (S, RQ), (S, RJ), (S, R3), (H, R2), (S, R4), (D, R4)]),
+            bcs([(S, RK), (S, RQ), (S, RJ), (S, R3), (S, R2), (H, R4), (D, R4)]),
+        ),
+        (
+            bcs([(H, R6), (D, R2), (S, R3), (C, R4), (D, R5), (D, RK), (D, RQ)]),
+            bcs([(H, RA), (D, R2), (S, R3), (C, R4), (D, R5), (D, RK), (D, RQ)]),
+        ),
+    ],
+)
+def test_evaluate_kickers(better, worse):
+    assert evaluate(better) > evaluate(worse)
+
+
+def test_evaluate_agrees_with_checkers():
+    deck = [Card(suit, rank) for rank in Rank for suit in Suit]
+    rng = random.Random(0)
+
+    for _ in range(2000):
+        cards = rng.sample(deck, 7)
+        hand, community = Hand(cards[:2]), Community()
+        community.cards = cards[2:]
+
+        expected = next(
+            hand_rank
+            for hand_rank in HandRank
+            if hands_checkers_dict[hand_rank](hand, community) is not None
+        )
+        assert get_hand_rank(evaluate_hand(hand, community)) == expected
+
+
+def test_evaluate_mask():
+    rng = random.Random(1)
+
+    for _ in range(1000):
+        cards = rng.sample(CARDS, rng.randint(5, 7))
+        assert evaluate_mask(cards_to_mask(cards)) == evaluate(cards)
+
+
+@pytest.mark.parametrize("board_size", [3, 4, 5])
+def test_evaluate_batch(board_size):
+    rng = np.random.default_rng(0)
+    cards = np.argsort(rng.random((2000, 52)), axis=1)[:, : 2 + board_size]
+    cards = cards.astype(np.uint8)
+
+    strengths = evaluate_batch(cards[:, :2], cards[:, 2:])
+    assert strengths.tolist() == [evaluate_ids(row) for row in cards.tolist()]
+
+
+def test_winners_batch():
+    board = [(S, R5), (C, RJ), (C, RQ), (C, R2), (S, R10)]
+    hands = [[(H, RA), (S, RA)], [(H, RK), (S, RK)], [(C, RA), (D, RA)]]
+    hole = np.array([[cards_to_ids(bcs(hand)) for hand in hands]] * 2, dtype=np.uint8)
+    board = np.array([cards_to_ids(bcs(board))] * 2, dtype=np.uint8)
+    active = np.array([[True, True, True], [False, True, True]])
+
+    winners = winners_batch(hole, board, active)
+    assert winners.tolist() == [[True, False, True], [False, False, True]]
+
+
+def test_tables_built_on_first_evaluation():
+    code = (
+        "import pyker.game, pyker.game.evaluator as e\n"
+        "assert e.NOFLUSH is None\n"
+        "e.evaluate_ids([0, 1, 2, 3, 4])\n"
+        "assert e.NOFLUSH is not None and e.NOFLUSH_ARRAY is not None\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
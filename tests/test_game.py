@@ -0,0 +1,303 @@
+import random
+
+import pytest
+
+from tests.util import *
+from pyker.game.game import *
+from pyker.game.rng import RandomStream
+from pyker.game.zobrist import compute_hashes
+
+
+def build_final_state(stacks, contributions, hands, community, folded=0):
+    players = Players([Player(str(i), i) for i in range(len(stacks))])
+    hands = dict((player, build_hand(*hand)) for player, hand in zip(players.starting, hands))
+
+    return State(
+        players,
+        Deck(),
+        Round.River,
+        players.starting[0],
+        tuple(stacks),
+        (0,) * len(stacks),
+        tuple(contributions),
+        hands,
+        build_community(community),
+        folded,
+        players.starting[0],
+        None,
+        20,
+        players.starting[-1],
+        0,
+    )
+
+
+def start_play(game, stacks, dealer):
+    """Initial state of a play starting with some stacks, after a play that ended with them"""
+    state = game.initial_state()
+    final = state.replace(
+        stacks=tuple(stacks),
+        contributions=(0,) * len(stacks),
+        dealer=state.players.previous_than(dealer),
+    )
+    return game.initial_state(final)
+
+
+def test_side_pots():
+    state = build_final_state(
+        [100, 500, 300],
+        [100, 500, 300],
+        [((S, RA), (H, RA)), ((S, RK), (H, RK)), ((S, RQ), (H, RQ))],
+        [(C, R2), (D, R7), (C, R9), (D, RJ), (H, R3)],
+    )
+    final_state = Game(state.players.starting).end(state)
+
+    # main pot to the aces, side pot to the kings, the rest back to the kings
+    assert final_state.chips_by_seat == (300, 600, 0)
+    assert final_state.get_pot() == 0
+    assert final_state.is_final
+
+    players = state.players.starting
+    side_pots = [(pot.amount, pot.players, pot.winners) for pot in final_state.side_pots]
+    assert side_pots == [
+        (300, players, [players[0]]),
+        (400, players[1:], [players[1]]),
+        (200, [players[1]], [players[1]]),
+    ]
+
+
+def test_side_pots_folded_and_odd_chips():
+    state = build_final_state(
+        [1000, 1000, 1000],
+        [101, 101, 101],
+        [((S, RA), (H, RA)), ((S, RK), (H, RK)), ((C, RK), (D, RK))],
+        [(C, R2), (D, R7), (C, R9), (D, RJ), (H, R3)],
+        folded=1 << 0,
+    )
+    final_state = Game(state.players.starting).end(state)
+
+    # the kings split 303 chips: the odd one goes to the first after the dealer
+    assert final_state.chips_by_seat == (899, 1051, 1050)
+    assert final_state.winners == [state.players.starting[1], state.players.starting[2]]
+    assert [pot.amount for pot in final_state.side_pots] == [303]
+    assert final_state.side_pots[0].players == state.players.starting[1:]
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_random_plays_keep_chips(seed):
+    rng = random.Random(seed)
+    n_players = rng.randint(2, 8)
+    game = Game([Player(str(i), i) for i in range(n_players)], RandomStream(seed))
+    state = game.initial_state()
+
+    for _ in range(20):
+        while not game.is_final(state):
+            action = rng.choice(game.actions(state))
+            if isinstance(action, tuple):
+                action, bet_range = action
+                state = game.result(state, action, amount=rng.randint(*bet_range), range=bet_range)
+            else:
+                state = game.result(state, action)
+            assert sum(state.chips.values()) + state.get_pot() == 2000 * n_players
+
+        assert state.side_pots[-1].winners == state.winners
+
+        if state.endgame:
+            break
+        state = game.initial_state(state)
+
+
+def test_all_in_blinds_do_not_act():
+    players = [Player(str(i), i) for i in range(3)]
+    game = Game(players, RandomStream(0))
+    state = start_play(game, [2000, 2000, 30], players[0])
+    assert state.current_player is players[0]
+    assert state.round_last_player is players[1]
+
+    state = game.result(state, Action.Call)
+    state = game.result(state, Action.Call)
+    assert state.current_round == Round.Flop
+    while not state.is_final:
+        state = game.result(state, Action.Check)
+    assert sum(state.chips_by_seat) == 4030
+
+    # heads-up, nobody can bet: the board is dealt out at once
+    players = players[:2]
+    game = Game(players, RandomStream(0))
+    for stacks in ([10, 10], [2000, 10], [10, 2000]):
+        state = start_play(game, stacks, players[0])
+        assert state.is_final
+        assert len(state.community.cards) == 5
+        assert sum(state.chips_by_seat) == sum(stacks)
+
+    # the small blind has to call the rest of the all-in of the big blind
+    state = start_play(game, [40, 2000], players[0])
+    assert state.current_player is players[1]
+    assert game.actions(state)[:2] == [Action.Fold, Action.Call]
+
+
+def test_all_in_raise_closes_the_round():
+    players = [Player(str(i), i) for i in range(3)]
+    game = Game(players, RandomStream(0))
+    state = start_play(game, [2000, 2000, 300], players[0])
+
+    state = game.result(state, Action.Call)
+    state = game.result(state, Action.Call)
+    state = game.result(state, Action.BetOrRaise, amount=250, range=(50, 250))
+    assert state.chips[players[2]] == 0
+    state = game.result(state, Action.Call)
+    state = game.result(state, Action.Call)
+    assert state.current_round == Round.Flop
+    assert state.current_player is players[1]
+
+
+def test_all_in_call_closing_the_round():
+    players = [Player(str(i), i) for i in range(3)]
+    game = Game(players, RandomStream(0))
+    state = start_play(game, [150, 2000, 2000], players[0])
+
+    state = game.result(state, Action.Call)
+    state = game.result(state, Action.BetOrRaise, amount=100, range=(50, 1950))
+    state = game.result(state, Action.Call)
+    state = game.result(state, Action.Call)  # the dealer is all-in
+    assert state.current_round == Round.Flop
+    assert state.round_last_player is players[2]
+    state = game.result(state, Action.Check)
+    state = game.result(state, Action.Check)
+    assert state.current_round == Round.Turn
+
+
+def test_state_is_immutable():
+    game = Game([Player(str(i), i) for i in range(3)], RandomStream(0))
+    state = game.initial_state()
+    next_state = game.result(state, Action.Call)
+
+    with pytest.raises(AttributeError):
+        state.dealer = None
+    assert state.bets != next_state.bets
+    assert state.hands is next_state.hands
+    assert state.players is next_state.players
+    assert dict(state.chips) == dict((p, state.chips[p]) for p in state.players.active)
+    assert next_state.folded_players == frozenset()
+
+
+def fields(state):
+    """Every field of a state, comparable between State and MutableState"""
+    return (
+        state.current_round,
+        state.current_player,
+        tuple(state.stacks),
+        tuple(state.round_bets),
+        tuple(state.contributions),
+        tuple(state.chips_by_seat),
+        state.highest_bet,
+        tuple(state.community.cards),
+        state.deck.cursor,
+        bytes(state.deck.ids[: state.deck.cursor]),
+        state.folded,
+        state.all_in,
+        state.round_last_player,
+        state.round_last_better,
+        state.min_allowed_bet,
+        state.is_initial,
+        state.is_final,
+        state.winners,
+        [(pot.amount, pot.players, pot.winners) for pot in state.side_pots or ()],
+    )
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_apply_undo_agree_with_result(seed):
+    rng = random.Random(seed)
+    game = Game([Player(str(i), i) for i in range(rng.randint(2, 8))], RandomStream(seed))
+    state = game.initial_state()
+
+    for _ in range(10):
+        mutable = state.mutable()
+        history = [fields(mutable)]
+        records = []
+
+        while not game.is_final(state):
+            action = rng.choice(game.actions(state))
+            if isinstance(action, tuple):
+                action, bet_range = action
+                amount = rng.randint(*bet_range)
+            else:
+                bet_range, amount = (0, 0), 0
+
+            state = game.result(state, action, amount=amount, range=bet_range)
+            records.append(game.apply(mutable, action, amount=amount, range=bet_range))
+            assert fields(mutable) == fields(state)
+            assert state.all_in == state.replace().all_in  # kept by the transitions
+            history.append(fields(mutable))
+
+        # undo back to the initial state, checking every intermediate one
+        for record in reversed(records):
+            history.pop()
+            game.undo(mutable, record)
+            assert fields(mutable) == history[-1]
+
+        if state.endgame:
+            break
+        state = game.initial_state(state)
+
+
+def test_mutable_state_copies():
+    game = Game([Player(str(i), i) for i in range(4)], RandomStream(3))
+    mutable = game.initial_state().mutable()
+    frozen = mutable.freeze()
+
+    game.apply(mutable, Action.Call)
+    assert fields(frozen) != fields(mutable)
+    assert fields(frozen) == fields(frozen.mutable())
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_incremental_hashes(seed):
+    rng = random.Random(seed)
+    game = Game([Player(str(i), i) for i in range(rng.randint(2, 8))], RandomStream(seed))
+    state = game.initial_state()
+    state.zobrist_hash  # the hashes of the next states are updated from this one
+    mutable = state.mutable()
+    records = []
+    hashes = [mutable.zobrist_hash]
+
+    while not game.is_final(state):
+        action = rng.choice(game.actions(state))
+        if isinstance(action, tuple):
+            action, bet_range = action
+            amount = rng.randint(*bet_range)
+        else:
+            bet_range, amount = (0, 0), 0
+
+        state = game.result(state, action, amount=amount, range=bet_range)
+        records.append(game.apply(mutable, action, amount=amount, range=bet_range))
+        # updated incrementally, except at the end of the play
+        assert state.is_final or state._hashes is not None
+        assert state._get_hashes() == compute_hashes(state)
+        assert mutable.zobrist_hash == state.zobrist_hash
+        hashes.append(mutable.zobrist_hash)
+
+    assert len(set(hashes)) == len(hashes)
+    for record in reversed(records):
+        hashes.pop()
+        game.undo(mutable, record)
+        assert mutable.zobrist_hash == hashes[-1]
+
+
+def test_public_and_information_hashes():
+    game = Game([Player(str(i), i) for i in range(3)], RandomStream(0))
+    state = game.initial_state()
+    players = state.players.starting
+    hands = dict(state.hands)
+
+    # another player holds different cards
+    used = set(card for hand in hands.values() for card in hand.cards)
+    other = players[1] if state.dealer is not players[1] else players[2]
+    hands[other] = Hand([card for card in DECK_ORDER if card not in used][:2])
+    changed = state.replace(hands=hands)
+
+    assert changed.zobrist_hash != state.zobrist_hash
+    assert changed.public_hash == state.public_hash
+    for player in players:
+        same = player is not other
+        assert (changed.information_hash(player) == state.information_hash(player)) == same
@@ -1,3 +1,5 @@
+import random
+
 import pytest
 
 from tests.util import *
@@ -7,6 +9,7 @@ from tests.util import (
     build_hand as bh,
     build_community as bcm,
 )
+from pyker.game.evaluator import evaluate, evaluate_hand, evaluate_mask
 from pyker.game.hands_checker import *
 
 
@@ -226,3 +229,97 @@ def test_check_two_pair(hand, community, expected):
 )
 def test_check_one_pair(hand, community, expected):
     assert check_one_pair(hand, community) == expected
+
+
+def test_hand_info_key_is_strength():
+    deck = [Card(suit, rank) for rank in Rank for suit in Suit]
+    rng = random.Random(0)
+
+    for _ in range(1000):
+        cards = rng.sample(deck, 7)
+        hand, community = Hand(cards[:2]), Community()
+        community.cards = cards[2:]
+
+        hand_info = get_hand_info(None, hand, community)
+        assert hand_info.key == evaluate_hand(hand, community)
+
+
+@pytest.mark.parametrize(
+    "hands,community,expected",
+    [
+        (
+            [bh((H, RA), (S, RA)), bh((H, RK), (S, RK)), bh((C, RA), (D, RA))],
+            bcm([(S, R5), (C, RJ), (C, RQ), (C, R2), (S, R10)]),
+            [[0, 2], [1]],
+        ),
+        (
+            [bh((H, R2), (S, R3)), bh((H, RK), (S, R9)), bh((D, R9), (H, R8))],
+            bcm([(S, RA), (C, RJ), (D, RQ), (C, R2), (S, R10)]),
+            [[1], [2], [0]],
+        ),
+        (
+            [bh((H, R2), (H, R3)), bh((D, RK), (D, R9))],
+            bcm([(H, RA), (H, RJ), (H, RQ), (D, RQ), (D, R10)]),
+            [[0], [1]],
+        ),
+    ],
+)
+def test_rank_players(hands, community, expected):
+    players = [Player(str(i), i) for i in range(len(hands))]
+    hands = dict(zip(players, hands))
+
+    ranking = rank_players(players, hands, community)
+    assert ranking == [[players[i] for i in group] for group in expected]
+    assert get_winners(players, hands, community) == ranking[0]
+
+    cache = StrengthCache()
+    assert rank_players(players, hands, community, cache) == ranking
+    assert get_winners(players, hands, community, cache) == ranking[0]
+    assert cache.misses > 0 and cache.hits > 0
+
+
+def test_strength_cache():
+    cache = StrengthCache(maxsize=2)
+    cards = bcs([(S, RA), (S, RK), (H, R2), (D, R7), (C, R9), (S, R10), (H, R4)])
+    # the same cards with spades and hearts swapped
+    swapped = [Card({S: H, H: S}.get(card.suit, card.suit), card.rank) for card in cards]
+
+    assert cache.get(cards_to_mask(cards)) == evaluate(cards)
+    assert cache.get(cards_to_mask(swapped)) == evaluate(cards)
+    assert (cache.hits, cache.misses, len(cache)) == (1, 1, 1)
+
+    for cards in [cards[:5], cards[2:]]:
+        cache.get(cards_to_mask(cards))
+    assert (cache.misses, cache.evictions, len(cache)) == (3, 1, 2)
+
+    cache.resize(1)
+    assert (cache.evictions, len(cache)) == (2, 1)
+
+    cache.clear()
+    assert (cache.hits, cache.misses, cache.evictions, len(cache)) == (0, 0, 0, 0)
+
+
+def test_strength_cache_evaluate():
+    evaluated = []
+
+    def evaluate(mask):
+        evaluated.append(mask)
+        return evaluate_mask(mask)
+
+    cache = StrengthCache(evaluate=evaluate)
+    cards = bcs([(S, RA), (S, RK), (H, R2), (D, R7), (C, R9)])
+    assert cache.get(cards_to_mask(cards)) == cache.get(cards_to_mask(cards)) == evaluate_mask(cards_to_mask(cards))
+    assert len(evaluated) == 1
+
+
+def test_canonical_mask():
+    deck = [Card(suit, rank) for rank in Rank for suit in Suit]
+    rng = random.Random(0)
+
+    for _ in range(100):
+        cards = rng.sample(deck, 7)
+        suits = rng.sample(list(Suit), 4)
+        permuted = [Card(suits[card.suit], card.rank) for card in cards]
+        mask = canonical_mask(cards_to_mask(cards))
+        assert mask == canonical_mask(cards_to_mask(permuted))
+        assert evaluate_mask(mask) == evaluate(cards)
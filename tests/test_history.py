@@ -0,0 +1,151 @@
+import pytest
+
+from tests.util import *
+from pyker.ai.dummy import RandomAgent
+from pyker.game.game import Game
+from pyker.game.rng import RandomStream
+from pyker.history import *
+
+
+def play(writer, n_hands, table=0, seed=0, n_players=4):
+    """Play and record n_hands hands, returning the final states"""
+    players = [Player(f"Player {i}", i) for i in range(n_players)]
+    rng = RandomStream(seed)
+    agents = dict((player, RandomAgent(player, agent_rng)) for player, agent_rng in zip(players, rng.spawn(n_players)))
+    game = RecordingGame(players, writer, rng, table=table, seed=seed)
+    state = game.initial_state()
+    finals = []
+
+    while len(finals) < n_hands:
+        while not game.is_final(state):
+            action, amount, bet_range = agents[state.current_player].act(game, state)
+            state = game.result(state, action, amount=amount, range=bet_range)
+        finals.append(state)
+        if state.endgame:
+            game = RecordingGame(players, writer, rng, table=table, seed=seed, first_hand=game.hand)
+            state = game.initial_state()
+        else:
+            state = game.initial_state(state)
+
+    return finals
+
+
+def replay(record: HandRecord):
+    game = Game(record.players())
+    state = record.initial_state()
+    for action, amount in record.actions:
+        bet_range = (0, 0)
+        for available in game.actions(state):
+            if isinstance(available, tuple) and available[0] is action:
+                bet_range = available[1]
+        state = game.result(state, action, amount=amount, range=bet_range)
+    return state
+
+
+def test_write_and_replay(tmp_path):
+    path = str(tmp_path / "hands.pkh")
+    with HistoryWriter(path, block_size=16) as writer:
+        finals = play(writer, 100)
+
+    with HistoryReader(path) as reader:
+        assert len(reader) == 100
+        assert len(reader.blocks) == 7
+
+        for n, (record, final_state) in enumerate(zip(reader, finals)):
+            assert record.hand == n
+            assert record.seed == 0
+            assert record.names == [f"Player {i}" for i in range(4)]
+            assert record.stacks == list(final_state.chips_by_seat)
+            assert record.winners == [final_state.players.seats[player] for player in final_state.winners]
+
+            state = replay(record)
+            assert state.is_final
+            assert list(state.chips_by_seat) == record.stacks
+
+
+def test_random_access(tmp_path):
+    path = str(tmp_path / "hands.pkh")
+    with HistoryWriter(path, block_size=10) as writer:
+        play(writer, 55)
+
+    with HistoryReader(path) as reader:
+        records = list(reader)
+        for n in [0, 9, 10, 37, 54, -1]:
+            assert reader[n].encode() == records[n].encode()
+        with pytest.raises(IndexError):
+            reader[55]
+
+        assert [record.hand for record in reader.hands(12, 15)] == [12, 13, 14]
+        assert [record.hand for record in reader.hands(50)] == list(range(50, 55))
+
+
+def test_filter_by_table(tmp_path):
+    path = str(tmp_path / "hands.pkh")
+    with HistoryWriter(path, block_size=8) as writer:
+        play(writer, 20, table=1)
+        writer.flush()
+        play(writer, 20, table=2, seed=1)
+
+    with HistoryReader(path) as reader:
+        assert [record.table for record in reader.hands(table=2)] == [2] * 20
+        assert [block.max_table for block in reader.blocks] == [1, 1, 1, 2, 2, 2]
+        showdowns = list(reader.hands(predicate=lambda record: record.shown))
+        assert all(len(record.shown) > 1 for record in showdowns)
+
+
+def test_append_and_truncated_block(tmp_path):
+    path = str(tmp_path / "hands.pkh")
+    with HistoryWriter(path, block_size=5) as writer:
+        play(writer, 10)
+    with HistoryWriter(path, block_size=5) as writer:
+        play(writer, 5, seed=1)
+
+    # a block cut in the middle (e.g. a crash while writing it) is dropped
+    with open(path, "ab") as file:
+        file.write(BLOCK_HEADER.pack(BLOCK_MAGIC, 100, 100, 1, 15, 0, 0, 0) + b"\0" * 10)
+
+    with HistoryReader(path) as reader:
+        assert len(reader) == 15
+        assert [record.seed for record in reader] == [0] * 10 + [1] * 5
+
+    with HistoryWriter(path, block_size=5) as writer:
+        play(writer, 5, seed=2)
+    with HistoryReader(path) as reader:
+        assert len(reader) == 20
+        assert reader[19].seed == 2
+
+
+def test_corrupted_block(tmp_path):
+    path = str(tmp_path / "hands.pkh")
+    with HistoryWriter(path) as writer:
+        play(writer, 5)
+
+    with open(path, "r+b") as file:
+        file.seek(-1, 2)
+        last = file.read(1)
+        file.seek(-1, 2)
+        file.write(bytes([last[0] ^ 0xFF]))
+
+    with HistoryReader(path) as reader:
+        with pytest.raises(ValueError):
+            reader[0]
+
+    with open(path, "wb") as file:
+        file.write(b"not a history")
+    with pytest.raises(ValueError):
+        HistoryReader(path)
+
+
+def test_results_from_earlier_states_are_ignored(tmp_path):
+    path = str(tmp_path / "hands.pkh")
+    players = [Player(f"Player {i}", i) for i in range(3)]
+    with HistoryWriter(path) as writer:
+        game = RecordingGame(players, writer, RandomStream(4))
+        initial_state = game.initial_state()
+        state = game.result(initial_state, Action.Fold)
+        game.result(initial_state, Action.Call)
+        state = game.result(state, Action.Fold)
+        assert state.is_final
+
+    with HistoryReader(path) as reader:
+        assert reader[0].actions == [(Action.Fold, 0), (Action.Fold, 0)]
@@ -0,0 +1,80 @@
+import itertools
+import random
+
+import pytest
+
+from tests.util import *
+from pyker.game.indexer import *
+
+
+@pytest.mark.parametrize(
+    "cards_per_round,sizes",
+    [
+        ([2, 3, 1, 1], [169, 1_286_792, 55_190_538, 2_428_287_420]),
+        ([2, 4], [169, 13_960_050]),
+        ([2, 5], [169, 123_156_254]),
+        ([1], [13]),
+    ],
+)
+def test_sizes(cards_per_round, sizes):
+    indexer = HandIndexer(cards_per_round)
+    assert [indexer.size(round) for round in range(indexer.rounds())] == sizes
+
+
+def test_preflop_classes():
+    indexes = set()
+
+    for card1, card2 in itertools.combinations(CARDS, 2):
+        indexes.add(holdem_indexer.index([card1, card2]))
+
+    assert indexes == set(range(169))
+
+
+@pytest.mark.parametrize("round", [0, 1, 2, 3])
+def test_unindex_index(round):
+    random.seed(round)
+    size = holdem_indexer.size(round)
+
+    for index in [0, size - 1] + random.sample(range(size), min(size, 500)):
+        cards = holdem_indexer.unindex(round, index)
+        assert len(cards) == [2, 5, 6, 7][round]
+        assert len(set(cards)) == len(cards)
+        assert holdem_indexer.index(cards) == index
+
+
+@pytest.mark.parametrize("n_cards", [2, 5, 6, 7])
+def test_isomorphic_hands(n_cards):
+    random.seed(n_cards)
+
+    for _ in range(200):
+        cards = random.sample(CARDS, n_cards)
+        index = holdem_indexer.index(cards)
+        assert 0 <= index < holdem_indexer.size(holdem_indexer.rounds() - 1)
+
+        # permuting the suits
+        suits = random.sample(list(Suit), 4)
+        permuted = [Card(suits[card.suit], card.rank) for card in cards]
+        assert holdem_indexer.index(permuted) == index
+
+        # shuffling the cards of each round
+        rounds = [cards[:2], cards[2:5], cards[5:6], cards[6:7]]
+        shuffled = [card for round in rounds for card in random.sample(round, len(round))]
+        assert holdem_indexer.index(shuffled) == index
+
+
+def test_distinct_hands():
+    # the hole cards and the flop are not interchangeable
+    hole = build_cards([(S, RA), (S, RK)])
+    flop = build_cards([(H, R2), (D, R7), (C, R9)])
+    assert holdem_indexer.index(hole + flop) != holdem_indexer.index(
+        build_cards([(H, R2), (D, R7)]) + build_cards([(C, R9), (S, RA), (S, RK)])
+    )
+
+
+def test_index_errors():
+    with pytest.raises(ValueError):
+        holdem_indexer.index(build_cards([(S, RA), (S, RK), (H, R2)]))
+    with pytest.raises(ValueError):
+        holdem_indexer.index(build_cards([(S, RA), (S, RA)]))
+    with pytest.raises(ValueError):
+        holdem_indexer.unindex(0, 169)
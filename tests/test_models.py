@@ -0,0 +1,159 @@
+import copy
+import pickle
+import random
+
+import pytest
+
+from tests.util import *
+
+
+def test_cards_are_interned():
+    assert len(set(id(card) for card in CARDS)) == N_CARDS
+    assert Card(S, RA) is Card(S, RA)
+    assert Deck().cards[0] is Card(C, R2)
+    assert copy.deepcopy(Card(H, R10)) is Card(H, R10)
+    assert pickle.loads(pickle.dumps(Card(D, RQ))) is Card(D, RQ)
+
+
+def test_cards_are_immutable():
+    with pytest.raises(AttributeError):
+        Card(S, RA).rank = RK
+
+
+@pytest.mark.parametrize("id", range(N_CARDS))
+def test_card_id(id):
+    card = Card.from_id(id)
+    assert card.id == id
+    assert card_id(card.suit, card.rank) == id
+    assert Card.from_code(card.code()) is card
+    assert hash(card) == id
+
+
+@pytest.mark.parametrize(
+    "cards,mask",
+    [
+        ([], 0),
+        ([(C, R2)], 1),
+        ([(C, R2), (D, R2), (H, RA), (S, RA)], 1 | 1 << 13 | 1 << 38 | 1 << 51),
+    ],
+)
+def test_cards_to_mask(cards, mask):
+    cards = [Card(*card) for card in cards]
+    assert cards_to_mask(cards) == mask
+    assert mask_to_cards(mask) == cards
+    assert ids_to_cards(cards_to_ids(cards)) == cards
+
+
+def test_deck_deals_every_card_once():
+    random.seed(0)
+    deck = Deck()
+    deck.shuffle()
+
+    hands = deck.deal_hands(3)
+    board = deck.deal_board(5)
+    rest = deck.cards
+    cards = [card for hand in hands for card in hand.cards] + board + rest
+
+    assert len(deck) == N_CARDS - 11
+    assert sorted(card.id for card in cards) == list(range(N_CARDS))
+    assert deck.draw_remaining() == rest
+
+
+def test_deck_cards_draw_nothing():
+    rngs = [random.Random(2), random.Random(2)]
+    decks = [Deck(rng) for rng in rngs]
+    for deck in decks:
+        deck.shuffle(4)
+
+    assert len(decks[0].cards) == N_CARDS
+    # the generators are still in the same state, the cards are the ones dealt
+    dealt = decks[1].deal_board(N_CARDS)
+    assert decks[0].cards == dealt
+    assert decks[0].deal_board(N_CARDS) == dealt
+    assert rngs[0].random() == rngs[1].random()
+
+
+def test_deck_copy_deals_same_cards():
+    random.seed(1)
+    deck = Deck()
+    deck.shuffle(9)
+    hand = deck.deal_hand()
+    copied = copy.copy(deck)
+
+    community, copied_community = Community(), Community()
+    for _ in range(3):
+        deck.deal_community_cards(community)
+        copied.deal_community_cards(copied_community)
+
+    assert len(community.cards) == 5
+    assert community.cards == copied_community.cards
+    assert not set(hand.cards) & set(community.cards)
+
+
+def test_deck_shuffle_is_uniform():
+    random.seed(2)
+    counts = [0] * N_CARDS
+
+    for _ in range(5200):
+        deck = Deck()
+        deck.shuffle()
+        counts[deck.pop().id] += 1
+
+    assert min(counts) > 50 and max(counts) < 150
+
+
+def test_deck_without_shuffle_keeps_order():
+    deck = Deck()
+    assert deck.deal_board(3) == list(DECK_ORDER[:3])
+    with pytest.raises(ValueError):
+        deck.deal_board(50)
+
+
+def test_players_ring():
+    players = Players([Player(str(i), i) for i in range(5)])
+    p = players.starting
+
+    assert players.next_to(p[4]) is p[0]
+    assert players.previous_than(p[0]) is p[4]
+
+    players.remove_losers({p[0]: 100, p[1]: 0, p[2]: 50, p[3]: 0, p[4]: 10})
+    assert players.active == [p[0], p[2], p[4]]
+    assert players.next_to(p[0]) is p[2]
+    assert players.next_to(p[1]) is p[2]  # from a player who lost
+    assert players.previous_than(p[2]) is p[0]
+    assert players.previous_than(p[3]) is p[2]
+    assert not players.is_active(p[3])
+
+    skip = players.mask_of([p[2]])
+    assert players.next_to(p[0], skip) is p[4]
+    assert players.first_active_from_backwards(p[2], skip) is p[0]
+    assert players.next_to(p[0], players.mask_of([p[2], p[4]])) is p[0]
+
+    # from a player who lost, with every active player skipped
+    skip = players.mask_of(players.active)
+    with pytest.raises(ValueError):
+        players.next_to(p[1], skip)
+    with pytest.raises(ValueError):
+        players.previous_than(p[3], skip)
+    assert players.next_to(p[0], skip) is p[0]
+
+    # players who lost before lead to the players active now
+    players.remove_losers({p[0]: 100, p[2]: 0, p[4]: 10})
+    assert players.next_to(p[1]) is p[4]
+    assert players.previous_than(p[3]) is p[0]
+    assert players.next_to(p[2]) is p[4]
+    assert players.previous_than(p[4]) is p[0]
+
+
+def test_players_ring_last_player():
+    players = Players([Player(str(i), i) for i in range(3)])
+    p = players.starting
+    copied = copy.copy(players)
+
+    players.remove_losers({p[0]: 0, p[1]: 300, p[2]: 0})
+    assert players.previous_than(p[1]) is p[1]
+    with pytest.raises(ValueError):
+        players.next_to(p[1])
+
+    # copies have their own ring
+    assert copied.next_to(p[1]) is p[2]
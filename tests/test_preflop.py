@@ -0,0 +1,57 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from tests.util import *
+from tests.util import build_hand as bh
+from pyker.preflop import *
+
+
+@pytest.fixture(scope="module")
+def tables():
+    return build_tables(20, seed=0)
+
+
+def test_build_tables(tables):
+    combos = tables.combos
+    overlapping = (COMBO_MASKS[:, None] & COMBO_MASKS[None, :]) != 0
+
+    assert np.isnan(combos[overlapping]).all()
+    assert not np.isnan(combos[~overlapping]).any()
+    assert np.allclose(combos[~overlapping] + combos.T[~overlapping], 1)
+    assert np.allclose(tables.classes + tables.classes.T, 1)
+
+    # suit isomorphic matchups have the same equity
+    assert tables.equity(bh((S, RA), (H, RA)), bh((S, RK), (H, RK))) == tables.equity(
+        bh((C, RA), (D, RA)), bh((C, RK), (D, RK))
+    )
+    assert tables.class_equity("AA", "KK") > 0.7
+    assert tables.class_equity("72o", "AA") < 0.3
+
+
+def test_save_and_load_tables(tables, tmp_path):
+    path = tmp_path / "preflop.bin"
+    save_tables(tables, path)
+    loaded = load_tables(path)
+
+    assert isinstance(loaded.combos, np.memmap)
+    assert loaded.samples == 20
+    assert np.array_equal(loaded.combos, tables.combos, equal_nan=True)
+    assert np.array_equal(loaded.classes, tables.classes)
+
+
+def test_load_tables_version(tables, tmp_path):
+    path = tmp_path / "preflop.bin"
+    save_tables(tables, path)
+    data = bytearray(path.read_bytes())
+    data[8] = VERSION + 1
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(ValueError):
+        load_tables(path)
+
+
+def test_default_path_does_not_depend_on_working_directory():
+    assert DEFAULT_PATH.is_absolute()
+    assert DEFAULT_PATH.parent.parent.parent == Path(__file__).resolve().parent.parent
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from tests.util import *
+from tests.util import build_hand as bh, build_community as bcm
+from pyker.equity import estimate_equity
+from pyker.ranges import Range
+
+
+@pytest.mark.parametrize(
+    "notation,size",
+    [
+        ("AA", 6),
+        ("AKs", 4),
+        ("AK", 16),
+        ("QQ+", 18),
+        ("KK-TT", 24),
+        ("ATs+", 16),
+        ("A5s-A2s", 16),
+        ("AsKh", 1),
+        ("QQ+, AKs, A5s-A2s, KQo:0.5", 18 + 4 + 16 + 12),
+        ("", 0),
+    ],
+)
+def test_parse(notation, size):
+    assert len(Range.parse(notation)) == size
+
+
+def test_parse_weights():
+    hand_range = Range.parse("KQo:0.5, KQs, AsKh:0.25")
+
+    assert hand_range.weight(bh((S, RK), (H, RQ))) == 0.5
+    assert hand_range.weight(bh((S, RK), (S, RQ))) == 1
+    assert hand_range.weight(bh((S, RA), (H, RK))) == 0.25
+    assert bh((S, RA), (S, RK)) not in hand_range
+    assert hand_range.total() == pytest.approx(12 * 0.5 + 4 + 0.25)
+
+
+@pytest.mark.parametrize("notation", ["AKx", "A5s-K2s", "AKs-AQo", "A", "KAs-KAs"])
+def test_parse_invalid(notation):
+    with pytest.raises(ValueError):
+        Range.parse(notation)
+
+
+def test_operations():
+    first = Range.parse("QQ+, AK:0.5")
+    second = Range.parse("KK+, AKs")
+
+    assert first | second == Range.parse("QQ+, AKo:0.5, AKs")
+    assert first & second == Range.parse("KK+, AKs:0.5")
+    assert first.normalized().total() == pytest.approx(1)
+
+
+def test_without():
+    hand_range = Range.parse("AA, KK").without(bcm([(S, RA), (H, RA), (C, R2)]))
+
+    assert len(hand_range) == 1 + 6
+    assert bh((C, RA), (D, RA)) in hand_range
+    assert bh((S, RA), (D, RA)) not in hand_range
+
+
+def test_range_equity():
+    # only QQ can be held by the range: KK is blocked by the dead card
+    result = estimate_equity(
+        [bh((S, RA), (H, RA)), Range.parse("KsKh, QsQh")],
+        dead=build_cards([(S, RK)]),
+        seed=0,
+        max_samples=100_000,
+    )
+    expected = estimate_equity(
+        [bh((S, RA), (H, RA)), bh((S, RQ), (H, RQ))], seed=0, max_samples=100_000
+    )
+
+    assert result.equity[0] == pytest.approx(expected.equity[0], abs=0.01)
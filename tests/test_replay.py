@@ -0,0 +1,117 @@
+import pytest
+
+from tests.util import *
+from pyker.ai.dummy import RandomAgent
+from pyker.game.codec import encode_state
+from pyker.game.game import Game
+from pyker.game.rng import RandomStream
+from pyker.history import HistoryReader, HistoryWriter, RecordingGame
+from pyker.replay import *
+
+
+def play_logged(seed, n_hands, n_players=4):
+    """Play n_hands hands, returning the log and the states of every hand"""
+    players = [Player(f"Player {i}", i) for i in range(n_players)]
+    rng = RandomStream(seed)
+    agents = dict((player, RandomAgent(player, agent_rng)) for player, agent_rng in zip(players, rng.spawn(n_players)))
+    game = Game(players, rng)
+    state = game.initial_state()
+    log = GameLog(seed, [player.name for player in players])
+    hands = [[state]]
+
+    while True:
+        while not game.is_final(state):
+            action, amount, bet_range = agents[state.current_player].act(game, state)
+            state = game.result(state, action, amount=amount, range=bet_range)
+            log.actions.append((action, amount if action is Action.BetOrRaise else 0))
+            hands[-1].append(state)
+        if len(hands) == n_hands:
+            return log, hands
+        game, state = next_play(game, state)
+        hands.append([state])
+
+
+@pytest.mark.parametrize("interval", [1, 7, 64])
+def test_replay_every_state(interval):
+    log, hands = play_logged(3, 40)
+    replay = Replay(GameLog.decode(log.encode()), interval)
+
+    assert replay.n_hands == 40
+    assert [replay.hand_length(hand) for hand in range(40)] == [len(states) - 1 for states in hands]
+    for hand in [39, 0, 17, 3, 25]:
+        for action, state in enumerate(hands[hand]):
+            assert encode_state(replay.state(hand, action)) == encode_state(state)
+    assert encode_state(replay.final_state) == encode_state(hands[-1][-1])
+
+    with pytest.raises(IndexError):
+        replay.state(40)
+    with pytest.raises(IndexError):
+        replay.state(0, len(hands[0]))
+
+
+def test_replay_across_games():
+    # two players with few chips: games end and restart often
+    log, hands = play_logged(5, 150, n_players=2)
+    replay = Replay(log, 16)
+    for hand in [0, 60, 149]:
+        assert encode_state(replay.state(hand)) == encode_state(hands[hand][0])
+
+
+def record_history(path, seed, n_hands, n_players=4):
+    """Play and record n_hands hands"""
+    players = [Player(f"Player {i}", i) for i in range(n_players)]
+    rng = RandomStream(seed)
+    agents = dict((player, RandomAgent(player, agent_rng)) for player, agent_rng in zip(players, rng.spawn(n_players)))
+
+    with HistoryWriter(path, block_size=4) as writer:
+        game = RecordingGame(players, writer, rng, seed=seed)
+        state = game.initial_state()
+        while True:
+            while not game.is_final(state):
+                action, amount, bet_range = agents[state.current_player].act(game, state)
+                state = game.result(state, action, amount=amount, range=bet_range)
+            if game.hand == n_hands:
+                return
+            if state.endgame:
+                game = RecordingGame(players, writer, rng, seed=seed, first_hand=game.hand)
+                state = game.initial_state()
+            else:
+                state = game.initial_state(state)
+
+
+def test_log_from_history(tmp_path):
+    path = str(tmp_path / "hands.pkh")
+    record_history(path, 8, 30, n_players=2)
+    log, hands = play_logged(8, 30, n_players=2)
+
+    with HistoryReader(path) as reader:
+        assert GameLog.from_history(list(reader)).encode() == log.encode()
+        assert encode_state(replay_hand(reader[29])) == encode_state(hands[29][-1])
+
+
+def test_illegal_action():
+    log, _ = play_logged(1, 2)
+    log.actions[0] = (Action.Check, 0)  # the blinds were bet
+    with pytest.raises(ValueError):
+        Replay(log)
+
+
+def test_verify(tmp_path):
+    path = str(tmp_path / "hands.pkh")
+    record_history(path, 2, 30)
+    n_hands, divergences = verify(path)
+    assert (n_hands, divergences) == (30, [])
+
+    # a copy of the history with a wrong payout and an impossible action
+    tampered = str(tmp_path / "tampered.pkh")
+    with HistoryReader(path) as reader, HistoryWriter(tampered, block_size=4) as writer:
+        for n, record in enumerate(reader):
+            if n == 11:
+                record.stacks = record.stacks[::-1]
+            if n == 20:
+                record.actions[0] = (Action.Check, 0)
+            writer.write(record)
+
+    n_hands, divergences = verify(tampered)
+    assert [(divergence.hand, divergence.action) for divergence in divergences] == [(11, None), (20, 0)]
+    assert [repr(divergence) for divergence in verify(tampered, processes=2)[1]] == list(map(repr, divergences))
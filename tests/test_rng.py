@@ -0,0 +1,55 @@
+import copy
+import pickle
+
+from tests.util import *
+from pyker.game.game import Game
+from pyker.game.rng import RandomStream
+
+
+def test_same_seed_same_stream():
+    assert [RandomStream(7).random() for _ in range(2)] == [RandomStream(7).random()] * 2
+    assert RandomStream(7).random() != RandomStream(8).random()
+
+
+def test_spawned_streams():
+    first, second = RandomStream(7).spawn(2)
+    again = RandomStream(7).spawn(2)
+
+    assert first.getrandbits(64) == again[0].getrandbits(64)
+    assert second.getrandbits(64) == again[1].getrandbits(64)
+    assert first.getrandbits(64) != second.getrandbits(64)
+
+    # a stream spawns different children at each call
+    stream = RandomStream(7)
+    assert stream.spawn(1)[0].random() != stream.spawn(1)[0].random()
+
+
+def test_pickle_and_copy():
+    stream = RandomStream(3)
+    stream.random()
+    restored = pickle.loads(pickle.dumps(stream))
+    copied = copy.deepcopy(stream)
+
+    assert restored.random() == copied.random() == stream.random()
+    assert restored.spawn(1)[0].random() == stream.spawn(1)[0].random()
+
+
+def test_deck_with_stream():
+    decks = [Deck(RandomStream(5)) for _ in range(2)]
+    for deck in decks:
+        deck.shuffle()
+
+    assert decks[0].cards == decks[1].cards
+    assert decks[0].cards != list(DECK_ORDER)
+
+
+def test_games_with_same_seed_deal_same_cards():
+    states = []
+    for _ in range(2):
+        game = Game([Player(str(i), i) for i in range(6)], RandomStream(11))
+        states.append(game.initial_state())
+
+    assert states[0].dealer.place == states[1].dealer.place
+    hands = [sorted((p.place, h.cards) for p, h in state.hands.items()) for state in states]
+    assert hands[0] == hands[1]
+    assert states[0].deck.cards == states[1].deck.cards
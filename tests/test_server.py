@@ -0,0 +1,159 @@
+import asyncio
+
+import pytest
+
+from pyker.client import Client, load_test
+from pyker.server import Connection, GameServer
+
+
+async def start(tmp_path=None, **options):
+    """Start a server on a free port, or on a Unix socket in tmp_path"""
+    server = GameServer(**options)
+    if tmp_path is not None:
+        path = str(tmp_path / "pyker.sock")
+        listening = await server.start(path=path)
+        return server, listening, dict(path=path)
+    listening = await server.start(port=0)
+    return server, listening, dict(port=listening.sockets[0].getsockname()[1])
+
+
+async def stop(server, listening):
+    for _ in range(200):
+        if not server.tables:
+            break
+        await asyncio.sleep(0.01)
+    assert not server.tables  # the tables stop when their players leave
+    listening.close()
+    await server.close()
+
+
+async def receive(client, kind):
+    """Return the next message of a type, skipping the others"""
+    while True:
+        message = await asyncio.wait_for(client.receive(), 5)
+        if message["type"] == kind:
+            return message
+
+
+@pytest.mark.parametrize("unix", [False, True])
+def test_load_test(unix, tmp_path):
+    async def run():
+        server, listening, address = await start(tmp_path if unix else None, n_players=3, seed=0)
+        result = await load_test(5, 3, 0.5, seed=0, **address)
+        await stop(server, listening)
+        return result, server
+
+    result, server = asyncio.run(run())
+    assert result.actions > 0
+    assert server.n_actions >= result.actions
+    assert len(result.latencies) > 0
+    assert result.percentile(50) <= result.percentile(99) <= result.latencies[-1]
+
+
+def test_timeout_checks_or_folds():
+    async def run():
+        server, listening, address = await start(n_players=2, action_timeout=0.02, seed=0)
+        client = await Client.connect(**address)
+        for _ in range(2):
+            await client.send({"type": "join", "name": "idle"})
+        seated = [await receive(client, "seated") for _ in range(2)]
+        # nobody answers: every action is played when the time is over
+        actions = [await receive(client, "action") for _ in range(6)]
+        await client.close()
+        await stop(server, listening)
+        return seated, actions
+
+    seated, actions = asyncio.run(run())
+    assert [message["seat"] for message in seated] == [0, 1]
+    assert set(message["action"] for message in actions) <= {"check", "fold"}
+
+
+def test_invalid_messages():
+    async def run():
+        server, listening, address = await start(n_players=2, seed=0)
+        client = await Client.connect(**address)
+        client.writer.write(b"not json\n")
+        errors = [(await receive(client, "error"))["message"]]
+
+        for _ in range(2):
+            await client.send({"type": "join", "name": "bot"})
+        turn = await receive(client, "turn")
+        table, seat = turn["table"], turn["seat"]
+        other = 1 - seat
+
+        await client.send({"type": "act", "table": table, "seat": other, "action": "call"})
+        errors.append((await receive(client, "error"))["message"])
+        await client.send({"type": "act", "table": table + 1, "seat": seat, "action": "call"})
+        errors.append((await receive(client, "error"))["message"])
+        await client.send({"type": "act", "table": table, "seat": seat, "action": "bet", "amount": 10**6})
+        errors.append((await receive(client, "error"))["message"])
+        await client.send({"type": "act", "table": [table], "seat": seat, "action": "call"})
+        errors.append((await receive(client, "error"))["message"])
+        await client.send({"type": "act", "table": table, "seat": seat, "action": ["call"]})
+        errors.append((await receive(client, "error"))["message"])
+        await client.send({"type": ["act"]})
+        errors.append((await receive(client, "error"))["message"])
+
+        # the seat can still act
+        await client.send({"type": "act", "table": table, "seat": seat, "action": "call"})
+        action = await receive(client, "action")
+        await client.close()
+        await stop(server, listening)
+        return errors, action, seat
+
+    errors, action, seat = asyncio.run(run())
+    assert errors == [
+        "Invalid message.",
+        "It is not your turn.",
+        "You have no such seat.",
+        "This amount cannot be bet.",
+        "You have no such seat.",
+        "Invalid action.",
+        "Unknown message type ['act'].",
+    ]
+    assert (action["seat"], action["action"]) == (seat, "call")
+
+
+def test_seats_per_connection():
+    async def run():
+        server, listening, address = await start(n_players=2, max_seats=3, seed=0)
+        client = await Client.connect(**address)
+        for _ in range(4):
+            await client.send({"type": "join", "name": "bot"})
+        error = await receive(client, "error")
+        await client.close()
+        await stop(server, listening)
+        return error
+
+    assert asyncio.run(run())["message"] == "Too many seats for one connection."
+
+
+class StubWriter:
+    def __init__(self):
+        self.data = b""
+        self.closed = False
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def test_send_after_close():
+    async def run():
+        writer = StubWriter()
+        connection = Connection(writer, 4, 1.0)
+        assert await connection.send({"type": "a"})
+        closing = asyncio.create_task(connection.close())
+        await asyncio.sleep(0)
+        assert not await connection.send({"type": "b"})
+        await closing
+        return writer
+
+    writer = asyncio.run(run())
+    assert writer.data == b'{"type":"a"}\n'
+    assert writer.closed
@@ -0,0 +1,48 @@
+import itertools
+import pickle
+import time
+
+import pytest
+
+from pyker.sim import HandResult, simulate
+
+
+def _summary(results):
+    return [(r.table, r.hand, r.winners, r.deltas, r.actions) for r in results]
+
+
+@pytest.mark.parametrize("n_players", [2, 3, 6])
+def test_chips_are_conserved(n_players):
+    results = list(simulate(2, 50, n_players=n_players, seed=n_players))
+
+    assert len(results) == 100
+    for result in results:
+        assert sum(result.deltas) == 0
+        assert result.winners
+    # only the plays in which the blinds went all-in are played without actions
+    assert sum(result.actions == 0 for result in results) < 10
+
+
+def test_same_results_with_processes():
+    assert _summary(simulate(3, 30, seed=11)) == _summary(simulate(3, 30, seed=11, processes=2))
+    assert _summary(simulate(3, 30, seed=11)) != _summary(simulate(3, 30, seed=12))
+
+
+def test_results_in_table_order():
+    results = list(simulate(3, 10, seed=0, processes=2))
+    assert [(r.table, r.hand) for r in results] == [(table, hand) for table in range(3) for hand in range(10)]
+
+
+def test_results_are_streamed():
+    # the first hands come without waiting for whole tables of many hands
+    start = time.perf_counter()
+    results = simulate(2, 10**6, seed=0, processes=2)
+    assert [(r.table, r.hand) for r in itertools.islice(results, 5)] == [(0, hand) for hand in range(5)]
+    results.close()
+    assert time.perf_counter() - start < 30
+
+
+def test_pickle_result():
+    result = HandResult(1, 2, [0], (5, -5), 3)
+    restored = pickle.loads(pickle.dumps(result))
+    assert _summary([restored]) == _summary([result])
@@ -0,0 +1,79 @@
+import pytest
+
+from pyker.game.game import Game
+from pyker.game.models import *
+from pyker.tournament import Table, Tournament
+
+
+@pytest.mark.parametrize("hands_per_level", [None, 3])
+def test_finishing_positions(hands_per_level):
+    tournament = Tournament(40, 6, hands_per_level=hands_per_level, seed=1)
+    standings = tournament.run()
+
+    assert sorted(standings) == list(range(40))
+    assert sorted(tournament.positions.values()) == list(range(1, 41))
+    # the winner has every chip
+    assert tournament.stacks[standings[0]] == 40 * 2000
+    assert sum(tournament.stacks) == 40 * 2000
+    assert tournament.blinds_level > 0
+
+
+def test_same_results_with_processes():
+    first = Tournament(30, 6, hands_per_level=4, seed=7)
+    second = Tournament(30, 6, hands_per_level=4, seed=7)
+    assert first.run() == second.run(processes=2)
+    assert (first.hands, first.actions, first.segments) == (second.hands, second.actions, second.segments)
+
+
+def test_tables_stay_balanced():
+    tournament = Tournament(50, 7, hands_per_level=2, balance_every=1, seed=3)
+    assert sorted(len(table) for table in tournament.tables) == [6] * 6 + [7] * 2
+
+    while tournament.n_remaining > 1:
+        tournament.run_segment()
+        sizes = [len(table) for table in tournament.tables]
+        assert len(sizes) == -(-tournament.n_remaining // 7)
+        assert max(sizes) - min(sizes) <= 1
+        assert max(sizes) <= 7
+
+
+def test_balance_breaks_tables():
+    tournament = Tournament(12, 4, seed=0)
+    assert [len(table) for table in tournament.tables] == [4, 4, 4]
+
+    # two players of the first table and three of the second bust
+    for table, n_busted in zip(tournament.tables, [2, 3]):
+        for entrant in table.entrants[:n_busted]:
+            tournament.stacks[entrant] = 0
+        table.entrants = table.entrants[n_busted:]
+        table.button = 0
+    tournament.balance()
+
+    # 7 players fit in two tables: the smallest one was broken
+    assert sorted(table.id for table in tournament.tables) == [0, 2]
+    assert sorted(len(table) for table in tournament.tables) == [3, 4]
+
+
+def test_table_seat_and_unseat_keep_the_button():
+    table = Table(0, [10, 11, 12, 13], button=2)
+    table.seat(14)
+    assert table.entrants == [10, 11, 14, 12, 13]
+    assert table.entrants[table.button] == 12
+
+    assert table.unseat(0) == 10
+    assert table.entrants[table.button] == 12
+    table.unseat(table.button)
+    assert table.entrants[table.button] == 13
+
+
+def test_blinds_level_of_game():
+    players = [Player(str(i), i) for i in range(3)]
+    game = Game(players, blinds_level=2)
+    state = game.initial_state(stacks=[1000, 100, 5000], dealer=players[0])
+
+    assert state.blinds_level == 2
+    assert state.round_bets == (0, blinds_table[2]["small"], blinds_table[2]["big"])
+    assert state.current_player is players[0]
+
+    with pytest.raises(ValueError):
+        game.initial_state(stacks=[1000, 0, 5000])